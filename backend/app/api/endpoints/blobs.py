@@ -0,0 +1,81 @@
+# app/api/endpoints/blobs.py
+import asyncio
+import mimetypes
+import os
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from ...services.blob_store import get_blob_store
+
+router = APIRouter()
+
+# Blobs never change under their name, so clients may keep them forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single byte range, None to send the whole
+    file (absent, malformed or multi-range), ValueError if unsatisfiable
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start + 1)
+
+async def serve_file(request: Request, path: str, etag: str, media_type: str) -> Response:
+    """Serve an immutable file with ETag/If-None-Match and single-range support"""
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Accept-Ranges': 'bytes'}
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    if_range = request.headers.get('if-range')
+    try:
+        byte_range = None if if_range and if_range != etag else \
+            _parse_range(request.headers.get('range'), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, 'Content-Range': f"bytes */{size}"})
+
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    start, end = byte_range
+    return Response(
+        await asyncio.to_thread(_read_range, path, start, end), status_code=206, media_type=media_type,
+        headers={**headers, 'Content-Range': f"bytes {start}-{end}/{size}"}
+    )
+
+@router.get("/blobs/{name}")
+async def get_blob(name: str, request: Request):
+    path = get_blob_store().resolve(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    return await serve_file(request, path, f'"{name[:64]}"', media_type)
+
+@router.get("/blobs/{name}/thumbnails/{size}")
+async def get_thumbnail(name: str, size: int, request: Request):
+    path = await get_blob_store().get_thumbnail(name, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return await serve_file(request, path, f'"{name[:64]}-{size}"', 'image/jpeg')
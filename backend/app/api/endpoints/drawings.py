@@ -1,16 +1,47 @@
 # app/api/endpoints/drawings.py
-from fastapi import APIRouter, UploadFile, File
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from ...models.drawing import Drawing, DrawingPage
 from ...services import drawing_service
+from ...services.ingestion import UploadError
 
 router = APIRouter()
 
-@router.post("/drawings/")
+@router.post("/drawings/", response_model=Drawing)
 async def create_drawing(
     file: UploadFile = File(...),
-    child_id: str
+    child_id: str = Form(...)
 ):
-    return await drawing_service.create_drawing(file, child_id)
+    try:
+        return await drawing_service.create_drawing(file, child_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-@router.get("/drawings/{drawing_id}")
+@router.post("/drawings/batch")
+async def create_drawings(
+    files: List[UploadFile] = File(...),
+    child_id: str = Form(...)
+):
+    return await drawing_service.create_drawings(files, child_id)
+
+@router.get("/children/{child_id}/drawings", response_model=DrawingPage)
+async def list_drawings(
+    child_id: str,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None
+):
+    try:
+        return await drawing_service.list_drawings(child_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/drawings/{drawing_id}", response_model=Drawing)
 async def get_drawing(drawing_id: str):
-    return await drawing_service.get_drawing(drawing_id)
\ No newline at end of file
+    drawing = await drawing_service.get_drawing(drawing_id)
+    if drawing is None:
+        raise HTTPException(status_code=404, detail="Drawing not found")
+    return drawing
+
+@router.get("/drawings/{drawing_id}/stories")
+async def list_stories(drawing_id: str):
+    return await drawing_service.list_stories(drawing_id)
@@ -0,0 +1,167 @@
+# backend/app/core/config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _parse_pools(value: str) -> dict:
+    """Parse 'detr=thread:2,t5=thread:1' into {'detr': ('thread', 2), ...}"""
+    pools = {}
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        model_name, spec = entry.split('=')
+        kind, _, workers = spec.partition(':')
+        pools[model_name.strip()] = (kind.strip(), int(workers or 1))
+    return pools
+
+
+def _parse_budgets(value: str) -> dict:
+    """Parse 'instant=1500,premium=12000' into {'instant': 1500.0, ...}"""
+    budgets = {}
+    for entry in filter(None, (part.strip() for part in value.split(','))):
+        name, budget = entry.split('=')
+        budgets[name.strip()] = float(budget)
+    return budgets
+
+
+class Settings:
+    # Database
+    MONGODB_URL: str = os.getenv('MONGODB_URL', 'mongodb://localhost:27017')
+    MONGODB_DB_NAME: str = os.getenv('MONGODB_DB_NAME', 'kids_story_creator')
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv('MONGODB_MIN_POOL_SIZE', 0))
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv('MONGODB_MAX_POOL_SIZE', 100))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 60000))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 20000))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 10000))
+
+    # Listing a child's drawings
+    DRAWINGS_PAGE_SIZE: int = int(os.getenv('DRAWINGS_PAGE_SIZE', 20))
+    DRAWINGS_MAX_PAGE_SIZE: int = int(os.getenv('DRAWINGS_MAX_PAGE_SIZE', 100))
+
+    # Content-addressed image storage, served from /blobs
+    BLOB_STORE_DIR: str = os.getenv('BLOB_STORE_DIR', 'app/blobs')
+    THUMBNAIL_SIZES: list = [
+        int(size) for size in os.getenv('THUMBNAIL_SIZES', '128,256,512').split(',') if size.strip()
+    ]
+    THUMBNAIL_WORKERS: int = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+    # Models loaded at startup as "task.name", e.g. "object_detection.detr"
+    MODEL_PRELOAD: list = [
+        model.strip() for model in os.getenv('MODEL_PRELOAD', '').split(',') if model.strip()
+    ]
+
+    # Inference backend per model: "task.name=<eager|int8|bf16|onnx>,..."
+    MODEL_BACKENDS: dict = dict(
+        entry.strip().split('=', 1)
+        for entry in os.getenv('MODEL_BACKENDS', '').split(',') if entry.strip()
+    )
+
+    # Micro-batching for DETR object detection
+    DETECTION_MAX_BATCH_SIZE: int = int(os.getenv('DETECTION_MAX_BATCH_SIZE', 8))
+    DETECTION_MAX_WAIT_MS: float = float(os.getenv('DETECTION_MAX_WAIT_MS', 15))
+
+    # Micro-batching for ViT scene classification
+    SCENE_MAX_BATCH_SIZE: int = int(os.getenv('SCENE_MAX_BATCH_SIZE', 16))
+    SCENE_MAX_WAIT_MS: float = float(os.getenv('SCENE_MAX_WAIT_MS', 10))
+
+    # Micro-batching for spaCy safety analysis
+    NLP_MAX_BATCH_SIZE: int = int(os.getenv('NLP_MAX_BATCH_SIZE', 16))
+    NLP_MAX_WAIT_MS: float = float(os.getenv('NLP_MAX_WAIT_MS', 5))
+
+    # Inference executors, per model: "<model>=thread:<workers>"; the shared
+    # pools call methods of loaded models, so 'process' is refused there
+    INFERENCE_DEFAULT_POOL: str = os.getenv('INFERENCE_DEFAULT_POOL', 'thread')
+    INFERENCE_DEFAULT_WORKERS: int = int(os.getenv('INFERENCE_DEFAULT_WORKERS', 1))
+    INFERENCE_POOLS: dict = _parse_pools(
+        os.getenv('INFERENCE_POOLS', 'detr=thread:1,yolo=thread:1,vit=thread:1,t5=thread:1,nlp=thread:2')
+    )
+
+    # Cascade detection: YOLOS-tiny results are accepted when they are
+    # confident enough, everything else is escalated to DETR
+    CASCADE_MIN_OBJECTS: int = int(os.getenv('CASCADE_MIN_OBJECTS', 1))
+    CASCADE_MAX_OBJECTS: int = int(os.getenv('CASCADE_MAX_OBJECTS', 10))
+    CASCADE_MIN_CONFIDENCE: float = float(os.getenv('CASCADE_MIN_CONFIDENCE', 0.6))
+    CASCADE_MIN_MEAN_CONFIDENCE: float = float(os.getenv('CASCADE_MIN_MEAN_CONFIDENCE', 0.85))
+
+    # Per-stage deadlines for drawing analysis; a stage that misses its
+    # deadline is reported as degraded instead of failing the request
+    DETECTION_TIMEOUT_SECONDS: float = float(os.getenv('DETECTION_TIMEOUT_SECONDS', 10))
+    SCENE_TIMEOUT_SECONDS: float = float(os.getenv('SCENE_TIMEOUT_SECONDS', 5))
+    COLOR_TIMEOUT_SECONDS: float = float(os.getenv('COLOR_TIMEOUT_SECONDS', 2))
+
+    # Bulk drawing analysis
+    BULK_MAX_CONCURRENCY: int = int(os.getenv('BULK_MAX_CONCURRENCY', 8))
+    BULK_MAX_FILE_BYTES: int = int(os.getenv('BULK_MAX_FILE_BYTES', 10 * 1024 * 1024))
+
+    # Single uploads: hard limits checked before any full decode
+    UPLOAD_MAX_BYTES: int = int(os.getenv('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))
+    UPLOAD_MAX_PIXELS: int = int(os.getenv('UPLOAD_MAX_PIXELS', 50_000_000))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv('UPLOAD_CHUNK_BYTES', 64 * 1024))
+    UPLOAD_SPOOL_BYTES: int = int(os.getenv('UPLOAD_SPOOL_BYTES', 1024 * 1024))
+    UPLOAD_FORMATS: list = [
+        image_format.strip().upper()
+        for image_format in os.getenv('UPLOAD_FORMATS', 'JPEG,PNG,GIF,WEBP,BMP').split(',')
+        if image_format.strip()
+    ]
+
+    # Story generation jobs: queue backend ('memory' or 'sqlite'), local
+    # workers and the backlog limit beyond which submissions get a 429
+    STORY_JOB_QUEUE: str = os.getenv('STORY_JOB_QUEUE', 'memory')
+    STORY_JOB_DB_PATH: str = os.getenv('STORY_JOB_DB_PATH', 'story_jobs.db')
+    STORY_JOB_WORKERS: int = int(os.getenv('STORY_JOB_WORKERS', 2))
+    STORY_JOB_MAX_DEPTH: int = int(os.getenv('STORY_JOB_MAX_DEPTH', 100))
+    STORY_JOB_RESULT_TTL_SECONDS: float = float(os.getenv('STORY_JOB_RESULT_TTL_SECONDS', 3600))
+
+    # Safety word lists (JSON); empty uses the bundled app/data/safety_lexicon.json
+    SAFETY_LEXICON_PATH: str = os.getenv('SAFETY_LEXICON_PATH', '')
+
+    # Safety filter cascade: early-exit tiers skip parsing or sentiment
+    # once a cheap check decides a text; audit mode runs every tier and
+    # counts texts where early exit would have changed the verdict
+    SAFETY_EARLY_EXIT: bool = os.getenv('SAFETY_EARLY_EXIT', 'true').lower() == 'true'
+    SAFETY_CASCADE_AUDIT: bool = os.getenv('SAFETY_CASCADE_AUDIT', 'false').lower() == 'true'
+
+    # Drawing analysis result cache
+    RESULT_CACHE_ENABLED: bool = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 1024))
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    RESULT_CACHE_TTL_SECONDS: float = float(os.getenv('RESULT_CACHE_TTL_SECONDS', 3600))
+    RESULT_CACHE_HAMMING_TOLERANCE: int = int(os.getenv('RESULT_CACHE_HAMMING_TOLERANCE', 4))
+    RESULT_CACHE_DIR: str = os.getenv('RESULT_CACHE_DIR', '')
+
+    # Story generation: candidates decoded in one batched generate call,
+    # the first that passes the safety filter is served; terms of the
+    # banned lexicon categories are blocked while decoding
+    STORY_CANDIDATES: int = int(os.getenv('STORY_CANDIDATES', 3))
+    STORY_BANNED_CATEGORIES: list = [
+        category.strip() for category in os.getenv(
+            'STORY_BANNED_CATEGORIES', 'unsafe_object,unsafe_scene,unsafe_phrase'
+        ).split(',') if category.strip()
+    ]
+
+    # Generation profiles (instant, standard, premium): the default one, a
+    # decoding budget in ms for each, and the closing fraction of the budget
+    # in which decoding ends at the next sentence boundary
+    STORY_PROFILE: str = os.getenv('STORY_PROFILE', 'standard')
+    STORY_PROFILE_BUDGETS_MS: dict = _parse_budgets(os.getenv(
+        'STORY_PROFILE_BUDGETS_MS', 'instant=1500,standard=4000,premium=12000'
+    ))
+    STORY_DEADLINE_SENTENCE_WINDOW: float = float(os.getenv('STORY_DEADLINE_SENTENCE_WINDOW', 0.2))
+
+    # T5 inputs: fast (Rust) tokenizer, and encoder outputs of recent
+    # prompts kept by token ids (0 disables the cache)
+    T5_FAST_TOKENIZER: bool = os.getenv('T5_FAST_TOKENIZER', 'true').lower() == 'true'
+    T5_ENCODER_CACHE_SIZE: int = int(os.getenv('T5_ENCODER_CACHE_SIZE', 128))
+
+    # Story generation cache
+    STORY_CACHE_ENABLED: bool = os.getenv('STORY_CACHE_ENABLED', 'true').lower() == 'true'
+    STORY_CACHE_MAX_ENTRIES: int = int(os.getenv('STORY_CACHE_MAX_ENTRIES', 512))
+    STORY_CACHE_TTL_SECONDS: float = float(os.getenv('STORY_CACHE_TTL_SECONDS', 86400))
+    STORY_CACHE_VARIANTS: int = int(os.getenv('STORY_CACHE_VARIANTS', 3))
+
+
+settings = Settings()
+
+MONGODB_URL = settings.MONGODB_URL
@@ -0,0 +1,128 @@
+# backend/app/core/metrics.py
+"""
+Prometheus metrics for the API and the model pipeline.
+
+Everything is recorded in-process with `prometheus_client` and exported
+on `/metrics`. An observation is a lock and a bucket lookup, negligible
+next to any model call, so instrumentation stays on in production.
+Work done in 'process' inference pools happens in child processes and
+is only visible through the stage that awaited it.
+"""
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# Stages run from ~100us (cache keys) to tens of seconds (T5 beam search)
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by route and status code',
+    ['method', 'route', 'status'], registry=REGISTRY
+)
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time until the response headers are sent',
+    ['method', 'route'], buckets=STAGE_BUCKETS, registry=REGISTRY
+)
+HTTP_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being handled',
+    registry=REGISTRY
+)
+
+STAGE_LATENCY = Histogram(
+    'pipeline_stage_duration_seconds', 'Latency of one pipeline stage',
+    ['stage'], buckets=STAGE_BUCKETS, registry=REGISTRY
+)
+STAGE_ERRORS = Counter(
+    'pipeline_stage_errors_total', 'Pipeline stages that raised',
+    ['stage'], registry=REGISTRY
+)
+
+BATCH_SIZE = Histogram(
+    'model_batch_size', 'Items per batched model call',
+    ['batcher'], buckets=(1, 2, 4, 8, 16, 32, 64), registry=REGISTRY
+)
+INFERENCE_IN_FLIGHT = Gauge(
+    'inference_calls_in_flight', 'Calls queued or running on an inference executor',
+    ['executor'], registry=REGISTRY
+)
+
+DETECTION_CASCADE_PATHS = Counter(
+    'detection_cascade_total', 'Cascade detections kept from YOLOS-tiny or escalated to DETR',
+    ['path'], registry=REGISTRY
+)
+DETECTION_CASCADE_LATENCY = Histogram(
+    'detection_cascade_duration_seconds', 'Latency of cascade detection by path taken',
+    ['path'], buckets=STAGE_BUCKETS, registry=REGISTRY
+)
+
+SAFETY_FALLBACKS = Counter(
+    'safety_fallbacks_total', 'Texts replaced by fallback content, by reason',
+    ['reason'], registry=REGISTRY
+)
+STORY_CANDIDATES_EVALUATED = Histogram(
+    'story_candidates_evaluated', 'Generated candidates safety-checked per story',
+    buckets=(1, 2, 3, 4, 6, 8), registry=REGISTRY
+)
+STORY_OUTCOMES = Counter(
+    'story_outcomes_total', 'Generated stories served as generated or as fallback',
+    ['outcome'], registry=REGISTRY
+)
+SAFETY_TIER_DECISIONS = Counter(
+    'safety_tier_decisions_total', 'Texts passed, rejected or accepted by each safety tier',
+    ['tier', 'decision'], registry=REGISTRY
+)
+SAFETY_AUDIT_MISMATCHES = Counter(
+    'safety_audit_mismatches_total',
+    'Audited texts where early exit would have changed the verdict',
+    registry=REGISTRY
+)
+STORY_PROFILE_RUNS = Counter(
+    'story_profile_runs_total', 'Generations by profile, completed or cut short by the deadline',
+    ['profile', 'result'], registry=REGISTRY
+)
+T5_ENCODER_CACHE = Counter(
+    't5_encoder_cache_total', 'T5 encoder passes served from cache or computed',
+    ['result'], registry=REGISTRY
+)
+BLOB_UPLOADS = Counter(
+    'blob_uploads_total', 'Uploaded images stored as new blobs or deduplicated',
+    ['result'], registry=REGISTRY
+)
+
+@contextmanager
+def stage_timer(stage: str):
+    """Record the duration of a block, and count it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+def _call_timed(stage: str, fn: Callable, *args, **kwargs):
+    with stage_timer(stage):
+        return fn(*args, **kwargs)
+
+def timed(stage: str, fn: Callable) -> Callable:
+    """
+    Wrap `fn` so each call is recorded as `stage`.
+
+    Meant for callables handed to an inference executor, so the histogram
+    holds the time spent computing rather than waiting for a worker.
+    """
+    return partial(_call_timed, stage, fn)
+
+def render_metrics() -> tuple:
+    """Return the Prometheus text exposition and its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
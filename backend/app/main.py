@@ -1,13 +1,29 @@
 # backend/app/main.py
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
+from typing import List, Optional, Union
+import json
+import time
 import uvicorn
-from app.services.drawing_processor import DrawingProcessor
+import zipfile
+from app.api.endpoints import blobs, drawings
 from app.services.story_generator import StoryGenerator
 from app.core.config import settings
+from app.core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, render_metrics
+from app.models.drawing import ColumnarDrawingAnalysis, DrawingAnalysis
+from app.services.blob_store import get_blob_store
+from app.services.bulk_processing import process_bulk, to_ndjson, upload_items, zip_items
+from app.services.database import close_mongodb_connection, connect_to_mongodb
+from app.services.drawing_service import get_drawing_processor, get_enhanced_drawing_processor
+from app.services.inference import shutdown_executors
+from app.services.ingestion import UploadError, ingest_upload
+from app.services.job_queue import JobService, QueueFullError
+from app.services.ml_models import get_model_manager
 
-app = FastAPI(title="Kids Story Creator API")
+# orjson renders responses several times faster than the stdlib encoder
+app = FastAPI(title="Kids Story Creator API", default_response_class=ORJSONResponse)
 
 # CORS setup
 app.add_middleware(
@@ -18,20 +34,187 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        HTTP_LATENCY.labels(request.method, path).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(request.method, path, str(status)).inc()
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+app.include_router(drawings.router, prefix="/api")
+app.include_router(blobs.router)
+
+# Load configured models up front; the rest load on first use
+get_model_manager().preload(settings.MODEL_PRELOAD)
+
 # Initialize services
-drawing_processor = DrawingProcessor()
+drawing_processor = get_drawing_processor()
+enhanced_processor = get_enhanced_drawing_processor()
 story_generator = StoryGenerator()
+story_jobs = JobService.from_settings(story_generator.generate_story, settings)
+
+@app.on_event("startup")
+async def startup():
+    await connect_to_mongodb()
+    await story_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await story_jobs.stop()
+    await get_blob_store().drain()
+    shutdown_executors(wait=False)
+    await close_mongodb_connection()
+
+@app.get("/health")
+async def health():
+    return {'status': 'ok'}
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/models")
+async def model_stats():
+    return get_model_manager().get_stats()
+
+@app.post("/api/process-drawing",
+          response_model=Union[DrawingAnalysis, ColumnarDrawingAnalysis])
+async def process_drawing(file: UploadFile = File(...),
+                          layout: str = Query('objects', pattern='^(objects|columnar)$')):
+    """Detected objects and scene; `layout=columnar` returns detections as parallel arrays"""
+    # Oversized, unsupported or pixel-bomb uploads are refused before decoding
+    try:
+        upload = await ingest_upload(file)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    with upload:
+        result = await drawing_processor.process_image(upload)
+    if layout == 'columnar':
+        return ColumnarDrawingAnalysis.from_result(result)
+    return result
+
+@app.post("/api/analyze-drawing")
+async def analyze_drawing(file: UploadFile = File(...),
+                          detection_model: str = Query('cascade', pattern='^(detr|yolo|cascade)$')):
+    """Objects, scene, colors and safety; `cascade` escalates uncertain YOLOS-tiny results to DETR"""
+    try:
+        upload = await ingest_upload(file)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    with upload:
+        return await enhanced_processor.process_image(upload, detection_model)
+
+@app.get("/api/detection/stats")
+async def detection_stats():
+    return enhanced_processor.get_cascade_stats()
 
-@app.post("/api/process-drawing")
-async def process_drawing(file: UploadFile = File(...)):
-    return await drawing_processor.process_image(await file.read())
+@app.post("/api/process-drawings/batch")
+async def process_drawings_batch(files: Optional[List[UploadFile]] = File(None),
+                                 archive: Optional[UploadFile] = File(None),
+                                 ids: Optional[List[str]] = Form(None)):
+    """
+    Analyze many drawings, sent as multipart `files` (optionally tagged by
+    `ids`) or as one zip `archive`, streaming an NDJSON line per drawing
+    """
+    try:
+        if archive is not None:
+            items = zip_items(archive.file, settings.BULK_MAX_FILE_BYTES)
+        elif files:
+            items = upload_items(files, ids, settings.BULK_MAX_FILE_BYTES)
+        else:
+            raise HTTPException(status_code=400, detail="No drawings uploaded")
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def lines():
+        async for line in process_bulk(
+            drawing_processor.process_image, items, settings.BULK_MAX_CONCURRENCY
+        ):
+            yield to_ndjson(line)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.post("/api/generate-story")
 async def generate_story(drawing_data: dict):
-    return await story_generator.generate_story(drawing_data)
+    """`profile` (instant, standard, premium) picks decoding and latency budget"""
+    try:
+        return await story_generator.generate_story(drawing_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/story-jobs", status_code=202)
+async def submit_story_job(drawing_data: dict):
+    try:
+        story_generator.get_profile(drawing_data.get('profile'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job_id = await story_jobs.submit(drawing_data)
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={'detail': str(e)},
+            headers={'Retry-After': str(e.retry_after)}
+        )
+    return {'job_id': job_id, 'status': 'queued'}
+
+@app.get("/api/stories/stats")
+async def story_generation_stats():
+    return {
+        **story_generator.get_generation_stats(),
+        'prompt': story_generator.get_prompt_stats()
+    }
+
+@app.get("/api/safety/stats")
+async def safety_stats():
+    return story_generator.safety_filter.get_cascade_stats()
+
+@app.get("/api/story-jobs/stats")
+async def story_job_stats():
+    return await story_jobs.get_stats()
+
+@app.get("/api/story-jobs/{job_id}")
+async def get_story_job(job_id: str, wait: float = 0):
+    """Job status and result; `wait` long-polls up to that many seconds (max 30)"""
+    job = await story_jobs.get(job_id, wait=min(max(wait, 0), 30))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/generate-story/stream")
+async def generate_story_stream(drawing_data: dict):
+    try:
+        story_generator.get_profile(drawing_data.get('profile'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        try:
+            async for event, data in story_generator.stream_story(drawing_data):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            error = {'detail': f"Error generating story: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -1,14 +1,16 @@
 # app/models/drawing.py
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class DrawingBase(BaseModel):
     child_id: str
     image_url: str
+    # Size (longest side, px) -> URL, generated in the background at ingest
+    thumbnail_urls: Dict[str, str] = Field(default_factory=dict)
     detected_objects: List[dict]
     scene_type: str
-    creation_date: datetime = datetime.now()
+    creation_date: datetime = Field(default_factory=datetime.now)
 
 class DrawingCreate(DrawingBase):
     pass
@@ -17,4 +19,66 @@ class Drawing(DrawingBase):
     id: str
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class DrawingSummary(BaseModel):
+    """The fields a drawing list needs, read with a projection"""
+    id: str
+    child_id: str
+    image_url: str
+    thumbnail_urls: Dict[str, str] = Field(default_factory=dict)
+    scene_type: str
+    creation_date: datetime
+
+class BoundingBox(BaseModel):
+    x: float
+    y: float
+    width: float
+    height: float
+
+class Detection(BaseModel):
+    name: str
+    confidence: float
+    box: BoundingBox
+
+class DrawingAnalysis(BaseModel):
+    """Result of /api/process-drawing, one object per detection"""
+    objects: List[Detection]
+    scene_type: str
+
+class DetectionColumns(BaseModel):
+    """Detections as parallel arrays: index i of every list is detection i"""
+    name: List[str]
+    confidence: List[float]
+    x: List[float]
+    y: List[float]
+    width: List[float]
+    height: List[float]
+
+    @classmethod
+    def from_detections(cls, objects: List[dict]) -> 'DetectionColumns':
+        boxes = [obj['box'] for obj in objects]
+        return cls(
+            name=[obj['name'] for obj in objects],
+            confidence=[obj['confidence'] for obj in objects],
+            x=[box['x'] for box in boxes],
+            y=[box['y'] for box in boxes],
+            width=[box['width'] for box in boxes],
+            height=[box['height'] for box in boxes]
+        )
+
+class ColumnarDrawingAnalysis(BaseModel):
+    """Compact layout of DrawingAnalysis, requested with ?layout=columnar"""
+    objects: DetectionColumns
+    scene_type: str
+
+    @classmethod
+    def from_result(cls, result: dict) -> 'ColumnarDrawingAnalysis':
+        return cls(
+            objects=DetectionColumns.from_detections(result['objects']),
+            scene_type=result['scene_type']
+        )
+
+class DrawingPage(BaseModel):
+    items: List[DrawingSummary]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,7 @@
 # app/models/story.py
+from pydantic import BaseModel
+from typing import List, Optional
+
 class StoryBase(BaseModel):
     drawing_id: str
     narrative: List[dict]
@@ -11,7 +14,7 @@ class StoryCreate(StoryBase):
 
 class Story(StoryBase):
     id: str
-    voice_narration: Optional[str]
+    voice_narration: Optional[str] = None
     
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -0,0 +1,222 @@
+# backend/app/services/backends.py
+import inspect
+import os
+import tempfile
+from typing import List, Optional
+import torch
+from transformers.utils import ModelOutput
+
+BACKENDS = ('eager', 'int8', 'bf16', 'onnx')
+
+class InferenceBackend:
+    """
+    Common interface over the ways a model can run on CPU.
+
+    Services call `backend(**inputs)`, `backend.generate(...)` and read
+    `backend.config` exactly as they would on the Hugging Face model, so
+    switching backends is a configuration change only. Any other attribute
+    is forwarded to the wrapped model.
+    """
+
+    name = 'eager'
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def config(self):
+        return self.model.config
+
+    def __call__(self, **inputs):
+        return self.model(**inputs)
+
+    def generate(self, *args, **kwargs):
+        return self.model.generate(*args, **kwargs)
+
+    def module(self) -> Optional[torch.nn.Module]:
+        """The torch module doing the work, if any (for memory accounting)"""
+        return self.model if isinstance(self.model, torch.nn.Module) else None
+
+    def __getattr__(self, name):
+        # Only reached for attributes not defined on the backend itself
+        model = self.__dict__.get('model')
+        if model is None:
+            raise AttributeError(name)
+        return getattr(model, name)
+
+class EagerBackend(InferenceBackend):
+    """Plain fp32 eager execution"""
+
+    name = 'eager'
+
+class DynamicInt8Backend(InferenceBackend):
+    """Linear layers dynamically quantized to int8; activations stay fp32"""
+
+    name = 'int8'
+
+    def __init__(self, model):
+        super().__init__(torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        ))
+
+class BF16AutocastBackend(InferenceBackend):
+    """bf16 autocast on CPU, with floating outputs cast back to fp32"""
+
+    name = 'bf16'
+
+    def __call__(self, **inputs):
+        with torch.autocast('cpu', dtype=torch.bfloat16):
+            outputs = self.model(**inputs)
+        # Post-processing (softmax, box scaling) expects fp32 tensors
+        for key, value in outputs.items():
+            if torch.is_tensor(value) and value.is_floating_point():
+                outputs[key] = value.float()
+        return outputs
+
+    def generate(self, *args, **kwargs):
+        with torch.autocast('cpu', dtype=torch.bfloat16):
+            return self.model.generate(*args, **kwargs)
+
+class OnnxBackend(InferenceBackend):
+    """
+    Forward pass exported to ONNX and run with onnxruntime.
+
+    Suited to forward-only models (DETR, ViT, YOLOS): `input_names` and
+    `output_names` describe the graph, and outputs come back as fp32
+    torch tensors in the model's own output class, so pipelines and
+    post-processing treat them like the eager outputs. Sequence-to-sequence
+    models are loaded through optimum's ORT classes so `generate` keeps
+    working; other generating models are refused when the backend is
+    built. Needs the optional `onnxruntime` (and, for seq2seq,
+    `optimum[onnxruntime]`) packages.
+    """
+
+    name = 'onnx'
+
+    def __init__(self, model, model_id: Optional[str] = None,
+                 input_names: Optional[List[str]] = None,
+                 output_names: Optional[List[str]] = None,
+                 image_size: Optional[int] = None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError(
+                "The 'onnx' backend needs onnxruntime: pip install onnxruntime"
+            )
+
+        super().__init__(model)
+        self.session = None
+        self.ort_model = None
+        self.onnx_bytes = 0
+
+        if getattr(model.config, 'is_encoder_decoder', False):
+            try:
+                from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            except ImportError:
+                raise ImportError(
+                    "The 'onnx' backend for seq2seq models needs optimum: "
+                    "pip install optimum[onnxruntime]"
+                )
+            self.ort_model = ORTModelForSeq2SeqLM.from_pretrained(model_id, export=True)
+            return
+        if hasattr(model, 'can_generate') and model.can_generate():
+            # A forward-only graph cannot decode; fail at load, not per request
+            raise ValueError(
+                f"The 'onnx' backend exports forward passes only; "
+                f"{type(model).__name__} generates text and is not a seq2seq model"
+            )
+
+        self.input_names = input_names or ['pixel_values']
+        self.output_names = output_names or ['logits']
+        image_size = image_size or getattr(model.config, 'image_size', 224)
+        self.output_class = self._output_class(model, image_size)
+        graph = self._export(model, image_size)
+        self.onnx_bytes = len(graph)
+        self.session = onnxruntime.InferenceSession(
+            graph, providers=['CPUExecutionProvider']
+        )
+
+    def _sample_inputs(self, image_size: int) -> dict:
+        sample_inputs = {'pixel_values': torch.randn(1, 3, image_size, image_size)}
+        if 'pixel_mask' in self.input_names:
+            sample_inputs['pixel_mask'] = torch.ones(1, image_size, image_size, dtype=torch.long)
+        return sample_inputs
+
+    def _output_class(self, model, image_size: int) -> type:
+        """The model's output class (e.g. pipelines rebuild outputs through it)"""
+        with torch.no_grad():
+            outputs = model(**self._sample_inputs(image_size))
+        return type(outputs) if isinstance(outputs, ModelOutput) else ModelOutput
+
+    def _export(self, model, image_size: int) -> bytes:
+        sample_inputs = self._sample_inputs(image_size)
+
+        class _Forward(torch.nn.Module):
+            def __init__(self, wrapped, output_names):
+                super().__init__()
+                self.wrapped = wrapped
+                self.output_names = output_names
+
+            def forward(self, *args):
+                outputs = self.wrapped(**dict(zip(sample_inputs, args)))
+                return tuple(outputs[name] for name in self.output_names)
+
+        # Batch and spatial dimensions vary between calls
+        dynamic_axes = {
+            'pixel_values': {0: 'batch', 2: 'height', 3: 'width'},
+            'pixel_mask': {0: 'batch', 1: 'height', 2: 'width'}
+        }
+        dynamic_axes = {name: dynamic_axes[name] for name in sample_inputs}
+        dynamic_axes.update({name: {0: 'batch'} for name in self.output_names})
+
+        export_kwargs = {}
+        if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+            # Newer torch defaults to the dynamo exporter; keep the TorchScript one
+            export_kwargs['dynamo'] = False
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model.onnx')
+            torch.onnx.export(
+                _Forward(model, self.output_names),
+                tuple(sample_inputs.values()),
+                path,
+                input_names=list(sample_inputs),
+                output_names=self.output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                **export_kwargs
+            )
+            with open(path, 'rb') as f:
+                return f.read()
+
+    def __call__(self, **inputs):
+        if self.ort_model is not None:
+            return self.ort_model(**inputs)
+
+        feeds = {
+            name: inputs[name].detach().cpu().numpy()
+            for name in self.input_names if name in inputs
+        }
+        outputs = self.session.run(self.output_names, feeds)
+        return self.output_class(**{
+            name: torch.from_numpy(value).float()
+            for name, value in zip(self.output_names, outputs)
+        })
+
+    def generate(self, *args, **kwargs):
+        if self.ort_model is None:
+            # Forward-only graph; generating models were refused at load
+            return super().generate(*args, **kwargs)
+        return self.ort_model.generate(*args, **kwargs)
+
+def create_backend(kind: str, model, **options) -> InferenceBackend:
+    """Wrap a loaded model in the requested inference backend"""
+    if kind == 'eager':
+        return EagerBackend(model)
+    if kind == 'int8':
+        return DynamicInt8Backend(model)
+    if kind == 'bf16':
+        return BF16AutocastBackend(model)
+    if kind == 'onnx':
+        return OnnxBackend(model, **options)
+    raise ValueError(f"Unknown inference backend: {kind} (expected one of {BACKENDS})")
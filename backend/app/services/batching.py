@@ -0,0 +1,130 @@
+# backend/app/services/batching.py
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.metrics import BATCH_SIZE
+
+
+class BatchScheduler:
+    """
+    Collect concurrent requests into a single batched model call.
+
+    Callers `await submit(item)`. The scheduler waits up to `max_wait_ms`
+    for more items (or until `max_batch_size` is reached), passes the whole
+    list to `batch_fn` and hands each caller its own entry of the returned
+    list. `batch_fn` may return an Exception instance in place of a result
+    to fail a single item without failing the rest of the batch. When an
+    `executor` is given, `batch_fn` runs there instead of on the event loop.
+    Batch sizes are exported under `name`.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0,
+                 executor=None, name: str = 'batch'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.stats = {'batches': 0, 'items': 0, 'largest_batch': 0}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its slice of the batched result"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self):
+        """Stop the background worker"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # Queues and tasks are bound to a loop, so start fresh per loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        # Drop callers that gave up while waiting
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+        self._record(len(items))
+
+        try:
+            results = await self._call_batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch function returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _call_batch_fn(self, items: List[Any]) -> List[Any]:
+        if self.executor is not None:
+            return await self.executor.run(self.batch_fn, items)
+        return self.batch_fn(items)
+
+    def _record(self, size: int):
+        self.stats['batches'] += 1
+        self.stats['items'] += size
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], size)
+        BATCH_SIZE.labels(self.name).observe(size)
+
+    def get_stats(self) -> Dict:
+        """Return batch counters and the average batch size"""
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'average_batch_size': self.stats['items'] / batches if batches else 0.0
+        }
@@ -0,0 +1,182 @@
+# backend/app/services/blob_store.py
+"""
+Content-addressed storage for uploaded drawings.
+
+An upload is stored once under the SHA-256 of its bytes, so the same
+drawing uploaded twice is one file, and a blob's name doubles as a
+strong ETag that never changes. Thumbnails for every configured size
+are generated once per blob by a background task right after ingest;
+reads wait for a pending generation instead of starting another one.
+
+    <root>/objects/ab/abcdef....png
+    <root>/thumbnails/abcdef.../256.jpg
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import IO, Dict, Optional, Sequence, Union
+from PIL import Image
+from app.core.config import settings
+from app.core.metrics import BLOB_UPLOADS, stage_timer
+
+# PIL format -> stored extension
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp', 'BMP': '.bmp'}
+BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.[a-z]+)$')
+THUMBNAIL_FORMAT = 'JPEG'
+
+@dataclass
+class BlobRef:
+    digest: str
+    extension: str
+    created: bool
+
+    @property
+    def name(self) -> str:
+        return f"{self.digest}{self.extension}"
+
+def _write_atomic(path: str, data: Union[bytes, IO[bytes]]):
+    """Write through a temp file so readers never see a partial blob"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _sha256(fileobj: IO[bytes], chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+class BlobStore:
+    def __init__(self, root: str, thumbnail_sizes: Sequence[int] = (128, 256, 512),
+                 workers: int = 2):
+        self.root = root
+        self.thumbnail_sizes = sorted(set(thumbnail_sizes), reverse=True)
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._workers = asyncio.Semaphore(workers)
+
+    def object_path(self, name: str) -> str:
+        return os.path.join(self.root, 'objects', name[:2], name)
+
+    def thumbnail_path(self, digest: str, size: int) -> str:
+        return os.path.join(self.root, 'thumbnails', digest, f"{size}.jpg")
+
+    def put(self, data: Union[bytes, IO[bytes]]) -> BlobRef:
+        """
+        Store `data` (bytes or a binary file, e.g. a spooled upload) unless
+        an identical blob exists; ValueError if it is no image
+        """
+        fileobj = io.BytesIO(data) if isinstance(data, bytes) else data
+        fileobj.seek(0)
+        try:
+            image_format = Image.open(fileobj).format
+        except Exception:
+            raise ValueError("Unsupported image format")
+        if image_format not in EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        fileobj.seek(0)
+        ref = BlobRef(_sha256(fileobj), EXTENSIONS[image_format], False)
+        path = self.object_path(ref.name)
+        if not os.path.exists(path):
+            fileobj.seek(0)
+            _write_atomic(path, fileobj)
+            ref.created = True
+        BLOB_UPLOADS.labels('stored' if ref.created else 'deduplicated').inc()
+        return ref
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Path of a stored blob, or None for unknown or malformed names"""
+        if not BLOB_NAME.match(name):
+            return None
+        path = self.object_path(name)
+        return path if os.path.exists(path) else None
+
+    def make_thumbnails(self, name: str) -> Dict[int, str]:
+        """Write every missing thumbnail size of blob `name`"""
+        digest = BLOB_NAME.match(name).group(1)
+        missing = [
+            size for size in self.thumbnail_sizes
+            if not os.path.exists(self.thumbnail_path(digest, size))
+        ]
+        if missing:
+            with Image.open(self.object_path(name)) as image:
+                # JPEG can decode straight at a fraction of full resolution
+                image.draft('RGB', (missing[0], missing[0]))
+                image = image.convert('RGBA') if image.mode in ('RGBA', 'LA', 'P') else image.convert('RGB')
+                if image.mode == 'RGBA':
+                    background = Image.new('RGB', image.size, 'white')
+                    background.paste(image, mask=image.getchannel('A'))
+                    image = background
+                # Largest first, each size shrinks the previous one
+                for size in missing:
+                    image.thumbnail((size, size), Image.LANCZOS)
+                    buf = io.BytesIO()
+                    image.save(buf, format=THUMBNAIL_FORMAT, quality=85, optimize=True)
+                    _write_atomic(self.thumbnail_path(digest, size), buf.getvalue())
+        return {size: self.thumbnail_path(digest, size) for size in self.thumbnail_sizes}
+
+    async def ingest(self, data: Union[bytes, IO[bytes]]) -> BlobRef:
+        """Store an upload and queue its thumbnails in the background"""
+        ref = await asyncio.to_thread(self.put, data)
+        self.schedule_thumbnails(ref.name)
+        return ref
+
+    def schedule_thumbnails(self, name: str) -> asyncio.Task:
+        task = self._pending.get(name)
+        if task is None:
+            task = asyncio.create_task(self._thumbnail_task(name))
+            self._pending[name] = task
+            task.add_done_callback(lambda _: self._pending.pop(name, None))
+        return task
+
+    async def _thumbnail_task(self, name: str) -> Dict[int, str]:
+        async with self._workers:
+            with stage_timer('thumbnails'):
+                return await asyncio.to_thread(self.make_thumbnails, name)
+
+    async def get_thumbnail(self, name: str, size: int) -> Optional[str]:
+        """Path of a thumbnail, waiting for (or redoing) its generation if needed"""
+        if size not in self.thumbnail_sizes or self.resolve(name) is None:
+            return None
+        path = self.thumbnail_path(name[:64], size)
+        if not os.path.exists(path):
+            # Pending after ingest, or lost (e.g. the process stopped first)
+            await self.schedule_thumbnails(name)
+        return path
+
+    async def drain(self):
+        """Wait for queued thumbnails, e.g. before shutdown"""
+        if self._pending:
+            await asyncio.gather(*self._pending.values(), return_exceptions=True)
+
+    def url(self, ref: BlobRef) -> str:
+        return f"/blobs/{ref.name}"
+
+    def thumbnail_urls(self, ref: BlobRef) -> Dict[str, str]:
+        return {
+            str(size): f"/blobs/{ref.name}/thumbnails/{size}" for size in self.thumbnail_sizes
+        }
+
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore(
+            settings.BLOB_STORE_DIR, settings.THUMBNAIL_SIZES, settings.THUMBNAIL_WORKERS
+        )
+    return _blob_store
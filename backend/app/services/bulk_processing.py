@@ -0,0 +1,129 @@
+# backend/app/services/bulk_processing.py
+import asyncio
+import os
+import zipfile
+from typing import (
+    IO, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List,
+    Optional, Tuple
+)
+import orjson
+from app.utils.serialization import to_json
+
+# (client-supplied id, coroutine function returning the drawing's bytes)
+BulkItem = Tuple[str, Callable[[], Awaitable[bytes]]]
+
+async def process_bulk(process: Callable[[bytes], Awaitable[Dict]],
+                       items: Iterable[BulkItem],
+                       max_concurrency: int = 8) -> AsyncIterator[Dict]:
+    """
+    Run `process` over many drawings, yielding one result per drawing as
+    each finishes.
+
+    At most `max_concurrency` drawings are read and processed at a time,
+    and an item's bytes are only loaded when it starts, so memory stays
+    bounded however many items there are. Concurrent items still share
+    the processor's batched model calls. A failing item yields an error
+    line and never aborts the rest of the batch.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    async def run(item_id: str, load: Callable[[], Awaitable[bytes]]) -> Dict:
+        try:
+            result = await process(await load())
+            return {'id': item_id, 'status': 'ok', 'result': result}
+        except Exception as e:
+            return {'id': item_id, 'status': 'error', 'error': str(e)}
+
+    iterator = iter(items)
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_concurrency:
+                try:
+                    item_id, load = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                except Exception as e:
+                    # An item listing that fails part-way ends the batch with an error line
+                    exhausted = True
+                    yield {'id': None, 'status': 'error', 'error': str(e)}
+                    break
+                pending.add(asyncio.create_task(run(item_id, load)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Client went away or the consumer stopped early
+        for task in pending:
+            task.cancel()
+
+def upload_items(files: List, ids: Optional[List[str]] = None,
+                 max_bytes: int = 0) -> Iterator[BulkItem]:
+    """Bulk items for multipart uploads, tagged with `ids` or the file names"""
+    if ids and len(ids) != len(files):
+        raise ValueError(f"Got {len(ids)} ids for {len(files)} files")
+
+    return (
+        (ids[i] if ids else (upload.filename or str(i)), _upload_loader(upload, max_bytes))
+        for i, upload in enumerate(files)
+    )
+
+def _upload_loader(upload, max_bytes: int) -> Callable[[], Awaitable[bytes]]:
+    async def load() -> bytes:
+        # Uploads are spooled to disk by the multipart parser; read one at a time
+        data = await upload.read(max_bytes + 1 if max_bytes else -1)
+        if max_bytes and len(data) > max_bytes:
+            raise ValueError(f"File is larger than {max_bytes} bytes")
+        return data
+    return load
+
+def zip_items(fileobj: IO[bytes], max_bytes: int = 0) -> Iterator[BulkItem]:
+    """
+    Bulk items for the files of a zip archive, tagged with their paths.
+
+    The archive is validated up front (raising `zipfile.BadZipFile`), but
+    members are only decompressed when their item starts. Directories
+    and hidden or macOS resource-fork entries are skipped.
+    """
+    archive = zipfile.ZipFile(fileobj)
+
+    def members() -> Iterator[BulkItem]:
+        # The archive stays open for loaders still running; `fileobj` is
+        # owned (and closed) by the caller
+        for info in archive.infolist():
+            name = info.filename
+            if (info.is_dir() or name.startswith('__MACOSX/')
+                    or os.path.basename(name).startswith('.')):
+                continue
+            yield name, _zip_loader(archive, info, max_bytes)
+
+    return members()
+
+def _zip_loader(archive: zipfile.ZipFile, info: zipfile.ZipInfo,
+                max_bytes: int) -> Callable[[], Awaitable[bytes]]:
+    def read() -> bytes:
+        if max_bytes and info.file_size > max_bytes:
+            raise ValueError(f"File is larger than {max_bytes} bytes")
+        # Don't trust the header size: stop decompressing past the limit
+        with archive.open(info) as member:
+            data = member.read(max_bytes + 1 if max_bytes else -1)
+        if max_bytes and len(data) > max_bytes:
+            raise ValueError(f"File is larger than {max_bytes} bytes")
+        return data
+
+    async def load() -> bytes:
+        return await asyncio.to_thread(read)
+    return load
+
+def to_ndjson(line: Dict) -> str:
+    """One NDJSON line (numpy values become plain JSON numbers)"""
+    return orjson.dumps(
+        line, default=to_json, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    ).decode() + "\n"
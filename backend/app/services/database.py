@@ -1,16 +1,90 @@
 # app/services/database.py
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import logging
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import MongoClient
-from ..core.config import MONGODB_URL
+from pymongo.errors import PyMongoError
+from ..core.config import MONGODB_URL, settings
+from .repositories import DrawingRepository, StoryRepository
+
+logger = logging.getLogger(__name__)
+
+# Pause between attempts to create the indexes while MongoDB is unreachable
+INDEX_RETRY_SECONDS = 30
 
 class Database:
     client: AsyncIOMotorClient = None
+    db: AsyncIOMotorDatabase = None
+    drawings: DrawingRepository = None
+    stories: StoryRepository = None
+    index_task: Optional[asyncio.Task] = None
 
 async def get_database() -> AsyncIOMotorClient:
     return Database.client
 
+def create_client(url: str = MONGODB_URL) -> AsyncIOMotorClient:
+    """Motor client with the configured connection pool and timeouts"""
+    return AsyncIOMotorClient(
+        url,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+    )
+
+def bind_repositories(client: AsyncIOMotorClient, db_name: Optional[str] = None):
+    """Bind the repositories to `client`; no round trip to the server"""
+    Database.client = client
+    Database.db = client[db_name or settings.MONGODB_DB_NAME]
+    Database.drawings = DrawingRepository(Database.db)
+    Database.stories = StoryRepository(Database.db)
+
+async def ensure_indexes():
+    await Database.drawings.ensure_indexes()
+    await Database.stories.ensure_indexes()
+
+async def init_repositories(client: AsyncIOMotorClient, db_name: Optional[str] = None):
+    """Bind the repositories to `client` and create their indexes"""
+    bind_repositories(client, db_name)
+    await ensure_indexes()
+
+async def _ensure_indexes_until_created():
+    while True:
+        try:
+            await ensure_indexes()
+            return
+        except PyMongoError as e:
+            logger.warning("Could not create MongoDB indexes, retrying in %ss: %s",
+                           INDEX_RETRY_SECONDS, e)
+        await asyncio.sleep(INDEX_RETRY_SECONDS)
+
 async def connect_to_mongodb():
-    Database.client = AsyncIOMotorClient(MONGODB_URL)
+    """
+    Bind the repositories and create their indexes in the background, so
+    the API (drawing analysis, stories) starts even when MongoDB is down
+    """
+    bind_repositories(create_client())
+    Database.index_task = asyncio.create_task(_ensure_indexes_until_created())
 
 async def close_mongodb_connection():
-    Database.client.close()
\ No newline at end of file
+    if Database.index_task is not None:
+        Database.index_task.cancel()
+        await asyncio.gather(Database.index_task, return_exceptions=True)
+    if Database.client is not None:
+        Database.client.close()
+    Database.client = Database.db = Database.drawings = Database.stories = None
+    Database.index_task = None
+
+def get_drawing_repository() -> DrawingRepository:
+    if Database.drawings is None:
+        raise Exception("Database is not connected")
+    return Database.drawings
+
+def get_story_repository() -> StoryRepository:
+    if Database.stories is None:
+        raise Exception("Database is not connected")
+    return Database.stories
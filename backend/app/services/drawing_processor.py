@@ -1,53 +1,70 @@
 # backend/app/services/drawing_processor.py
-import torch
-from transformers import DetrImageProcessor, DetrForObjectDetection
-from PIL import Image
-import io
+from typing import IO, Dict, List, Union
+from app.core.config import settings
+from app.core.metrics import timed
+from app.services.batching import BatchScheduler
+from app.services.ml_models import get_model_manager, run_detr_batch
+from app.services.inference import get_executor
+from app.services.preprocessing import ImagePreprocessor, PreprocessedImage
+from app.services.result_cache import DrawingResultCache
 
 class DrawingProcessor:
     def __init__(self):
-        # Initialize DETR model for object detection
-        self.processor = DetrImageProcessor.from_pretrained("facebook/detr-resnet-50")
-        self.model = DetrForObjectDetection.from_pretrained("facebook/detr-resnet-50")
+        # DETR model for object detection, shared through the model registry
+        detr = get_model_manager().get('object_detection', 'detr')
+        self.processor = detr['processor']
+        self.model = detr['model']
+        self.preprocessor = ImagePreprocessor(max_pixels=settings.UPLOAD_MAX_PIXELS)
         
-    async def process_image(self, image_data: bytes):
+        # Concurrent uploads share one DETR forward pass
+        self.batcher = BatchScheduler(
+            self._detect_batch,
+            max_batch_size=settings.DETECTION_MAX_BATCH_SIZE,
+            max_wait_ms=settings.DETECTION_MAX_WAIT_MS,
+            executor=get_executor('detr'),
+            name='detr'
+        )
+        
+        # Resubmitted and near-duplicate drawings skip the model entirely
+        self.result_cache = (
+            DrawingResultCache.from_settings(settings)
+            if settings.RESULT_CACHE_ENABLED else None
+        )
+        
+    async def process_image(self, image_data: Union[bytes, IO[bytes]]):
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Process image with DETR
-            inputs = self.processor(images=image, return_tensors="pt")
-            outputs = self.model(**inputs)
+            # Decode once, at no more resolution than DETR needs
+            image = await get_executor('preprocess').run(
+                timed('decode', self.preprocessor.decode), image_data
+            )
             
-            # Post-process results
-            target_sizes = torch.tensor([image.size[::-1]])
-            results = self.processor.post_process_object_detection(
-                outputs, target_sizes=target_sizes, threshold=0.7
-            )[0]
+            if self.result_cache is not None:
+                cache_keys = await get_executor('cache').run(
+                    timed('cache_keys', self.result_cache.compute_keys),
+                    image.image, image.original_size
+                )
+                cached = self.result_cache.get(cache_keys, namespace='detr')
+                if cached is not None:
+                    return cached
             
-            # Format results
-            detected_objects = []
-            for score, label, box in zip(
-                results["scores"], results["labels"], results["boxes"]
-            ):
-                detected_objects.append({
-                    'name': self.model.config.id2label[label.item()],
-                    'confidence': score.item(),
-                    'box': {
-                        'x': box[0].item(),
-                        'y': box[1].item(),
-                        'width': box[2].item() - box[0].item(),
-                        'height': box[3].item() - box[1].item()
-                    }
-                })
+            # Detect objects as part of the next DETR batch
+            detected_objects = await self.batcher.submit(image)
             
-            return {
+            result = {
                 'objects': detected_objects,
                 'scene_type': self._determine_scene_type(detected_objects)
             }
             
+            if self.result_cache is not None:
+                self.result_cache.put(cache_keys, result, namespace='detr')
+            
+            return result
+            
         except Exception as e:
             raise Exception(f"Error processing image: {str(e)}")
+    
+    def _detect_batch(self, images: List[PreprocessedImage]) -> List[List[Dict]]:
+        return run_detr_batch(self.processor, self.model, images)
             
     def _determine_scene_type(self, objects):
         # Simple scene type determination based on detected objects
@@ -58,4 +75,4 @@ class DrawingProcessor:
         elif any(name in ['house', 'building', 'chair'] for name in object_names):
             return 'indoor'
         else:
-            return 'general'
\ No newline at end of file
+            return 'general'
@@ -0,0 +1,106 @@
+# backend/app/services/drawing_service.py
+"""Analyze uploaded drawings and persist them through the repositories"""
+from typing import Dict, List, Optional
+from fastapi import UploadFile
+from app.core.config import settings
+from app.models.drawing import Drawing, DrawingCreate, DrawingPage
+from app.models.story import Story, StoryCreate
+from app.services.blob_store import get_blob_store
+from app.services.bulk_processing import process_bulk, upload_items
+from app.services.database import get_drawing_repository, get_story_repository
+from app.services.drawing_processor import DrawingProcessor
+from app.services.ingestion import ingest_upload
+from app.services.ml_models import EnhancedDrawingProcessor
+
+_drawing_processor = None
+_enhanced_processor = None
+
+def get_drawing_processor() -> DrawingProcessor:
+    global _drawing_processor
+    if _drawing_processor is None:
+        _drawing_processor = DrawingProcessor()
+    return _drawing_processor
+
+def get_enhanced_drawing_processor() -> EnhancedDrawingProcessor:
+    """The full analysis pipeline (detection, scene, colors, safety)"""
+    global _enhanced_processor
+    if _enhanced_processor is None:
+        _enhanced_processor = EnhancedDrawingProcessor()
+    return _enhanced_processor
+
+async def _to_drawing(image_data: bytes, analysis: Dict, child_id: str) -> DrawingCreate:
+    """Store the image (once per distinct upload) and build the drawing record"""
+    blob_store = get_blob_store()
+    ref = await blob_store.ingest(image_data)
+    return DrawingCreate(
+        child_id=child_id,
+        image_url=blob_store.url(ref),
+        thumbnail_urls=blob_store.thumbnail_urls(ref),
+        detected_objects=analysis['objects'],
+        scene_type=analysis['scene_type']
+    )
+
+async def create_drawing(file: UploadFile, child_id: str) -> Drawing:
+    # Refused uploads keep their UploadError so the API can answer 4xx
+    with await ingest_upload(file) as upload:
+        try:
+            analysis = await get_drawing_processor().process_image(upload)
+            drawing = await _to_drawing(upload, analysis, child_id)
+            return await get_drawing_repository().insert(drawing)
+        except Exception as e:
+            raise Exception(f"Error creating drawing: {str(e)}")
+
+async def create_drawings(files: List[UploadFile], child_id: str) -> Dict:
+    """
+    Analyze a batch of uploads concurrently and store every successful
+    one with a single bulk insert; failed uploads are reported per file.
+    """
+    names = [upload.filename or str(i) for i, upload in enumerate(files)]
+    processor = get_drawing_processor()
+    analyzed: Dict[str, DrawingCreate] = {}
+    errors = []
+
+    async def analyze(image_data: bytes):
+        return image_data, await processor.process_image(image_data)
+
+    async for line in process_bulk(
+        analyze, upload_items(files, None, settings.BULK_MAX_FILE_BYTES),
+        settings.BULK_MAX_CONCURRENCY
+    ):
+        if line['status'] != 'ok':
+            errors.append({'file': line['id'], 'error': line['error']})
+            continue
+        image_data, analysis = line['result']
+        try:
+            analyzed[line['id']] = await _to_drawing(image_data, analysis, child_id)
+        except ValueError as e:
+            errors.append({'file': line['id'], 'error': str(e)})
+
+    # Keep upload order in the response
+    drawings = [analyzed[name] for name in names if name in analyzed]
+    try:
+        stored = await get_drawing_repository().insert_many(drawings)
+    except Exception as e:
+        raise Exception(f"Error creating drawings: {str(e)}")
+    return {'drawings': stored, 'errors': errors}
+
+async def get_drawing(drawing_id: str) -> Optional[Drawing]:
+    return await get_drawing_repository().get(drawing_id)
+
+async def list_drawings(child_id: str, limit: Optional[int] = None,
+                        cursor: Optional[str] = None) -> DrawingPage:
+    """One page of a child's drawings, newest first; ValueError on a bad cursor"""
+    limit = min(max(limit or settings.DRAWINGS_PAGE_SIZE, 1), settings.DRAWINGS_MAX_PAGE_SIZE)
+    return await get_drawing_repository().list_for_child(child_id, limit, cursor)
+
+async def save_story(drawing_id: str, story: Dict, style: str = 'default') -> Story:
+    return await get_story_repository().insert(StoryCreate(
+        drawing_id=drawing_id,
+        narrative=story['narrative'],
+        style=style,
+        sound_effects=story.get('sound_effects', []),
+        animations=story.get('animations', [])
+    ))
+
+async def list_stories(drawing_id: str) -> List[Dict]:
+    return await get_story_repository().list_for_drawing(drawing_id)
@@ -0,0 +1,96 @@
+# backend/app/services/generation_profiles.py
+"""
+Named decoding profiles for story generation.
+
+A profile picks the decoding strategy per request instead of paying for
+beam search every time:
+
+    instant   greedy, one short story
+    standard  sampling (temperature/top-p), one sample per candidate
+    premium   beam search, the best beams are the candidates
+
+The strategy of a profile never changes with other settings. Each
+profile has a latency budget, counted from when decoding starts. Decoding
+is watched by a wall-clock stopping criterion: in the last part of the
+budget it ends at the next sentence boundary, at the budget itself it
+ends regardless.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+
+PROFILE_NAMES = ('instant', 'standard', 'premium')
+
+@dataclass
+class GenerationProfile:
+    name: str
+    # model.generate() keyword arguments
+    settings: Dict = field(default_factory=dict)
+    # Wall-clock budget for decoding, 0 for none
+    budget_ms: float = 0.0
+
+    @property
+    def deterministic(self) -> bool:
+        """Same prompt, same story (greedy or beam search)"""
+        return not self.settings.get('do_sample', False)
+
+def build_profiles(candidates: int, budgets: Dict[str, float]) -> Dict[str, GenerationProfile]:
+    """The profiles for `candidates` stories per request and ms budgets by name"""
+    candidates = max(1, candidates)
+    profiles = {
+        'instant': {
+            'max_length': 120,
+            'num_beams': 1,
+            'num_return_sequences': 1,
+            'no_repeat_ngram_size': 2
+        },
+        'standard': {
+            'max_length': 200,
+            'do_sample': True,
+            'temperature': 0.7,
+            'top_p': 0.9,
+            'num_beams': 1,
+            'num_return_sequences': candidates,
+            'no_repeat_ngram_size': 2
+        },
+        'premium': {
+            'max_length': 200,
+            # Every returned candidate is one of the beams
+            'num_beams': max(4, candidates),
+            'num_return_sequences': candidates,
+            'no_repeat_ngram_size': 2,
+            'early_stopping': True
+        }
+    }
+    return {
+        name: GenerationProfile(name, generation_settings, float(budgets.get(name, 0)))
+        for name, generation_settings in profiles.items()
+    }
+
+def sentence_end_ids(vocab: Dict[str, int]) -> Set[int]:
+    """Ids of the tokens that end a sentence ('.', '▁happy!', ...)"""
+    return {
+        token_id for token, token_id in vocab.items()
+        if token.rstrip('"\')').endswith(('.', '!', '?'))
+    }
+
+class Deadline:
+    """
+    Wall-clock budget of one generation. Past `soft_at` a sentence end is
+    a good place to stop; past `hard_at` decoding stops anyway.
+    """
+
+    def __init__(self, budget_ms: float, sentence_window: float = 0.2,
+                 start: Optional[float] = None):
+        start = time.monotonic() if start is None else start
+        self.hard_at = start + budget_ms / 1000
+        self.soft_at = start + budget_ms * (1 - sentence_window) / 1000
+        self.cut_short = False
+
+    def should_stop(self, last_token_ids: Iterable[int], stop_ids: Set[int]) -> bool:
+        now = time.monotonic()
+        if now < self.soft_at:
+            return False
+        if now >= self.hard_at or any(token_id in stop_ids for token_id in last_token_ids):
+            self.cut_short = True
+        return self.cut_short
@@ -0,0 +1,85 @@
+# backend/app/services/inference.py
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Tuple
+import torch
+from app.core.config import settings
+from app.core.metrics import INFERENCE_IN_FLIGHT
+
+def _run_in_inference_mode(fn: Callable, args: Tuple, kwargs: Dict) -> Any:
+    # inference_mode is thread-local, so it has to be entered on the worker
+    with torch.inference_mode():
+        return fn(*args, **kwargs)
+
+class InferenceExecutor:
+    """
+    Run blocking model calls off the asyncio event loop.
+
+    `kind` is either 'thread' or 'process'. Thread pools suit torch, spaCy
+    and TextBlob calls, which release the GIL for most of their work and
+    can share the already-loaded models. Process pools need a picklable,
+    module-level callable that brings its own model into the worker.
+    """
+
+    def __init__(self, kind: str = 'thread', max_workers: int = 1, name: str = 'inference'):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        
+        self.kind = kind
+        self.max_workers = max_workers
+        self.name = name
+        self._pool: Executor = self._create_pool()
+        
+    def _create_pool(self) -> Executor:
+        if self.kind == 'process':
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"{self.name}-inference"
+        )
+    
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` under torch.inference_mode() in the pool"""
+        loop = asyncio.get_running_loop()
+        in_flight = INFERENCE_IN_FLIGHT.labels(self.name)
+        in_flight.inc()
+        try:
+            return await loop.run_in_executor(
+                self._pool, partial(_run_in_inference_mode, fn, args, kwargs)
+            )
+        finally:
+            in_flight.dec()
+    
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+_executors: Dict[str, InferenceExecutor] = {}
+
+def get_executor(model_name: str) -> InferenceExecutor:
+    """
+    Return the shared executor configured for a model.
+
+    The shared pools run methods of the already-loaded services (e.g. the
+    story generator's `_generate_within`), which would pickle their models
+    into every call, so they must be thread pools. Process pools are for
+    an InferenceExecutor used directly with a module-level callable.
+    """
+    if model_name not in _executors:
+        kind, max_workers = settings.INFERENCE_POOLS.get(
+            model_name,
+            (settings.INFERENCE_DEFAULT_POOL, settings.INFERENCE_DEFAULT_WORKERS)
+        )
+        if kind == 'process':
+            raise ValueError(
+                f"Inference pool '{model_name}' runs methods of loaded models and "
+                f"needs kind 'thread', not 'process' (INFERENCE_POOLS)"
+            )
+        _executors[model_name] = InferenceExecutor(kind, max_workers, name=model_name)
+    return _executors[model_name]
+
+def shutdown_executors(wait: bool = True):
+    """Shut down every executor created by get_executor"""
+    for executor in _executors.values():
+        executor.shutdown(wait=wait)
+    _executors.clear()
@@ -0,0 +1,136 @@
+# backend/app/services/ingestion.py
+"""
+Bounded intake of uploaded images.
+
+An upload is copied in chunks into a spooled temp file (memory up to
+UPLOAD_SPOOL_BYTES, disk beyond), so a worker never holds more than one
+chunk plus the spool. The format is sniffed from the first chunk and the
+copy stops at the byte limit; then the image header alone is parsed to
+check the format and pixel count. Everything is rejected before a full
+decode, each with the HTTP status the API should answer with.
+"""
+import asyncio
+import io
+import tempfile
+from typing import IO, Optional, Tuple, Union
+from PIL import Image
+from app.core.config import settings
+
+# Leading bytes of each accepted format, by PIL format name
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP'),
+)
+SNIFF_BYTES = 12
+
+ImageSource = Union[bytes, IO[bytes]]
+
+class UploadError(ValueError):
+    """An upload refused before decoding; `status_code` is the HTTP answer"""
+    status_code = 400
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+
+class UnsupportedImageFormat(UploadError):
+    status_code = 415
+
+class ImageDimensionsTooLarge(UploadError):
+    status_code = 413
+
+class InvalidImage(UploadError):
+    status_code = 422
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """PIL format name for the first bytes of a file, None if unrecognized"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    for signature, image_format in SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
+
+def _check_format(image_format: Optional[str]):
+    if image_format is None or image_format not in settings.UPLOAD_FORMATS:
+        raise UnsupportedImageFormat(
+            f"Unsupported image format; expected one of {', '.join(settings.UPLOAD_FORMATS)}"
+        )
+
+def _too_large(max_bytes: int) -> UploadTooLarge:
+    return UploadTooLarge(f"File is larger than {max_bytes} bytes")
+
+async def spool_upload(upload, max_bytes: Optional[int] = None,
+                       chunk_size: Optional[int] = None) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy an UploadFile into a spooled buffer, sniffing its format from the
+    first chunk and stopping at `max_bytes`. The buffer is rewound.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+    # The multipart parser knows the size already; no need to copy anything
+    if getattr(upload, 'size', None) and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_BYTES)
+    try:
+        total = 0
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            if total == 0:
+                _check_format(sniff_format(chunk[:SNIFF_BYTES]))
+            total += len(chunk)
+            if total > max_bytes:
+                raise _too_large(max_bytes)
+            spool.write(chunk)
+        if total == 0:
+            raise InvalidImage("Empty upload")
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+
+def inspect_image(source: ImageSource, max_pixels: Optional[int] = None) -> Tuple[str, Tuple[int, int]]:
+    """
+    Format and (width, height) read from the image header only; raises an
+    UploadError for unsupported, corrupt or too many pixels.
+    """
+    max_pixels = max_pixels or settings.UPLOAD_MAX_PIXELS
+    fileobj = io.BytesIO(source) if isinstance(source, bytes) else source
+    start = fileobj.tell()
+    _check_format(sniff_format(fileobj.read(SNIFF_BYTES)))
+    fileobj.seek(start)
+    try:
+        # Lazy: parses the header, the pixel data is left alone
+        with Image.open(fileobj) as image:
+            image_format, size = image.format, image.size
+    except Image.DecompressionBombError:
+        raise ImageDimensionsTooLarge(f"Image has more than {max_pixels} pixels")
+    except Exception:
+        raise InvalidImage("File is not a readable image")
+    finally:
+        fileobj.seek(start)
+
+    _check_format(image_format)
+    width, height = size
+    if width * height > max_pixels:
+        raise ImageDimensionsTooLarge(
+            f"Image is {width}x{height}, more than {max_pixels} pixels"
+        )
+    return image_format, size
+
+async def ingest_upload(upload, max_bytes: Optional[int] = None,
+                        max_pixels: Optional[int] = None) -> tempfile.SpooledTemporaryFile:
+    """Spool and header-check an upload; the caller closes the returned buffer"""
+    spool = await spool_upload(upload, max_bytes)
+    try:
+        await asyncio.to_thread(inspect_image, spool, max_pixels)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
@@ -0,0 +1,407 @@
+# backend/app/services/job_queue.py
+import abc
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class QueueFullError(Exception):
+    """Raised by `submit` when the backlog is at its limit"""
+
+    def __init__(self, depth: int, retry_after: int):
+        super().__init__(f"Job queue is full ({depth} jobs waiting)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+class JobQueue(abc.ABC):
+    """
+    Storage for jobs and their results.
+
+    Jobs are dicts with `id`, `status`, `payload`, `result`, `error`,
+    `created`, `started` and `finished`. `put` checks the backlog limit
+    and enqueues in one step, and `claim` atomically moves the oldest
+    queued job to running. Implementations are thread-safe; `blocking`
+    tells callers whether operations touch the disk and should run off
+    the event loop.
+    """
+
+    blocking = False
+
+    @abc.abstractmethod
+    def put(self, job_id: str, payload: Dict, now: float,
+            max_depth: Optional[int] = None) -> bool:
+        """Queue a job unless `max_depth` jobs are already waiting; False if refused"""
+
+    @abc.abstractmethod
+    def claim(self, now: float) -> Optional[Tuple[str, Dict]]:
+        """Move the oldest queued job to running and return its id and payload"""
+
+    @abc.abstractmethod
+    def finish(self, job_id: str, status: str, result: Any, error: Optional[str],
+               now: float):
+        """Record the outcome of a running job"""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        """The job, or None if it is unknown or was pruned"""
+
+    @abc.abstractmethod
+    def depth(self) -> int:
+        """Number of jobs waiting to be claimed"""
+
+    @abc.abstractmethod
+    def prune(self, older_than: float):
+        """Drop finished jobs that finished before `older_than`"""
+
+class InMemoryJobQueue(JobQueue):
+    """Process-local queue; jobs are lost on restart"""
+
+    def __init__(self):
+        self._jobs: OrderedDict = OrderedDict()
+        self._queued: deque = deque()
+        self._lock = threading.Lock()
+
+    def put(self, job_id: str, payload: Dict, now: float,
+            max_depth: Optional[int] = None) -> bool:
+        with self._lock:
+            if max_depth is not None and len(self._queued) >= max_depth:
+                return False
+            self._jobs[job_id] = {
+                'id': job_id, 'status': QUEUED, 'payload': payload,
+                'result': None, 'error': None,
+                'created': now, 'started': None, 'finished': None
+            }
+            self._queued.append(job_id)
+            return True
+
+    def claim(self, now: float) -> Optional[Tuple[str, Dict]]:
+        with self._lock:
+            if not self._queued:
+                return None
+            job = self._jobs[self._queued.popleft()]
+            job['status'] = RUNNING
+            job['started'] = now
+            return job['id'], job['payload']
+
+    def finish(self, job_id: str, status: str, result: Any, error: Optional[str],
+               now: float):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error, finished=now)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def prune(self, older_than: float):
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['finished'] is not None and job['finished'] < older_than]:
+                del self._jobs[job_id]
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue persisted in a SQLite file, so queued jobs and finished results
+    survive restarts. Jobs that were running when the process stopped are
+    queued again on open.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL,"
+            " result TEXT, error TEXT,"
+            " created REAL NOT NULL, started REAL, finished REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)"
+        )
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, started = NULL WHERE status = ?", (QUEUED, RUNNING)
+        )
+        self._lock = threading.Lock()
+
+    def put(self, job_id: str, payload: Dict, now: float,
+            max_depth: Optional[int] = None) -> bool:
+        with self._lock:
+            # IMMEDIATE holds the write lock from the count to the insert,
+            # so concurrent submitters (and processes) can't overshoot the limit
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                depth = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+                ).fetchone()[0]
+                accepted = max_depth is None or depth < max_depth
+                if accepted:
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, status, payload, created) VALUES (?, ?, ?, ?)",
+                        (job_id, QUEUED, json.dumps(payload), now)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return accepted
+
+    def claim(self, now: float) -> Optional[Tuple[str, Dict]]:
+        with self._lock:
+            # IMMEDIATE takes the write lock, so other processes can't claim the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                    (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, started = ? WHERE id = ?",
+                        (RUNNING, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def finish(self, job_id: str, status: str, result: Any, error: Optional[str],
+               now: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, payload, result, error, created, started, finished"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0], 'status': row[1], 'payload': json.loads(row[2]),
+            'result': json.loads(row[3]) if row[3] is not None else None,
+            'error': row[4], 'created': row[5], 'started': row[6], 'finished': row[7]
+        }
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+
+    def prune(self, older_than: float):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (older_than,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JobService:
+    """
+    Run submitted jobs on a pool of local async workers.
+
+    `submit` stores the payload and returns a job id immediately; each of
+    `workers` worker tasks claims the oldest queued job and awaits
+    `handler(payload)`. Once `max_depth` jobs are waiting, `submit` raises
+    `QueueFullError` with a Retry-After estimate (backlog per worker times
+    the recent average run time) instead of letting latency pile up.
+    Finished jobs are dropped `result_ttl_seconds` after they finish, on
+    a timer that runs every `prune_seconds` whether or not workers idle.
+    """
+
+    def __init__(self, handler: Callable[[Dict], Awaitable[Any]], queue: JobQueue,
+                 workers: int = 2, max_depth: int = 100,
+                 result_ttl_seconds: float = 3600, poll_seconds: float = 1.0,
+                 prune_seconds: float = 60.0):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.handler = handler
+        self.queue = queue
+        self.workers = workers
+        self.max_depth = max_depth
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_seconds = poll_seconds
+        self.prune_seconds = prune_seconds
+
+        self.stats = {
+            'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0,
+            'running': 0, 'wait_ms': [], 'run_ms': []
+        }
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        # Long polls wait for any job to finish, then re-read their own
+        self._job_finished = asyncio.Condition()
+        self._finished_count = 0
+
+    @classmethod
+    def from_settings(cls, handler: Callable[[Dict], Awaitable[Any]],
+                      settings) -> 'JobService':
+        if settings.STORY_JOB_QUEUE == 'sqlite':
+            queue = SQLiteJobQueue(settings.STORY_JOB_DB_PATH)
+        elif settings.STORY_JOB_QUEUE == 'memory':
+            queue = InMemoryJobQueue()
+        else:
+            raise ValueError(f"Unknown job queue: {settings.STORY_JOB_QUEUE}")
+        return cls(
+            handler, queue,
+            workers=settings.STORY_JOB_WORKERS,
+            max_depth=settings.STORY_JOB_MAX_DEPTH,
+            result_ttl_seconds=settings.STORY_JOB_RESULT_TTL_SECONDS
+        )
+
+    async def start(self):
+        """Start the worker tasks on the running loop"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._pruner()))
+
+    async def stop(self):
+        """Cancel the workers; running jobs are queued again by persistent queues"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: Dict) -> str:
+        """Queue a job, raising `QueueFullError` if the backlog is full"""
+        job_id = uuid.uuid4().hex
+        if not await self._call(self.queue.put, job_id, payload, time.time(), self.max_depth):
+            self.stats['rejected'] += 1
+            depth = await self._call(self.queue.depth)
+            raise QueueFullError(depth, self._retry_after(depth))
+        self.stats['submitted'] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str, wait: float = 0) -> Optional[Dict]:
+        """Return a job, long-polling up to `wait` seconds for it to finish"""
+        deadline = time.monotonic() + wait
+        while True:
+            seen = self._finished_count
+            job = await self._call(self.queue.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or remaining <= 0 or job['status'] in (DONE, FAILED):
+                return job
+            # Jobs finished by other processes only show up by polling
+            async with self._job_finished:
+                try:
+                    await asyncio.wait_for(
+                        self._job_finished.wait_for(lambda: self._finished_count != seen),
+                        min(remaining, self.poll_seconds)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    async def get_stats(self) -> Dict:
+        """Return queue depth, job counters and wait/run time percentiles"""
+        stats = {key: value for key, value in self.stats.items()
+                 if key not in ('wait_ms', 'run_ms')}
+        return {
+            **stats,
+            'depth': await self._call(self.queue.depth),
+            'max_depth': self.max_depth,
+            'workers': self.workers,
+            'wait_ms': self._summarize(self.stats['wait_ms']),
+            'run_ms': self._summarize(self.stats['run_ms'])
+        }
+
+    async def _worker(self):
+        while True:
+            claimed = await self._call(self.queue.claim, time.time())
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    # Persistent queues can be fed by other processes, so poll too
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, payload = claimed
+            await self._run(job_id, payload)
+
+    async def _pruner(self):
+        while True:
+            await asyncio.sleep(self.prune_seconds)
+            await self._call(self.queue.prune, time.time() - self.result_ttl_seconds)
+
+    async def _run(self, job_id: str, payload: Dict):
+        job = await self._call(self.queue.get, job_id)
+        started = time.time()
+        self._record('wait_ms', (started - job['created']) * 1000)
+        self.stats['running'] += 1
+
+        try:
+            result = await self.handler(payload)
+            await self._call(self.queue.finish, job_id, DONE, result, None, time.time())
+            self.stats['completed'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._call(self.queue.finish, job_id, FAILED, None, str(e), time.time())
+            self.stats['failed'] += 1
+        finally:
+            self.stats['running'] -= 1
+            self._record('run_ms', (time.time() - started) * 1000)
+            async with self._job_finished:
+                self._finished_count += 1
+                self._job_finished.notify_all()
+
+    def _retry_after(self, depth: int) -> int:
+        run_ms = self.stats['run_ms']
+        average_seconds = sum(run_ms) / len(run_ms) / 1000 if run_ms else 1.0
+        return max(1, math.ceil(depth / self.workers * average_seconds))
+
+    def _record(self, key: str, value: float):
+        # Keep a bounded window of recent samples
+        samples = self.stats[key]
+        samples.append(value)
+        del samples[:-1000]
+
+    @staticmethod
+    def _summarize(samples: List[float]) -> Dict:
+        ordered = sorted(samples)
+        return {
+            'count': len(ordered),
+            'mean': sum(ordered) / len(ordered) if ordered else None,
+            'p50': ordered[len(ordered) // 2] if ordered else None,
+            'p95': ordered[int(len(ordered) * 0.95)] if ordered else None
+        }
+
+    async def _call(self, fn: Callable, *args):
+        if self.queue.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
@@ -1,20 +1,106 @@
 # backend/app/services/ml_models.py
 from transformers import (
     DetrImageProcessor, DetrForObjectDetection,
-    T5Tokenizer, T5ForConditionalGeneration,
+    T5Tokenizer, T5TokenizerFast, T5ForConditionalGeneration,
     ViTImageProcessor, ViTForImageClassification,
     pipeline
 )
+import asyncio
 import torch
+import spacy
 from PIL import Image
 import io
-from typing import Dict, List, Any
+import os
+import threading
+import time
+from typing import Any, Awaitable, Dict, List
 import numpy as np
+from functools import partial
+from app.core.config import settings
+from app.core.metrics import (
+    DETECTION_CASCADE_LATENCY, DETECTION_CASCADE_PATHS, stage_timer, timed
+)
+from app.services.backends import create_backend
+from app.services.batching import BatchScheduler
+from app.services.inference import get_executor
+from app.services.preprocessing import ImagePreprocessor, PreprocessedImage, pad_pixel_batch
+from app.services.result_cache import DrawingResultCache
+from app.utils.lexicon import get_lexicon
+
+def run_detr_batch(processor, model, images: List,
+                   threshold: float = 0.7) -> List[List[Dict]]:
+    """Run one padded DETR forward pass over a batch of images"""
+    prepared = [
+        image if isinstance(image, PreprocessedImage) else PreprocessedImage(image, image.size)
+        for image in images
+    ]
+    
+    # Each image is normalized once; the batch is zero-padded with a pixel_mask
+    with stage_timer('detr_preprocess'):
+        inputs = pad_pixel_batch([
+            image.tensor('detr', lambda im: processor(images=im, return_tensors="pt")['pixel_values'])
+            for image in prepared
+        ])
+    with stage_timer('detr_forward'):
+        outputs = model(**inputs)
+    
+    # Post-process each image against its original upload size
+    with stage_timer('detr_postprocess'):
+        target_sizes = torch.tensor([image.original_size[::-1] for image in prepared])
+        results = processor.post_process_object_detection(
+            outputs, target_sizes=target_sizes, threshold=threshold
+        )
+        return [format_detections(result, model.config.id2label) for result in results]
+
+def format_detections(results: Dict, id2label: Dict) -> List[Dict]:
+    """Convert post-processed DETR tensors into detection dicts"""
+    # One bulk conversion per tensor instead of .item() per value
+    scores = results["scores"].tolist()
+    labels = results["labels"].tolist()
+    boxes = results["boxes"].tolist()
+    return [
+        {
+            'name': id2label[label],
+            'confidence': score,
+            'box': {'x': x0, 'y': y0, 'width': x1 - x0, 'height': y1 - y0}
+        }
+        for score, label, (x0, y0, x1, y1) in zip(scores, labels, boxes)
+    ]
+
+def resident_memory() -> int:
+    """Current resident set size of this process in bytes (0 if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _parameter_bytes(model) -> int:
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in list(model.parameters()) + list(model.buffers())
+    )
 
 class ModelManager:
+    """
+    Process-wide model registry.
+
+    Each entry in `model_configs` is loaded at most once, lazily on the
+    first `get()` or eagerly through `preload()`, and shared by every
+    service. Load time and memory are recorded per model.
+    
+    Torch models are wrapped in the inference backend named by the entry's
+    'backend' key ('eager', 'int8', 'bf16' or 'onnx'), which can be
+    overridden per model through MODEL_BACKENDS.
+    """
+    
     def __init__(self):
         self.models = {}
-        self.processors = {}
+        self.load_stats = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
         self._initialize_models()
         
     def _initialize_models(self):
@@ -24,28 +110,161 @@ class ModelManager:
                 'detr': {
                     'model_id': "facebook/detr-resnet-50",
                     'processor': DetrImageProcessor,
-                    'model': DetrForObjectDetection
+                    'model': DetrForObjectDetection,
+                    'backend': 'eager',
+                    'onnx_options': {
+                        'input_names': ['pixel_values', 'pixel_mask'],
+                        'output_names': ['logits', 'pred_boxes'],
+                        'image_size': 800
+                    }
                 },
                 'yolo': {
                     'pipeline': 'object-detection',
-                    'model_id': 'hustvl/yolos-tiny'
+                    'model_id': 'hustvl/yolos-tiny',
+                    'backend': 'eager',
+                    'onnx_options': {
+                        'output_names': ['logits', 'pred_boxes'],
+                        'image_size': 512
+                    }
                 }
             },
             'scene_classification': {
                 'vit': {
                     'model_id': 'google/vit-base-patch16-224',
                     'processor': ViTImageProcessor,
-                    'model': ViTForImageClassification
+                    'model': ViTForImageClassification,
+                    'backend': 'eager'
                 }
             },
             'story_generation': {
                 't5': {
                     'model_id': 't5-base',
-                    'tokenizer': T5Tokenizer,
-                    'model': T5ForConditionalGeneration
+                    # The SentencePiece tokenizer is several times slower
+                    'tokenizer': T5TokenizerFast if settings.T5_FAST_TOKENIZER else T5Tokenizer,
+                    'model': T5ForConditionalGeneration,
+                    'backend': 'eager'
+                }
+            },
+            'nlp': {
+                'spacy': {
+                    'model_id': 'en_core_web_sm',
+                    'loader': spacy.load
                 }
             }
         }
+    
+    def get(self, task: str, name: str) -> Dict[str, Any]:
+        """Return the loaded bundle for a model, loading it on first use"""
+        key = (task, name)
+        if key in self.models:
+            return self.models[key]
+        
+        with self._get_lock(key):
+            # Another thread may have finished loading while we waited
+            if key not in self.models:
+                self.models[key] = self._load(task, name)
+        return self.models[key]
+    
+    def preload(self, model_keys: List[str]):
+        """Eagerly load models given as 'task.name' strings"""
+        for model_key in model_keys:
+            task, name = model_key.split('.', 1)
+            self.get(task, name)
+    
+    def is_loaded(self, task: str, name: str) -> bool:
+        return (task, name) in self.models
+    
+    def get_stats(self) -> Dict:
+        """Per-model load time and memory, plus current process RSS"""
+        return {
+            'models': {
+                f"{task}.{name}": stats
+                for (task, name), stats in self.load_stats.items()
+            },
+            'resident_memory_bytes': resident_memory()
+        }
+    
+    def _get_lock(self, key) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+    
+    def _load(self, task: str, name: str) -> Dict[str, Any]:
+        try:
+            config = self.model_configs[task][name]
+        except KeyError:
+            raise ValueError(f"Unknown model: {task}.{name}")
+        
+        rss_before = resident_memory()
+        start = time.perf_counter()
+        
+        model_id = config['model_id']
+        if 'loader' in config:
+            # Custom loaders return either a model or a ready bundle
+            loaded = config['loader'](model_id)
+            bundle = loaded if isinstance(loaded, dict) else {'model': loaded}
+        elif 'pipeline' in config:
+            bundle = {'pipeline': pipeline(config['pipeline'], model=model_id)}
+            bundle['model'] = bundle['pipeline'].model
+        elif 'tokenizer' in config:
+            bundle = {
+                'tokenizer': config['tokenizer'].from_pretrained(model_id),
+                'model': config['model'].from_pretrained(model_id)
+            }
+        else:
+            bundle = {
+                'processor': config['processor'].from_pretrained(model_id),
+                'model': config['model'].from_pretrained(model_id)
+            }
+        
+        module = bundle['model']
+        if isinstance(module, torch.nn.Module):
+            module.eval()
+            backend = self._get_backend_name(task, name)
+            bundle['model'] = create_backend(
+                backend, module, **self._get_backend_options(backend, config)
+            )
+            if 'pipeline' in bundle:
+                bundle['pipeline'].model = bundle['model']
+            module = bundle['model'].module()
+        
+        self.load_stats[(task, name)] = {
+            'model_id': model_id,
+            'backend': getattr(bundle['model'], 'name', None),
+            'load_seconds': time.perf_counter() - start,
+            'rss_delta_bytes': max(resident_memory() - rss_before, 0),
+            'parameter_bytes': _parameter_bytes(module)
+        }
+        return bundle
+    
+    def _get_backend_name(self, task: str, name: str) -> str:
+        return settings.MODEL_BACKENDS.get(
+            f"{task}.{name}",
+            self.model_configs[task][name].get('backend', 'eager')
+        )
+    
+    @staticmethod
+    def _get_backend_options(backend: str, config: Dict) -> Dict:
+        if backend != 'onnx':
+            return {}
+        return {'model_id': config['model_id'], **config.get('onnx_options', {})}
+
+_model_manager = None
+_model_manager_lock = threading.Lock()
+
+def get_model_manager() -> ModelManager:
+    """Return the process-wide ModelManager"""
+    global _model_manager
+    if _model_manager is None:
+        with _model_manager_lock:
+            if _model_manager is None:
+                _model_manager = ModelManager()
+    return _model_manager
+
+def set_model_manager(manager: ModelManager):
+    """Replace the process-wide ModelManager (tests and offline benchmarks)"""
+    global _model_manager
+    with _model_manager_lock:
+        _model_manager = manager
 
 class EnhancedDrawingProcessor:
     def __init__(self):
@@ -55,19 +274,46 @@ class EnhancedDrawingProcessor:
         }
         self.scene_classifier = self._load_scene_classifier()
         self.color_analyzer = ColorAnalyzer()
+        self.preprocessor = ImagePreprocessor(max_pixels=settings.UPLOAD_MAX_PIXELS)
+        
+        # Concurrent requests share batched DETR and ViT forward passes
+        detr = self.object_detection_models['detr']
+        self.detr_batcher = BatchScheduler(
+            partial(run_detr_batch, detr['processor'], detr['model']),
+            max_batch_size=settings.DETECTION_MAX_BATCH_SIZE,
+            max_wait_ms=settings.DETECTION_MAX_WAIT_MS,
+            executor=get_executor('detr'),
+            name='detr'
+        )
+        self.scene_batcher = BatchScheduler(
+            self._classify_scene_batch,
+            max_batch_size=settings.SCENE_MAX_BATCH_SIZE,
+            max_wait_ms=settings.SCENE_MAX_WAIT_MS,
+            executor=get_executor('vit'),
+            name='vit'
+        )
+        
+        # Resubmitted drawings skip the models entirely
+        self.result_cache = (
+            DrawingResultCache.from_settings(settings)
+            if settings.RESULT_CACHE_ENABLED else None
+        )
+        
+        # Escalation counters and per-path latency of cascade detection
+        self.cascade_stats = {
+            'requests': 0,
+            'escalations': 0,
+            'latency_ms': {'fast': [], 'escalated': []}
+        }
         
     def _load_detr_model(self):
-        processor = DetrImageProcessor.from_pretrained("facebook/detr-resnet-50")
-        model = DetrForObjectDetection.from_pretrained("facebook/detr-resnet-50")
-        return {'processor': processor, 'model': model}
+        return get_model_manager().get('object_detection', 'detr')
     
     def _load_yolo_model(self):
-        return pipeline('object-detection', model='hustvl/yolos-tiny')
+        return get_model_manager().get('object_detection', 'yolo')['pipeline']
     
     def _load_scene_classifier(self):
-        processor = ViTImageProcessor.from_pretrained('google/vit-base-patch16-224')
-        model = ViTForImageClassification.from_pretrained('google/vit-base-patch16-224')
-        return {'processor': processor, 'model': model}
+        return get_model_manager().get('scene_classification', 'vit')
     
     async def process_image(self, image_data: bytes, 
                           detection_model: str = 'detr') -> Dict:
@@ -75,114 +321,239 @@ class EnhancedDrawingProcessor:
         Process image using multiple models for comprehensive analysis
         """
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_data))
+            # Decode once, at reduced size, for every analyzer below
+            image = await get_executor('preprocess').run(
+                timed('decode', self.preprocessor.decode), image_data
+            )
             
-            # Process with selected object detection model
-            objects = await self._detect_objects(image, detection_model)
+            cache_namespace = f"enhanced:{detection_model}"
+            if self.result_cache is not None:
+                cache_keys = await get_executor('cache').run(
+                    timed('cache_keys', self.result_cache.compute_keys),
+                    image.image, image.original_size
+                )
+                # The result carries a safety verdict, which only holds for
+                # the same pixels: a near-duplicate may have a knife drawn in
+                cached, _ = self.result_cache.lookup(
+                    cache_keys, namespace=cache_namespace, exact_only=True
+                )
+                if cached is not None:
+                    return cached
             
-            # Analyze scene
-            scene_info = await self._analyze_scene(image)
+            # Detection, scene and colors are independent, so they run
+            # concurrently, each against its own deadline
+            degraded: List[str] = []
+            objects_task = asyncio.create_task(self._run_stage(
+                'objects', self._detect_objects(image, detection_model),
+                settings.DETECTION_TIMEOUT_SECONDS, [], degraded
+            ))
+            scene_task = asyncio.create_task(self._run_stage(
+                'scene', self._analyze_scene(image),
+                settings.SCENE_TIMEOUT_SECONDS, self._get_fallback_scene(image), degraded
+            ))
+            colors_task = asyncio.create_task(self._run_stage(
+                'colors', get_executor('color').run(
+                    timed('color_analysis', self.color_analyzer.analyze), image
+                ),
+                settings.COLOR_TIMEOUT_SECONDS, None, degraded
+            ))
             
-            # Analyze colors
-            color_info = self.color_analyzer.analyze(image)
+            try:
+                # Composition only needs the objects; safety also needs the scene
+                objects = await objects_task
+                composition = self._analyze_composition(objects)
+                scene_info = await scene_task
+                safety = self._check_content_safety(objects, scene_info)
+                color_info = await colors_task
+            except BaseException:
+                for task in (objects_task, scene_task, colors_task):
+                    task.cancel()
+                raise
+            
+            if 'objects' in degraded or 'scene' in degraded:
+                # Unchecked content is never reported as safe
+                safety['is_safe'] = False
+                safety['recommendations'].append(
+                    "Safety check incomplete: analysis timed out, please try again"
+                )
             
             # Combine all analysis
-            return {
+            result = {
                 'objects': objects,
                 'scene': scene_info,
                 'colors': color_info,
-                'composition': self._analyze_composition(objects),
-                'safe_for_children': self._check_content_safety(objects, scene_info)
+                'composition': composition,
+                'safe_for_children': safety,
+                'degraded': sorted(degraded)
             }
             
+            if degraded:
+                # Partial results are not cached, so a retry gets the full analysis
+                return result
+            
+            if self.result_cache is not None:
+                self.result_cache.put(cache_keys, result, namespace=cache_namespace)
+            
+            return result
+            
         except Exception as e:
             raise Exception(f"Error processing image: {str(e)}")
     
-    async def _detect_objects(self, image: Image, model: str = 'detr') -> List[Dict]:
+    async def _run_stage(self, name: str, stage: Awaitable, timeout: float,
+                         fallback: Any, degraded: List[str]) -> Any:
+        """Await one analysis stage, returning `fallback` if it misses its deadline"""
+        try:
+            return await asyncio.wait_for(stage, timeout)
+        except asyncio.TimeoutError:
+            degraded.append(name)
+            return fallback
+    
+    def _get_fallback_scene(self, image: PreprocessedImage) -> Dict:
+        """Scene placeholder used when classification times out"""
+        return {
+            'scene_type': 'unknown',
+            'confidence': 0.0,
+            'attributes': {'size': image.original_size}
+        }
+    
+    async def _detect_objects(self, image: PreprocessedImage,
+                              model: str = 'detr') -> List[Dict]:
         """Detect objects using specified model"""
         if model == 'detr':
             return await self._detect_with_detr(image)
         elif model == 'yolo':
             return await self._detect_with_yolo(image)
+        elif model == 'cascade':
+            return await self._detect_with_cascade(image)
         else:
             raise ValueError(f"Unknown detection model: {model}")
     
-    async def _detect_with_detr(self, image: Image) -> List[Dict]:
+    async def _detect_with_detr(self, image: PreprocessedImage) -> List[Dict]:
         """Detect objects using DETR model"""
-        processor = self.object_detection_models['detr']['processor']
-        model = self.object_detection_models['detr']['model']
-        
-        # Process image
-        inputs = processor(images=image, return_tensors="pt")
-        outputs = model(**inputs)
-        
-        # Post-process results
-        target_sizes = torch.tensor([image.size[::-1]])
-        results = processor.post_process_object_detection(
-            outputs, target_sizes=target_sizes, threshold=0.7
-        )[0]
-        
-        # Format results
-        detected_objects = []
-        for score, label, box in zip(
-            results["scores"], results["labels"], results["boxes"]
-        ):
-            detected_objects.append({
-                'name': model.config.id2label[label.item()],
-                'confidence': score.item(),
-                'box': {
-                    'x': box[0].item(),
-                    'y': box[1].item(),
-                    'width': box[2].item() - box[0].item(),
-                    'height': box[3].item() - box[1].item()
-                }
-            })
-            
-        return detected_objects
+        return await self.detr_batcher.submit(image)
     
-    async def _detect_with_yolo(self, image: Image) -> List[Dict]:
+    async def _detect_with_yolo(self, image: PreprocessedImage) -> List[Dict]:
         """Detect objects using YOLO model"""
-        results = self.object_detection_models['yolo'](image)
+        results = await get_executor('yolo').run(
+            timed('yolo_forward', self.object_detection_models['yolo']), image.image
+        )
+        
+        # Scale boxes from the working image back to the original upload
+        scale_x = image.original_size[0] / image.size[0]
+        scale_y = image.original_size[1] / image.size[1]
         
         detected_objects = []
         for result in results:
+            box = result['box']
             detected_objects.append({
                 'name': result['label'],
                 'confidence': result['score'],
                 'box': {
-                    'x': result['box']['x'],
-                    'y': result['box']['y'],
-                    'width': result['box']['width'],
-                    'height': result['box']['height']
+                    'x': box['xmin'] * scale_x,
+                    'y': box['ymin'] * scale_y,
+                    'width': (box['xmax'] - box['xmin']) * scale_x,
+                    'height': (box['ymax'] - box['ymin']) * scale_y
                 }
             })
             
         return detected_objects
     
-    async def _analyze_scene(self, image: Image) -> Dict:
+    async def _detect_with_cascade(self, image: PreprocessedImage) -> List[Dict]:
+        """Detect with YOLOS-tiny, escalating to DETR when the result is uncertain"""
+        start = time.perf_counter()
+        
+        objects = await self._detect_with_yolo(image)
+        if self._accept_fast_path(objects):
+            self._record_cascade('fast', start)
+            return objects
+        
+        objects = await self._detect_with_detr(image)
+        self._record_cascade('escalated', start)
+        return objects
+    
+    def _accept_fast_path(self, objects: List[Dict]) -> bool:
+        """Whether the tiny model's detections are confident enough to keep"""
+        if not settings.CASCADE_MIN_OBJECTS <= len(objects) <= settings.CASCADE_MAX_OBJECTS:
+            return False
+        if not objects:
+            return True
+        
+        confidences = [obj['confidence'] for obj in objects]
+        return (
+            min(confidences) >= settings.CASCADE_MIN_CONFIDENCE
+            and sum(confidences) / len(confidences) >= settings.CASCADE_MIN_MEAN_CONFIDENCE
+        )
+    
+    def _record_cascade(self, path: str, start: float):
+        elapsed = time.perf_counter() - start
+        DETECTION_CASCADE_PATHS.labels(path).inc()
+        DETECTION_CASCADE_LATENCY.labels(path).observe(elapsed)
+        self.cascade_stats['requests'] += 1
+        if path == 'escalated':
+            self.cascade_stats['escalations'] += 1
+        
+        # Keep a bounded window of recent samples
+        samples = self.cascade_stats['latency_ms'][path]
+        samples.append(elapsed * 1000)
+        del samples[:-1000]
+    
+    def get_cascade_stats(self) -> Dict:
+        """Return the escalation rate and latency of each cascade path"""
+        requests = self.cascade_stats['requests']
+        latency = {}
+        for path, samples in self.cascade_stats['latency_ms'].items():
+            ordered = sorted(samples)
+            latency[path] = {
+                'count': len(ordered),
+                'mean_ms': sum(ordered) / len(ordered) if ordered else None,
+                'p50_ms': ordered[len(ordered) // 2] if ordered else None,
+                'p95_ms': ordered[int(len(ordered) * 0.95)] if ordered else None
+            }
+        
+        return {
+            'requests': requests,
+            'escalations': self.cascade_stats['escalations'],
+            'escalation_rate': self.cascade_stats['escalations'] / requests if requests else 0.0,
+            'latency': latency
+        }
+    
+    async def _analyze_scene(self, image: PreprocessedImage) -> Dict:
         """Analyze scene using ViT classifier"""
+        scene_type, confidence = await self.scene_batcher.submit(image)
+        
+        return {
+            'scene_type': scene_type,
+            'confidence': confidence,
+            'attributes': self._get_scene_attributes(image)
+        }
+    
+    def _classify_scene_batch(self, images: List[PreprocessedImage]) -> List[tuple]:
+        """Classify a batch of images with one ViT forward pass"""
         processor = self.scene_classifier['processor']
         model = self.scene_classifier['model']
         
-        # Process image
-        inputs = processor(images=image, return_tensors="pt")
-        outputs = model(**inputs)
+        # ViT resizes everything to the same shape, so tensors simply stack
+        with stage_timer('vit_preprocess'):
+            pixel_values = torch.cat([
+                image.tensor('vit', lambda im: processor(images=im, return_tensors="pt")['pixel_values'])
+                for image in images
+            ])
+        with stage_timer('vit_forward'):
+            outputs = model(pixel_values=pixel_values)
         
         # Get predictions
         probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
-        top_pred = torch.argmax(probs, dim=-1)
+        top_probs, top_preds = torch.max(probs, dim=-1)
         
-        return {
-            'scene_type': model.config.id2label[top_pred.item()],
-            'confidence': probs[0][top_pred].item(),
-            'attributes': self._get_scene_attributes(image)
-        }
+        return [
+            (model.config.id2label[pred], prob)
+            for pred, prob in zip(top_preds.tolist(), top_probs.tolist())
+        ]
     
-    def _get_scene_attributes(self, image: Image) -> Dict:
+    def _get_scene_attributes(self, image: PreprocessedImage) -> Dict:
         """Analyze scene attributes (lighting, complexity, etc.)"""
-        # Convert to numpy array
-        np_image = np.array(image)
+        # Same bounded pixel sample the color analysis uses
+        np_image = image.sample(self.color_analyzer.max_pixels)
         
         # Analyze brightness
         brightness = np.mean(np_image)
@@ -193,7 +564,7 @@ class EnhancedDrawingProcessor:
         return {
             'brightness': brightness / 255.0,
             'complexity': complexity / 255.0,
-            'size': image.size
+            'size': image.original_size
         }
     
     def _analyze_composition(self, objects: List[Dict]) -> Dict:
@@ -226,8 +597,9 @@ class EnhancedDrawingProcessor:
     def _check_content_safety(self, objects: List[Dict], 
                             scene_info: Dict) -> Dict:
         """Check if content is appropriate for children"""
-        unsafe_objects = ['knife', 'gun', 'sword', 'blood']
-        unsafe_scenes = ['violence', 'horror', 'danger']
+        lexicon = get_lexicon()
+        unsafe_objects = lexicon.terms('unsafe_object')
+        unsafe_scenes = lexicon.terms('unsafe_scene')
         
         detected_unsafe = [obj['name'] for obj in objects 
                          if obj['name'].lower() in unsafe_objects]
@@ -261,54 +633,92 @@ class EnhancedDrawingProcessor:
         return recommendations
 
 class ColorAnalyzer:
-    def __init__(self):
+    """
+    Color composition of a drawing, computed on NumPy arrays.
+    
+    Images larger than `max_pixels` are downscaled (nearest neighbour, so
+    crayon colors are not blended) before analysis, and colors are grouped
+    into a quantized histogram with `bits_per_channel` bits per channel, so
+    the cost stays roughly constant regardless of input resolution.
+    """
+    
+    def __init__(self, max_pixels: int = 256 * 256, bits_per_channel: int = 5):
+        self.max_pixels = max_pixels
+        self.bits_per_channel = bits_per_channel
         self.color_names = self._load_color_names()
+        self._color_name_values = np.array(list(self.color_names.values()), dtype=np.float32)
         
-    def analyze(self, image: Image) -> Dict:
-        """Analyze color composition of image"""
-        # Convert image to RGB if not already
-        image = image.convert('RGB')
-        
-        # Get color histogram
-        colors = image.getcolors(image.size[0] * image.size[1])
+    def analyze(self, image) -> Dict:
+        """Analyze color composition of a PIL image or PreprocessedImage"""
+        # Convert image to an (N, 3) array of RGB pixels
+        if isinstance(image, PreprocessedImage):
+            pixels = image.sample(self.max_pixels)
+        else:
+            pixels = self._get_pixels(image)
         
-        if not colors:
+        if pixels.size == 0:
             return {'error': 'Could not analyze colors'}
-            
+        
+        # Quantized color histogram with the mean color of each bin
+        counts, colors = self._color_histogram(pixels)
+        
         # Sort colors by frequency
-        sorted_colors = sorted(colors, reverse=True)
+        order = np.argsort(-counts, kind='stable')
+        counts, colors = counts[order], colors[order]
+        top_counts, top_colors = counts[:5], colors[:5]
         
         # Analyze top colors
         return {
-            'dominant_colors': self._get_dominant_colors(sorted_colors[:5]),
-            'color_mood': self._analyze_color_mood(sorted_colors),
-            'palette': self._create_color_palette(sorted_colors[:5])
+            'dominant_colors': self._get_dominant_colors(top_counts, top_colors),
+            'color_mood': self._analyze_color_mood(counts, colors),
+            'palette': self._create_color_palette(top_colors)
         }
     
-    def _get_dominant_colors(self, color_counts: List) -> List[Dict]:
+    def _get_pixels(self, image: Image) -> np.ndarray:
+        """Downscale if needed and return the pixels as uint8 RGB rows"""
+        width, height = image.size
+        if self.max_pixels and width * height > self.max_pixels:
+            scale = (self.max_pixels / (width * height)) ** 0.5
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            image = image.resize(size, Image.NEAREST)
+        return np.asarray(image.convert('RGB'), dtype=np.uint8).reshape(-1, 3)
+    
+    def _color_histogram(self, pixels: np.ndarray) -> tuple:
+        """Count pixels per quantized color bin and average each bin's color"""
+        bits = self.bits_per_channel
+        shift = 8 - bits
+        quantized = (pixels >> shift).astype(np.int64)
+        codes = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+        
+        codes, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        sums = np.stack([
+            np.bincount(inverse, weights=pixels[:, channel], minlength=len(codes))
+            for channel in range(3)
+        ], axis=1)
+        colors = np.rint(sums / counts[:, None]).astype(np.uint8)
+        
+        return counts, colors
+    
+    def _get_dominant_colors(self, counts: np.ndarray, colors: np.ndarray) -> List[Dict]:
         """Get dominant colors with their names"""
+        total = counts.sum()
         dominant = []
-        for count, rgb in color_counts:
+        for count, rgb in zip(counts.tolist(), colors.tolist()):
             dominant.append({
-                'rgb': rgb,
+                'rgb': tuple(rgb),
                 'name': self._get_color_name(rgb),
-                'percentage': count / sum(c for c, _ in color_counts)
+                'percentage': count / total
             })
         return dominant
     
-    def _analyze_color_mood(self, colors: List) -> Dict:
-        """Analyze mood based on color composition"""
-        # Simple mood analysis based on color properties
-        total_brightness = 0
-        total_saturation = 0
+    def _analyze_color_mood(self, counts: np.ndarray, colors: np.ndarray) -> Dict:
+        """Analyze mood based on frequency-weighted color composition"""
+        _, saturation, value = self._rgb_to_hsv(colors)
+        weights = counts / counts.sum()
         
-        for _, rgb in colors:
-            h, s, v = self._rgb_to_hsv(rgb)
-            total_brightness += v
-            total_saturation += s
-            
-        avg_brightness = total_brightness / len(colors)
-        avg_saturation = total_saturation / len(colors)
+        avg_brightness = float(np.dot(weights, value))
+        avg_saturation = float(np.dot(weights, saturation))
         
         return {
             'brightness': avg_brightness,
@@ -316,6 +726,35 @@ class ColorAnalyzer:
             'mood': self._determine_mood(avg_brightness, avg_saturation)
         }
     
+    def _create_color_palette(self, colors: np.ndarray) -> List[str]:
+        """Hex codes of the dominant colors, most frequent first"""
+        return ['#{:02x}{:02x}{:02x}'.format(*rgb) for rgb in colors.tolist()]
+    
+    def _get_color_name(self, rgb) -> str:
+        """Name of the closest basic color"""
+        distances = ((self._color_name_values - np.asarray(rgb, dtype=np.float32)) ** 2).sum(axis=1)
+        return list(self.color_names)[int(np.argmin(distances))]
+    
+    def _load_color_names(self) -> Dict[str, tuple]:
+        """Basic color names children know"""
+        return {
+            'black': (0, 0, 0),
+            'white': (255, 255, 255),
+            'gray': (128, 128, 128),
+            'red': (220, 20, 60),
+            'orange': (255, 140, 0),
+            'yellow': (255, 215, 0),
+            'green': (34, 139, 34),
+            'light green': (144, 238, 144),
+            'blue': (30, 144, 255),
+            'dark blue': (0, 0, 139),
+            'light blue': (135, 206, 235),
+            'purple': (128, 0, 128),
+            'pink': (255, 105, 180),
+            'brown': (139, 69, 19),
+            'beige': (245, 222, 179)
+        }
+    
     def _determine_mood(self, brightness: float, saturation: float) -> str:
         """Determine mood based on color properties"""
         if brightness > 0.7 and saturation > 0.5:
@@ -328,23 +767,24 @@ class ColorAnalyzer:
             return 'balanced'
     
     @staticmethod
-    def _rgb_to_hsv(rgb: tuple) -> tuple:
-        """Convert RGB to HSV color space"""
-        r, g, b = [x/255.0 for x in rgb]
-        cmax = max(r, g, b)
-        cmin = min(r, g, b)
+    def _rgb_to_hsv(rgb: np.ndarray) -> tuple:
+        """Convert an (N, 3) array of RGB colors to H, S and V arrays"""
+        rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3) / 255.0
+        r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+        cmax = rgb.max(axis=1)
+        cmin = rgb.min(axis=1)
         diff = cmax - cmin
+        safe_diff = np.where(diff == 0, 1.0, diff)
         
-        if cmax == cmin:
-            h = 0
-        elif cmax == r:
-            h = (60 * ((g-b)/diff) + 360) % 360
-        elif cmax == g:
-            h = (60 * ((b-r)/diff) + 120) % 360
-        else:
-            h = (60 * ((r-g)/diff) + 240) % 360
-            
-        s = 0 if cmax == 0 else diff/cmax
+        h = np.where(
+            cmax == r, (60 * ((g - b) / safe_diff) + 360) % 360,
+            np.where(
+                cmax == g, (60 * ((b - r) / safe_diff) + 120) % 360,
+                (60 * ((r - g) / safe_diff) + 240) % 360
+            )
+        )
+        h = np.where(diff == 0, 0.0, h)
+        s = np.where(cmax == 0, 0.0, diff / np.where(cmax == 0, 1.0, cmax))
         v = cmax
         
         return h, s, v
\ No newline at end of file
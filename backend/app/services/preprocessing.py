@@ -0,0 +1,128 @@
+# backend/app/services/preprocessing.py
+import io
+import math
+import threading
+from typing import IO, Callable, Dict, Tuple, Union
+import numpy as np
+import torch
+from PIL import Image
+
+class PreprocessedImage:
+    """
+    One decoded upload, shared by every analyzer of a request.
+
+    `image` is the RGB working copy (possibly decoded at reduced size),
+    `original_size` the size of the upload, so detections can still be
+    reported in original pixel coordinates. Model-specific tensors and
+    downscaled pixel samples are computed on first use and then reused.
+    """
+
+    def __init__(self, image: Image.Image, original_size: Tuple[int, int]):
+        self.image = image
+        self.original_size = original_size
+        self._pixels = None
+        self._tensors: Dict[str, torch.Tensor] = {}
+        self._samples: Dict[int, np.ndarray] = {}
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """(H, W, 3) uint8 view of the working image"""
+        if self._pixels is None:
+            self._pixels = np.asarray(self.image)
+        return self._pixels
+
+    def tensor(self, name: str, factory: Callable[[Image.Image], torch.Tensor]) -> torch.Tensor:
+        """Model input tensor for `name`, built once from the working image"""
+        with self._key_lock(('tensor', name)):
+            if name not in self._tensors:
+                self._tensors[name] = factory(self.image)
+            return self._tensors[name]
+
+    def sample(self, max_pixels: int) -> np.ndarray:
+        """(N, 3) uint8 pixels, nearest-neighbour downscaled to at most `max_pixels`"""
+        with self._key_lock(('sample', max_pixels)):
+            if max_pixels not in self._samples:
+                width, height = self.image.size
+                image = self.image
+                if max_pixels and width * height > max_pixels:
+                    scale = (max_pixels / (width * height)) ** 0.5
+                    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+                    image = image.resize(size, Image.NEAREST)
+                self._samples[max_pixels] = np.asarray(image, dtype=np.uint8).reshape(-1, 3)
+            return self._samples[max_pixels]
+
+    def _key_lock(self, key) -> threading.Lock:
+        # One lock per tensor/sample, so stages running concurrently on
+        # different executors only wait for the value they actually need
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+class ImagePreprocessor:
+    """
+    Decode an upload once, at no more resolution than the models need.
+
+    JPEGs use draft mode, so libjpeg decodes straight to a reduced DCT
+    scale. Other formats are shrunk with `Image.reduce` right after
+    decoding. The working image always keeps its shortest side at or above
+    `min_side` (DETR resizes to an 800px shortest edge), so model inputs
+    are unchanged.
+
+    Uploads may come as bytes or as a (spooled) binary file; the pixel
+    count is checked from the header before anything is decoded.
+    """
+
+    def __init__(self, min_side: int = 800, max_pixels: int = 0):
+        self.min_side = min_side
+        self.max_pixels = max_pixels
+
+    def decode(self, image_data: Union[bytes, IO[bytes]]) -> PreprocessedImage:
+        if isinstance(image_data, bytes):
+            image_data = io.BytesIO(image_data)
+        else:
+            image_data.seek(0)
+        image = Image.open(image_data)
+        original_size = image.size
+        if self.max_pixels and original_size[0] * original_size[1] > self.max_pixels:
+            raise ValueError(
+                f"Image is {original_size[0]}x{original_size[1]}, more than {self.max_pixels} pixels"
+            )
+
+        factor = self._reduction_factor(original_size)
+        if factor > 1 and image.format == 'JPEG':
+            requested = (
+                math.ceil(original_size[0] / factor),
+                math.ceil(original_size[1] / factor)
+            )
+            image.draft('RGB', requested)
+
+        image = image.convert('RGB')
+
+        # draft() only covers JPEG and picks the nearest DCT scale
+        factor = self._reduction_factor(image.size)
+        if factor > 1:
+            image = image.reduce(factor)
+
+        return PreprocessedImage(image, original_size)
+
+    def _reduction_factor(self, size: Tuple[int, int]) -> int:
+        return max(1, min(size) // self.min_side)
+
+def pad_pixel_batch(pixel_values: list) -> Dict[str, torch.Tensor]:
+    """Zero-pad (1, 3, H, W) tensors bottom/right into one batch with a pixel_mask"""
+    height = max(values.shape[-2] for values in pixel_values)
+    width = max(values.shape[-1] for values in pixel_values)
+
+    batch = torch.zeros(len(pixel_values), 3, height, width, dtype=pixel_values[0].dtype)
+    mask = torch.zeros(len(pixel_values), height, width, dtype=torch.long)
+    for i, values in enumerate(pixel_values):
+        h, w = values.shape[-2:]
+        batch[i, :, :h, :w] = values[0]
+        mask[i, :h, :w] = 1
+
+    return {'pixel_values': batch, 'pixel_mask': mask}
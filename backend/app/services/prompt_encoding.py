@@ -0,0 +1,175 @@
+# backend/app/services/prompt_encoding.py
+"""
+Cheaper T5 inputs for repeated prompts.
+
+`PromptTemplate` tokenizes the constant text of a prompt template once;
+a request only tokenizes its field values. Splitting at the fields is
+only valid if it yields exactly the ids of tokenizing the whole prompt,
+so that is verified on sample values when the template is built, and
+the template falls back to whole-prompt tokenization otherwise.
+
+`EncoderCache` keeps T5 encoder outputs keyed by the input token ids,
+so a repeated prompt (e.g. a cache miss for one more story variant)
+goes straight to decoding.
+"""
+import statistics
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import torch
+
+class PromptTemplate:
+    def __init__(self, tokenizer, template: str,
+                 samples: Sequence[Dict[str, str]] = (), repeats: int = 5):
+        self.tokenizer = tokenizer
+        self.template = template
+        self.pieces: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(template)
+        ]
+        self.fields = [field for _, field in self.pieces if field]
+        # Field values are separate words, so the whitespace around a
+        # field is left to the tokenizer's word boundary
+        self.literal_ids = []
+        after_field = False
+        for literal, field in self.pieces:
+            if after_field:
+                literal = literal.lstrip()
+            if field:
+                literal = literal.rstrip()
+            self.literal_ids.append(self._encode(literal))
+            after_field = bool(field)
+        self.prefix_ids, self.suffix_ids = self._special_tokens()
+
+        samples = list(samples) or [dict.fromkeys(self.fields, 'sample')]
+        self.exact = all(self._encode_pieces(values) == self._encode_full(values) for values in samples)
+        self.full_ms = self._best_ms(self._encode_full, samples, repeats)
+        self.template_ms = self._best_ms(lambda values: self.encode(**values), samples, repeats)
+
+    def render(self, **values) -> str:
+        return self.template.format(**values)
+
+    def encode(self, **values) -> List[int]:
+        """Token ids of the rendered prompt, special tokens included"""
+        if not self.exact:
+            return self._encode_full(values)
+        return self._encode_pieces(values)
+
+    def _encode_pieces(self, values: Dict[str, str]) -> List[int]:
+        ids = list(self.prefix_ids)
+        for (_, field), literal_ids in zip(self.pieces, self.literal_ids):
+            ids.extend(literal_ids)
+            if field:
+                ids.extend(self._encode(str(values[field])))
+        ids.extend(self.suffix_ids)
+        return ids
+
+    def _encode_full(self, values: Dict[str, str]) -> List[int]:
+        return self.tokenizer.encode(self.render(**values))
+
+    def _encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False) if text.strip() else []
+
+    def _special_tokens(self) -> Tuple[List[int], List[int]]:
+        """Ids the tokenizer adds around a text (T5: a trailing </s>)"""
+        plain = self._encode('sample')
+        full = self.tokenizer.encode('sample')
+        for start in range(len(full) - len(plain) + 1):
+            if full[start:start + len(plain)] == plain:
+                return full[:start], full[start + len(plain):]
+        return [], []
+
+    def _best_ms(self, encode, samples, repeats: int) -> float:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for values in samples:
+                encode(values)
+            timings.append((time.perf_counter() - start) * 1000 / len(samples))
+        return min(timings)
+
+class EncoderCache:
+    """LRU of encoder hidden states keyed by input token ids"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[int, ...], torch.Tensor]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(input_ids: torch.Tensor) -> Tuple[int, ...]:
+        return tuple(input_ids.flatten().tolist())
+
+    def get(self, key: Tuple[int, ...]) -> Optional[torch.Tensor]:
+        with self._lock:
+            hidden = self._entries.get(key)
+            if hidden is not None:
+                self._entries.move_to_end(key)
+            return hidden
+
+    def put(self, key: Tuple[int, ...], hidden: torch.Tensor):
+        with self._lock:
+            self._entries[key] = hidden
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class PromptStats:
+    """Tokenization and encoder time per request, and the time saved"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.requests = 0
+        self.encoder_hits = 0
+        self.encoder_misses = 0
+        self.tokenize_ms: List[float] = []
+        self.encode_ms: List[float] = []
+        self._lock = threading.Lock()
+
+    def record_tokenize(self, elapsed_ms: float):
+        with self._lock:
+            self.requests += 1
+            self.tokenize_ms.append(elapsed_ms)
+            del self.tokenize_ms[:-self.window]
+
+    def record_encoder(self, hit: bool, elapsed_ms: Optional[float] = None):
+        with self._lock:
+            if hit:
+                self.encoder_hits += 1
+            else:
+                self.encoder_misses += 1
+                self.encode_ms.append(elapsed_ms)
+                del self.encode_ms[:-self.window]
+
+    def summary(self, template: Optional[PromptTemplate] = None,
+                cache: Optional[EncoderCache] = None) -> Dict:
+        with self._lock:
+            lookups = self.encoder_hits + self.encoder_misses
+            encode_ms = statistics.median(self.encode_ms) if self.encode_ms else None
+            # A hit saves one encoder pass, priced at the median miss
+            encoder_saved = self.encoder_hits * encode_ms if encode_ms is not None else 0.0
+            tokenize_saved = (
+                max(0.0, template.full_ms - template.template_ms)
+                if template is not None and template.exact else 0.0
+            )
+            return {
+                'requests': self.requests,
+                'tokenize': {
+                    'pretokenized_template': bool(template and template.exact),
+                    'mean_ms': statistics.fmean(self.tokenize_ms) if self.tokenize_ms else None,
+                    'full_prompt_ms': template.full_ms if template is not None else None,
+                    'saved_ms_per_request': tokenize_saved
+                },
+                'encoder': {
+                    'cache_entries': len(cache) if cache is not None else 0,
+                    'hits': self.encoder_hits,
+                    'misses': self.encoder_misses,
+                    'hit_rate': self.encoder_hits / lookups if lookups else 0.0,
+                    'encode_ms': encode_ms,
+                    'saved_ms_per_request': encoder_saved / lookups if lookups else 0.0
+                }
+            }
@@ -0,0 +1,149 @@
+# backend/app/services/repositories.py
+"""
+MongoDB repositories for drawings and stories.
+
+Each repository owns one collection and its indexes. List reads only
+fetch the fields the listing shows (projections) and page with a keyset
+cursor on (creation_date, _id), so every page is one index range scan
+however deep the client pages; skip/offset would rescan everything
+before the page.
+"""
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from app.models.drawing import Drawing, DrawingCreate, DrawingPage, DrawingSummary
+from app.models.story import Story, StoryCreate
+
+DRAWING_SUMMARY_FIELDS = {
+    'child_id': 1, 'image_url': 1, 'thumbnail_urls': 1, 'scene_type': 1, 'creation_date': 1
+}
+STORY_SUMMARY_FIELDS = {'drawing_id': 1, 'style': 1, 'narrative': 1}
+
+def _object_id(value: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+def _from_document(document: Dict) -> Dict:
+    document = dict(document)
+    document['id'] = str(document.pop('_id'))
+    return document
+
+def encode_cursor(creation_date: datetime, object_id: ObjectId) -> str:
+    """Opaque keyset cursor for the item after which the next page starts"""
+    raw = f"{creation_date.isoformat()}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        creation_date, object_id = raw.split('|')
+        return datetime.fromisoformat(creation_date), ObjectId(object_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class DrawingRepository:
+    def __init__(self, db, collection: str = 'drawings'):
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        # Serves "a child's drawings, newest first" including the _id
+        # tie-break, so keyset pages never sort in memory
+        await self.collection.create_indexes([
+            IndexModel(
+                [('child_id', ASCENDING), ('creation_date', DESCENDING), ('_id', DESCENDING)],
+                name='child_id_creation_date'
+            )
+        ])
+
+    async def insert(self, drawing: DrawingCreate) -> Drawing:
+        document = drawing.model_dump()
+        result = await self.collection.insert_one(document)
+        return Drawing(id=str(result.inserted_id), **drawing.model_dump())
+
+    async def insert_many(self, drawings: List[DrawingCreate]) -> List[Drawing]:
+        """Insert a batch in one round trip; order of the result matches the input"""
+        if not drawings:
+            return []
+        documents = [drawing.model_dump() for drawing in drawings]
+        result = await self.collection.insert_many(documents, ordered=False)
+        return [
+            Drawing(id=str(inserted_id), **drawing.model_dump())
+            for inserted_id, drawing in zip(result.inserted_ids, drawings)
+        ]
+
+    async def get(self, drawing_id: str) -> Optional[Drawing]:
+        object_id = _object_id(drawing_id)
+        if object_id is None:
+            return None
+        document = await self.collection.find_one({'_id': object_id})
+        return Drawing(**_from_document(document)) if document else None
+
+    async def list_for_child(self, child_id: str, limit: int = 20,
+                             cursor: Optional[str] = None) -> DrawingPage:
+        """A child's drawings, newest first, `limit` at a time"""
+        query: Dict[str, Any] = {'child_id': child_id}
+        if cursor:
+            creation_date, object_id = decode_cursor(cursor)
+            query['$or'] = [
+                {'creation_date': {'$lt': creation_date}},
+                {'creation_date': creation_date, '_id': {'$lt': object_id}}
+            ]
+
+        # One extra row tells whether another page exists
+        documents = await self.collection.find(query, DRAWING_SUMMARY_FIELDS).sort(
+            [('creation_date', DESCENDING), ('_id', DESCENDING)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor(last['creation_date'], last['_id'])
+
+        return DrawingPage(
+            items=[DrawingSummary(**_from_document(document)) for document in documents],
+            next_cursor=next_cursor
+        )
+
+class StoryRepository:
+    def __init__(self, db, collection: str = 'stories'):
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        await self.collection.create_indexes([
+            IndexModel([('drawing_id', ASCENDING)], name='drawing_id')
+        ])
+
+    async def insert(self, story: StoryCreate) -> Story:
+        result = await self.collection.insert_one(story.model_dump())
+        return Story(id=str(result.inserted_id), **story.model_dump())
+
+    async def insert_many(self, stories: List[StoryCreate]) -> List[Story]:
+        if not stories:
+            return []
+        result = await self.collection.insert_many(
+            [story.model_dump() for story in stories], ordered=False
+        )
+        return [
+            Story(id=str(inserted_id), **story.model_dump())
+            for inserted_id, story in zip(result.inserted_ids, stories)
+        ]
+
+    async def get(self, story_id: str) -> Optional[Story]:
+        object_id = _object_id(story_id)
+        if object_id is None:
+            return None
+        document = await self.collection.find_one({'_id': object_id})
+        return Story(**_from_document(document)) if document else None
+
+    async def list_for_drawing(self, drawing_id: str, limit: int = 20) -> List[Dict]:
+        """Stories told about a drawing, without effects and narration"""
+        documents = await self.collection.find(
+            {'drawing_id': drawing_id}, STORY_SUMMARY_FIELDS
+        ).sort('_id', DESCENDING).limit(limit).to_list(length=limit)
+        return [_from_document(document) for document in documents]
@@ -0,0 +1,358 @@
+# backend/app/services/result_cache.py
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from PIL import Image
+from app.utils.serialization import to_json
+
+PHASH_BITS = 64
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+class _PHashIndex:
+    """
+    Perceptual hashes bucketed by bit band. Split into `tolerance + 1`
+    bands, two hashes within `tolerance` bits share at least one band
+    exactly, so a lookup only compares against the hashes in its buckets.
+    """
+
+    def __init__(self, tolerance: int):
+        bands = min(tolerance + 1, PHASH_BITS) if tolerance >= 0 else 0
+        edges = [PHASH_BITS * band // bands for band in range(bands + 1)] if bands else []
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+        # (namespace, band, bits) -> keys with those bits in that band
+        self._buckets: Dict[Tuple[str, int, int], set] = {}
+
+    def _bucket_keys(self, namespace: str, phash: int):
+        return [(namespace, band, (phash >> start) & mask)
+                for band, (start, mask) in enumerate(self._bands)]
+
+    def add(self, namespace: str, phash: int, key):
+        for bucket in self._bucket_keys(namespace, phash):
+            self._buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, namespace: str, phash: int, key):
+        for bucket in self._bucket_keys(namespace, phash):
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def candidates(self, namespace: str, phash: int) -> set:
+        found = set()
+        for bucket in self._bucket_keys(namespace, phash):
+            found |= self._buckets.get(bucket, set())
+        return found
+
+class DrawingResultCache:
+    """
+    Cache of drawing analysis results keyed on image content.
+
+    Every image gets two keys: a SHA-256 of its decoded RGB pixels for exact
+    hits and a 64-bit difference hash (dHash) that still matches when a
+    drawing is re-encoded or slightly edited. Perceptual hits are accepted
+    when the Hamming distance is within `hamming_tolerance` bits. Both only
+    match uploads of the same original size, since results carry boxes in
+    original pixel coordinates; `lookup` can be limited to exact hits for
+    results that must belong to the very same pixels.
+
+    The in-memory tier is an LRU bounded by entry count and approximate
+    result size, with a TTL. An optional on-disk tier (one JSON file per
+    entry under `disk_path`) survives restarts and drops its oldest entry
+    past `disk_max_entries`. Perceptual lookups only compare hashes that
+    share a band with the query, and no operation walks every entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600, hamming_tolerance: int = 4,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hamming_tolerance = hamming_tolerance
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+
+        # (namespace, exact) -> {'phash', 'created', 'size', 'result'}, LRU order
+        self._memory: OrderedDict = OrderedDict()
+        # The same keys in creation order, so expired entries are at the front
+        self._memory_created: OrderedDict = OrderedDict()
+        self._memory_bytes = 0
+        self._memory_phashes = _PHashIndex(hamming_tolerance)
+        # (namespace, exact) -> (phash, created) for entries on disk, oldest first
+        self._disk_index: OrderedDict = OrderedDict()
+        self._disk_phashes = _PHashIndex(hamming_tolerance)
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'exact_hits': 0,
+            'perceptual_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self._load_disk_index()
+
+    @classmethod
+    def from_settings(cls, settings) -> 'DrawingResultCache':
+        return cls(
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+            max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+            ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+            hamming_tolerance=settings.RESULT_CACHE_HAMMING_TOLERANCE,
+            disk_path=settings.RESULT_CACHE_DIR or None
+        )
+
+    @staticmethod
+    def compute_keys(image: Image.Image,
+                     original_size: Optional[Tuple[int, int]] = None) -> Tuple[str, int, str]:
+        """
+        Return the exact pixel hash, the perceptual hash and the original
+        size of an image (`image.size` unless it was decoded reduced)
+        """
+        rgb = image.convert('RGB')
+        width, height = original_size or rgb.size
+        size = f"{width}x{height}"
+
+        digest = hashlib.sha256()
+        digest.update(f"{rgb.size[0]}x{rgb.size[1]}:{size}".encode())
+        digest.update(rgb.tobytes())
+
+        # dHash: compare horizontally adjacent pixels of a 9x8 thumbnail
+        small = rgb.convert('L').resize((9, 8), Image.BILINEAR)
+        pixels = small.tobytes()
+        phash = 0
+        for row in range(8):
+            for col in range(8):
+                left = pixels[row * 9 + col]
+                right = pixels[row * 9 + col + 1]
+                phash = (phash << 1) | (1 if left > right else 0)
+
+        return digest.hexdigest(), phash, size
+
+    def get(self, keys: Tuple[str, int, str], namespace: str = '') -> Optional[Dict]:
+        """Look up a result by exact key, then by perceptual similarity"""
+        return self.lookup(keys, namespace)[0]
+
+    def lookup(self, keys: Tuple[str, int, str], namespace: str = '',
+               exact_only: bool = False) -> Tuple[Optional[Dict], bool]:
+        """
+        Like `get`, also returning whether the hit was for these exact
+        pixels; `exact_only` skips perceptual matches altogether
+        """
+        exact, phash, size = keys
+        # Only uploads of the same size share boxes
+        namespace = f"{namespace}@{size}"
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get((namespace, exact))
+            if entry is not None and not self._expired(entry['created'], now):
+                self._memory.move_to_end((namespace, exact))
+                self.stats['exact_hits'] += 1
+                return copy.deepcopy(entry['result']), True
+
+            match = None if exact_only else self._find_similar(namespace, phash, now)
+            if match is not None:
+                self._memory.move_to_end(match)
+                self.stats['perceptual_hits'] += 1
+                return copy.deepcopy(self._memory[match]['result']), False
+
+        result, is_exact = self._get_from_disk(namespace, exact, phash, now, exact_only)
+        with self._lock:
+            if result is None:
+                self.stats['misses'] += 1
+                return None, False
+            self.stats['disk_hits'] += 1
+
+        # Kept under the key it was found by
+        if is_exact:
+            self._put_memory(namespace, exact, phash, result, now)
+        return copy.deepcopy(result), is_exact
+
+    def put(self, keys: Tuple[str, int, str], result: Dict, namespace: str = ''):
+        """Store a result in memory and, if enabled, on disk"""
+        exact, phash, size = keys
+        namespace = f"{namespace}@{size}"
+        now = time.time()
+        self._put_memory(namespace, exact, phash, copy.deepcopy(result), now)
+
+        if self.disk_path:
+            self._put_disk(namespace, exact, phash, result, now)
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss counters and current tier sizes"""
+        with self._lock:
+            hits = (self.stats['exact_hits'] + self.stats['perceptual_hits']
+                    + self.stats['disk_hits'])
+            lookups = hits + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk_index)
+            }
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def _find_similar(self, namespace: str, phash: int, now: float):
+        best_key, best_distance = None, self.hamming_tolerance + 1
+        for key in self._memory_phashes.candidates(namespace, phash):
+            entry = self._memory[key]
+            if self._expired(entry['created'], now):
+                continue
+            distance = _hamming(phash, entry['phash'])
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def _put_memory(self, namespace: str, exact: str, phash: int,
+                    result: Dict, now: float):
+        size = len(json.dumps(result, default=to_json))
+
+        with self._lock:
+            key = (namespace, exact)
+            if key in self._memory:
+                self._remove_memory(key)
+
+            self._memory[key] = {
+                'phash': phash,
+                'created': now,
+                'size': size,
+                'result': result
+            }
+            self._memory_created[key] = now
+            self._memory_bytes += size
+            self._memory_phashes.add(namespace, phash, key)
+
+            # Evict expired entries first, then least recently used
+            while self._memory_created:
+                oldest, created = next(iter(self._memory_created.items()))
+                if not self._expired(created, now):
+                    break
+                self._evict(oldest)
+            while self._memory and (len(self._memory) > self.max_entries
+                                    or self._memory_bytes > self.max_bytes):
+                self._evict(next(iter(self._memory)))
+
+    def _remove_memory(self, key):
+        entry = self._memory.pop(key)
+        del self._memory_created[key]
+        self._memory_bytes -= entry['size']
+        self._memory_phashes.remove(key[0], entry['phash'], key)
+
+    def _evict(self, key):
+        self._remove_memory(key)
+        self.stats['evictions'] += 1
+
+    def _disk_file(self, namespace: str, exact: str) -> str:
+        name = hashlib.sha256(f"{namespace}:{exact}".encode()).hexdigest()
+        return os.path.join(self.disk_path, f"{name}.json")
+
+    def _load_disk_index(self):
+        now = time.time()
+        entries = []
+        for filename in os.listdir(self.disk_path):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.disk_path, filename)
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if self._expired(entry['created'], now):
+                self._remove_disk_file(path)
+                continue
+            entries.append(((entry['namespace'], entry['exact']), entry['phash'], entry['created']))
+        for key, phash, created in sorted(entries, key=lambda entry: entry[2]):
+            self._add_disk(key, phash, created)
+
+    def _add_disk(self, key: Tuple[str, str], phash: int, created: float):
+        self._disk_index[key] = (phash, created)
+        self._disk_phashes.add(key[0], phash, key)
+
+    def _remove_disk(self, key: Tuple[str, str]):
+        entry = self._disk_index.pop(key, None)
+        if entry is not None:
+            self._disk_phashes.remove(key[0], entry[0], key)
+
+    def _get_from_disk(self, namespace: str, exact: str, phash: int, now: float,
+                       exact_only: bool = False) -> Tuple[Optional[Dict], bool]:
+        if not self.disk_path:
+            return None, False
+
+        with self._lock:
+            key = (namespace, exact)
+            if key not in self._disk_index:
+                key = None
+                best_distance = self.hamming_tolerance + 1
+                candidates = () if exact_only else self._disk_phashes.candidates(namespace, phash)
+                for candidate in candidates:
+                    distance = _hamming(phash, self._disk_index[candidate][0])
+                    if distance < best_distance:
+                        key, best_distance = candidate, distance
+            if key is None:
+                return None, False
+            created = self._disk_index[key][1]
+            if self._expired(created, now):
+                self._remove_disk(key)
+                self._remove_disk_file(self._disk_file(*key))
+                return None, False
+
+        try:
+            with open(self._disk_file(*key)) as f:
+                return json.load(f)['result'], key == (namespace, exact)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._remove_disk(key)
+            return None, False
+
+    def _put_disk(self, namespace: str, exact: str, phash: int,
+                  result: Dict, now: float):
+        path = self._disk_file(namespace, exact)
+        entry = {
+            'namespace': namespace,
+            'exact': exact,
+            'phash': phash,
+            'created': now,
+            'result': result
+        }
+
+        # Write to a temp file first so readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f, default=to_json)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove_disk_file(tmp_path)
+            return
+
+        with self._lock:
+            # Re-added at the end, so the index stays in creation order
+            self._remove_disk((namespace, exact))
+            self._add_disk((namespace, exact), phash, now)
+            while len(self._disk_index) > self.disk_max_entries:
+                oldest = next(iter(self._disk_index))
+                self._remove_disk(oldest)
+                self._remove_disk_file(self._disk_file(*oldest))
+
+    @staticmethod
+    def _remove_disk_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
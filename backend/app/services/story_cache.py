@@ -0,0 +1,112 @@
+# backend/app/services/story_cache.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+class StoryCache:
+    """
+    Cache of finished, safety-filtered stories keyed on normalized prompt inputs.
+
+    The key is built from the sorted, deduplicated object names, the scene
+    type, the age group and the generation settings, so "dog, tree" and
+    "Tree, dog, dog" share an entry. Each key can hold up to
+    `variants_per_key` different stories (or the `variants` given on its
+    first `put`, e.g. 1 for deterministic decoding): the first requests for
+    a key miss and fill it, after which hits rotate through the stored
+    variants.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 86400,
+                 variants_per_key: int = 1):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants_per_key = max(variants_per_key, 1)
+
+        # key -> {'variants', 'wanted', 'attempts', 'next', 'created'}
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @classmethod
+    def from_settings(cls, settings) -> 'StoryCache':
+        return cls(
+            max_entries=settings.STORY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.STORY_CACHE_TTL_SECONDS,
+            variants_per_key=settings.STORY_CACHE_VARIANTS
+        )
+
+    @staticmethod
+    def make_key(drawing_data: dict, age_group: str,
+                 generation_settings: Dict) -> Tuple:
+        """Canonicalize the inputs that influence the generated story"""
+        object_names = {
+            obj['name'].strip().lower()
+            for obj in drawing_data.get('objects', [])
+            if obj.get('name')
+        }
+        scene_type = str(drawing_data.get('scene_type', 'general')).strip().lower()
+        return (
+            tuple(sorted(object_names)),
+            scene_type,
+            age_group,
+            tuple(sorted(generation_settings.items()))
+        )
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """Return the next stored variant, or None while the key still needs filling"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                entry = None
+
+            if entry is None or entry['attempts'] < entry['wanted']:
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            story = entry['variants'][entry['next'] % len(entry['variants'])]
+            entry['next'] += 1
+            self.stats['hits'] += 1
+            return copy.deepcopy(story)
+
+    def put(self, key: Tuple, story: Dict, variants: Optional[int] = None):
+        """
+        Record a freshly generated story as one of the key's variants;
+        `variants` overrides `variants_per_key` for a new key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                entry = {
+                    'variants': [],
+                    'wanted': max(variants or self.variants_per_key, 1),
+                    'attempts': 0,
+                    'next': 0,
+                    'created': time.time()
+                }
+                self._entries[key] = entry
+
+            # Deterministic decoding can repeat itself; keep only distinct stories
+            entry['attempts'] += 1
+            if story not in entry['variants']:
+                entry['variants'].append(copy.deepcopy(story))
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries)
+            }
+
+    def _expired(self, entry: Dict) -> bool:
+        return self.ttl_seconds > 0 and time.time() - entry['created'] > self.ttl_seconds
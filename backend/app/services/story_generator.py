@@ -1,60 +1,446 @@
 # backend/app/services/story_generator.py
-from transformers import T5Tokenizer, T5ForConditionalGeneration
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+from transformers.modeling_outputs import BaseModelOutput
+from app.core.config import settings
+from app.core.metrics import (
+    STORY_CANDIDATES_EVALUATED, STORY_OUTCOMES, STORY_PROFILE_RUNS, T5_ENCODER_CACHE,
+    stage_timer, timed
+)
 from app.utils.content_safety import ContentSafetyFilter
+from app.services.generation_profiles import (
+    Deadline, GenerationProfile, build_profiles, sentence_end_ids
+)
+from app.services.inference import get_executor
+from app.services.ml_models import get_model_manager
+from app.services.prompt_encoding import EncoderCache, PromptStats, PromptTemplate
+from app.services.story_cache import StoryCache
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import re
+import threading
+import time
 import torch
 
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+LAST_SENTENCE_END = re.compile(r'^.*[.!?]', re.DOTALL)
+
+STORY_PROMPT = """
+        Create a short, child-friendly story about:
+        Scene: {scene_type}
+        Objects: {objects}
+        
+        Rules:
+        1. Keep it positive and uplifting
+        2. Include simple morals or learning
+        3. Avoid any scary or negative elements
+        4. Use simple, age-appropriate language
+        5. Include gentle humor if possible
+        """
+
+# Field values the pre-tokenized template is checked against
+PROMPT_SAMPLES = (
+    {'scene_type': 'park', 'objects': 'dog, cat'},
+    {'scene_type': 'general', 'objects': ''},
+    {'scene_type': 'beach', 'objects': "teddy bear, kid's ball"},
+)
+
+class _CancelledCriteria(StoppingCriteria):
+    """Stop generation once the streaming client has gone away"""
+    
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+        
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.cancelled.is_set()
+
+class _DeadlineCriteria(StoppingCriteria):
+    """Stop at a sentence boundary near the deadline, and at the deadline regardless"""
+    
+    def __init__(self, deadline: Deadline, stop_ids: Set[int]):
+        self.deadline = deadline
+        self.stop_ids = stop_ids
+        
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.deadline.should_stop(input_ids[:, -1].tolist(), self.stop_ids)
+
+def _trim_to_sentence(text: str) -> str:
+    """Drop an unfinished trailing sentence, if any sentence was finished"""
+    match = LAST_SENTENCE_END.match(text)
+    return match.group(0) if match else text
+
 class StoryGenerator:
-    def __init__(self):
-        # Initialize T5 model for story generation
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-base')
-        self.model = T5ForConditionalGeneration.from_pretrained('t5-base')
-        self.safety_filter = ContentSafetyFilter()
+    def __init__(self, tokenizer=None, model=None,
+                 safety_filter: Optional[ContentSafetyFilter] = None,
+                 profiles: Optional[Dict[str, GenerationProfile]] = None):
+        """Components left as None come from the model registry and settings"""
+        # T5 model for story generation, shared through the model registry
+        if tokenizer is None or model is None:
+            t5 = get_model_manager().get('story_generation', 't5')
+            tokenizer = tokenizer if tokenizer is not None else t5['tokenizer']
+            model = model if model is not None else t5['model']
+        self.tokenizer = tokenizer
+        self.model = model
+        self.safety_filter = safety_filter if safety_filter is not None else ContentSafetyFilter()
+        
+        # Repeat scene/object/age combinations are served from the cache
+        self.story_cache = (
+            StoryCache.from_settings(settings)
+            if settings.STORY_CACHE_ENABLED else None
+        )
+        # Decoding strategy and latency budget are picked per request
+        self.profiles = profiles if profiles is not None else build_profiles(
+            settings.STORY_CANDIDATES, settings.STORY_PROFILE_BUDGETS_MS
+        )
+        self.default_profile = self.get_profile(settings.STORY_PROFILE).name
+        self.sentence_end_ids = sentence_end_ids(self.tokenizer.get_vocab())
+        self.profile_stats = {
+            name: {'requests': 0, 'cut_short': 0} for name in self.profiles
+        }
+        self.bad_words_ids = self._get_bad_words_ids()
+        
+        # The constant prompt text is tokenized once, encoder passes are reused
+        self.prompt_template = PromptTemplate(self.tokenizer, STORY_PROMPT, PROMPT_SAMPLES)
+        self.encoder_cache = (
+            EncoderCache(settings.T5_ENCODER_CACHE_SIZE)
+            if settings.T5_ENCODER_CACHE_SIZE > 0 else None
+        )
+        self.prompt_stats = PromptStats()
+        self.generation_stats = {
+            'requests': 0,
+            'fallbacks': 0,
+            'candidates_evaluated': [],
+        }
+        self.stream_stats = {
+            'streams': 0,
+            'time_to_first_sentence_ms': [],
+        }
+        
+    def get_profile(self, name: Optional[str] = None) -> GenerationProfile:
+        """The named generation profile, the default for None; ValueError if unknown"""
+        name = name or self.default_profile
+        if name not in self.profiles:
+            raise ValueError(
+                f"Unknown generation profile '{name}'; expected one of {', '.join(self.profiles)}"
+            )
+        return self.profiles[name]
+    
+    def _get_stream_settings(self, profile: GenerationProfile) -> dict:
+        # Token streaming only works with a single decoding hypothesis
+        stream_settings = {**profile.settings, 'num_beams': 1, 'num_return_sequences': 1}
+        stream_settings.pop('early_stopping', None)
+        return stream_settings
+    
+    def _cache_story(self, cache_key: Tuple, story: Dict, profile: GenerationProfile):
+        # Deterministic decoding would only regenerate the same story
+        self.story_cache.put(cache_key, story, variants=1 if profile.deterministic else None)
+    
+    def _get_bad_words_ids(self) -> List[List[int]]:
+        """Token sequences of the banned lexicon terms, blocked during decoding"""
+        lexicon = self.safety_filter.lexicon
+        unk_token_id = self.tokenizer.unk_token_id
+        banned = set()
+        for category in settings.STORY_BANNED_CATEGORIES:
+            for term in lexicon.terms(category):
+                for variant in {term, term.capitalize()}:
+                    ids = tuple(self.tokenizer.encode(variant, add_special_tokens=False))
+                    # A sequence with <unk> would ban every unknown word
+                    if ids and unk_token_id not in ids:
+                        banned.add(ids)
+        return [list(ids) for ids in sorted(banned)]
+    
+    def _get_constraints(self) -> dict:
+        # generate() rejects an empty bad_words_ids
+        return {'bad_words_ids': self.bad_words_ids} if self.bad_words_ids else {}
         
     async def generate_story(self, drawing_data: dict):
+        # An unknown profile is the caller's mistake, keep it a ValueError
+        profile = self.get_profile(drawing_data.get('profile'))
         try:
-            # Create prompt from drawing data
-            prompt = self._create_prompt(drawing_data)
+            age_group = drawing_data.get('age_group', '6-8')
+            
+            cache_key = None
+            if self.story_cache is not None:
+                cache_key = StoryCache.make_key(
+                    drawing_data, age_group, profile.settings
+                )
+                cached = self.story_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Tokenize the prompt built from drawing data
+            input_ids = self._encode_prompt(drawing_data)
             
-            # Generate story
-            input_ids = self.tokenizer.encode(prompt, return_tensors='pt')
-            outputs = self.model.generate(
+            # All candidates come from one batched generate call
+            outputs, cut_short = await get_executor('t5').run(
+                timed('t5_generate', self._generate_within),
+                profile.budget_ms,
                 input_ids,
-                max_length=200,
-                num_beams=4,
-                no_repeat_ngram_size=2,
-                temperature=0.7
+                **self._get_constraints(),
+                **profile.settings
             )
             
-            story_text = self.tokenizer.decode(outputs[0])
+            with stage_timer('t5_decode'):
+                # Shorter candidates are padded to the longest one
+                candidates = [
+                    self.tokenizer.decode(output, skip_special_tokens=True) for output in outputs
+                ]
+            if cut_short:
+                # Only the row that reached a sentence end stopped at one
+                candidates = [_trim_to_sentence(candidate) for candidate in candidates]
             
-            # Apply safety filters
-            safe_story = self.safety_filter.filter_content(story_text)
+            # Apply safety filters, serving the first candidate that passes
+            safe_story, served = await self.safety_filter.afilter_candidates(
+                candidates, age_group
+            )
+            # The cascade checks every candidate in one run
+            self._record_candidates(len(candidates), fallback=served is None)
             
             # Structure the story
-            return self._structure_story(safe_story)
+            story = self._structure_story(safe_story)
+            story['generation'] = self._record_profile(profile, cut_short)
+            
+            # A cut-short story reflects the load at the time and the fallback
+            # a rejected batch of candidates; neither should be repeated
+            if cache_key is not None and not cut_short and served is not None:
+                self._cache_story(cache_key, story, profile)
+            
+            return story
             
         except Exception as e:
             raise Exception(f"Error generating story: {str(e)}")
     
-    def _create_prompt(self, drawing_data: dict):
-        objects = drawing_data.get('objects', [])
-        scene_type = drawing_data.get('scene_type', 'general')
+    async def stream_story(self, drawing_data: dict) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate a story and yield ('sentence', ...) events as each sentence
+        is decoded and passes the per-sentence safety checks, then one
+        ('complete', ...) event carrying the structured story. The closing
+        event runs the full safety filter and is authoritative.
+        """
+        start = time.perf_counter()
+        first_sentence_at = None
+        age_group = drawing_data.get('age_group', '6-8')
+        profile = self.get_profile(drawing_data.get('profile'))
+        stream_settings = self._get_stream_settings(profile)
         
-        # Create child-friendly prompt
-        prompt = f"""
-        Create a short, child-friendly story about:
-        Scene: {scene_type}
-        Objects: {', '.join([obj['name'] for obj in objects])}
+        cache_key = None
+        if self.story_cache is not None:
+            cache_key = StoryCache.make_key(drawing_data, age_group, stream_settings)
+            cached = self.story_cache.get(cache_key)
+            if cached is not None:
+                for index, section in enumerate(cached['narrative']):
+                    yield 'sentence', {'index': index, 'text': section['content']}
+                yield 'complete', {
+                    **cached,
+                    'metrics': self._record_stream(start, start)
+                }
+                return
         
-        Rules:
-        1. Keep it positive and uplifting
-        2. Include simple morals or learning
-        3. Avoid any scary or negative elements
-        4. Use simple, age-appropriate language
-        5. Include gentle humor if possible
-        """
+        input_ids = self._encode_prompt(drawing_data)
+        
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        cancelled = threading.Event()
+        generation = asyncio.ensure_future(get_executor('t5').run(
+            timed('t5_generate_stream', self._generate_within),
+            profile.budget_ms,
+            input_ids,
+            streamer=streamer,
+            stopping_criteria=[_CancelledCriteria(cancelled)],
+            **self._get_constraints(),
+            **stream_settings
+        ))
+        # A failed or cancelled generate() never ends the streamer, so end it here
+        generation.add_done_callback(
+            lambda future: (future.cancelled() or future.exception() is not None) and streamer.end()
+        )
+        
+        chunks: List[str] = []
+        buffer = ''
+        index = 0
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, streamer, None)
+                if chunk is None:
+                    break
+                chunks.append(chunk)
+                buffer += chunk
+                
+                sentences = SENTENCE_END.split(buffer)
+                buffer = sentences.pop()
+                for sentence in sentences:
+                    safe_sentence = await get_executor('nlp').run(
+                        timed('safety_sentence', self.safety_filter.filter_sentence), sentence, age_group
+                    )
+                    if safe_sentence is None:
+                        continue
+                    if first_sentence_at is None:
+                        first_sentence_at = time.perf_counter()
+                    yield 'sentence', {'index': index, 'text': safe_sentence}
+                    index += 1
+            
+            _, cut_short = await generation
+            
+            text = ''.join(chunks)
+            if cut_short:
+                buffer = _trim_to_sentence(buffer)
+                text = _trim_to_sentence(text)
+            
+            if buffer.strip():
+                safe_sentence = await get_executor('nlp').run(
+                    timed('safety_sentence', self.safety_filter.filter_sentence), buffer.strip(), age_group
+                )
+                if safe_sentence is not None:
+                    if first_sentence_at is None:
+                        first_sentence_at = time.perf_counter()
+                    yield 'sentence', {'index': index, 'text': safe_sentence}
+            
+            # The whole-story filter decides the final narrative
+            safe_story, served = await self.safety_filter.afilter_candidates([text], age_group)
+            story = self._structure_story(safe_story)
+            story['generation'] = self._record_profile(profile, cut_short)
+            
+            if cache_key is not None and not cut_short and served is not None:
+                self._cache_story(cache_key, story, profile)
+            
+            yield 'complete', {
+                **story,
+                'metrics': self._record_stream(start, first_sentence_at)
+            }
+        finally:
+            # Stop decoding if the client disconnected mid-stream
+            cancelled.set()
+    
+    def _encode_prompt(self, drawing_data: dict) -> torch.Tensor:
+        """(1, n) prompt ids; only the drawing's fields are tokenized per request"""
+        start = time.perf_counter()
+        with stage_timer('t5_tokenize'):
+            if self.prompt_template is not None:
+                input_ids = torch.tensor([
+                    self.prompt_template.encode(**self._prompt_fields(drawing_data))
+                ])
+            else:
+                input_ids = self.tokenizer.encode(
+                    self._create_prompt(drawing_data), return_tensors='pt'
+                )
+        self.prompt_stats.record_tokenize((time.perf_counter() - start) * 1000)
+        return input_ids
+    
+    def _generate(self, input_ids: torch.Tensor, **kwargs):
+        """model.generate, reusing a cached encoder pass for a repeated prompt"""
+        if self.encoder_cache is None:
+            return self.model.generate(input_ids, **kwargs)
+        
+        key = EncoderCache.make_key(input_ids)
+        hidden = self.encoder_cache.get(key)
+        if hidden is None:
+            start = time.perf_counter()
+            with stage_timer('t5_encode'):
+                hidden = self.model.get_encoder()(input_ids=input_ids).last_hidden_state
+            self.encoder_cache.put(key, hidden)
+            self.prompt_stats.record_encoder(False, (time.perf_counter() - start) * 1000)
+            T5_ENCODER_CACHE.labels('miss').inc()
+        else:
+            self.prompt_stats.record_encoder(True)
+            T5_ENCODER_CACHE.labels('hit').inc()
         
-        return prompt
+        # generate() expands encoder outputs for beams in place, so hand it a fresh wrapper
+        return self.model.generate(
+            input_ids, encoder_outputs=BaseModelOutput(last_hidden_state=hidden), **kwargs
+        )
+    
+    def _generate_within(self, budget_ms: float, input_ids: torch.Tensor,
+                         stopping_criteria: Optional[List[StoppingCriteria]] = None,
+                         **kwargs) -> Tuple[torch.Tensor, bool]:
+        """
+        _generate within a profile's budget (0 for none); returns the outputs
+        and whether the deadline ended decoding. Runs in the worker, so time
+        spent queued for the executor does not count against the budget.
+        """
+        deadline = None
+        criteria = StoppingCriteriaList(stopping_criteria or [])
+        if budget_ms > 0:
+            deadline = Deadline(budget_ms, settings.STORY_DEADLINE_SENTENCE_WINDOW)
+            criteria.append(_DeadlineCriteria(deadline, self.sentence_end_ids))
+        if criteria:
+            kwargs['stopping_criteria'] = criteria
+        outputs = self._generate(input_ids, **kwargs)
+        return outputs, deadline is not None and deadline.cut_short
+    
+    def _record_profile(self, profile: GenerationProfile, cut_short: bool) -> Dict:
+        """Count the run; the returned summary goes into the response"""
+        STORY_PROFILE_RUNS.labels(profile.name, 'cut_short' if cut_short else 'completed').inc()
+        stats = self.profile_stats[profile.name]
+        stats['requests'] += 1
+        if cut_short:
+            stats['cut_short'] += 1
+        return {'profile': profile.name, 'cut_short': cut_short, 'budget_ms': profile.budget_ms}
+    
+    def get_prompt_stats(self) -> Dict:
+        """Tokenization and encoder time per request, and what the caches saved"""
+        return self.prompt_stats.summary(self.prompt_template, self.encoder_cache)
+    
+    def _record_candidates(self, evaluated: int, fallback: bool):
+        STORY_CANDIDATES_EVALUATED.observe(evaluated)
+        STORY_OUTCOMES.labels('fallback' if fallback else 'generated').inc()
+        self.generation_stats['requests'] += 1
+        if fallback:
+            self.generation_stats['fallbacks'] += 1
+        # Keep a bounded window of recent samples
+        samples = self.generation_stats['candidates_evaluated']
+        samples.append(evaluated)
+        del samples[:-1000]
+    
+    def get_generation_stats(self) -> Dict:
+        """Return the fallback rate and how many candidates each story needed"""
+        requests = self.generation_stats['requests']
+        samples = self.generation_stats['candidates_evaluated']
+        distribution = {}
+        for evaluated in samples:
+            distribution[evaluated] = distribution.get(evaluated, 0) + 1
+        return {
+            'requests': requests,
+            'fallbacks': self.generation_stats['fallbacks'],
+            'fallback_rate': self.generation_stats['fallbacks'] / requests if requests else 0.0,
+            'candidates_per_request': self.get_profile().settings.get('num_return_sequences', 1),
+            'mean_candidates_evaluated': sum(samples) / len(samples) if samples else None,
+            'candidates_evaluated': dict(sorted(distribution.items())),
+            'banned_sequences': len(self.bad_words_ids),
+            'profiles': {
+                'default': self.default_profile,
+                'runs': {
+                    name: {**stats, 'budget_ms': self.profiles[name].budget_ms}
+                    for name, stats in self.profile_stats.items()
+                }
+            }
+        }
+    
+    def _record_stream(self, start: float, first_sentence_at: float = None) -> Dict:
+        now = time.perf_counter()
+        first_sentence_ms = (
+            (first_sentence_at - start) * 1000 if first_sentence_at is not None else None
+        )
+        self.stream_stats['streams'] += 1
+        if first_sentence_ms is not None:
+            # Keep a bounded window of recent samples
+            samples = self.stream_stats['time_to_first_sentence_ms']
+            samples.append(first_sentence_ms)
+            del samples[:-1000]
+        return {
+            'time_to_first_sentence_ms': first_sentence_ms,
+            'total_ms': (now - start) * 1000
+        }
+    
+    def _prompt_fields(self, drawing_data: dict) -> Dict[str, str]:
+        objects = drawing_data.get('objects', [])
+        return {
+            'scene_type': drawing_data.get('scene_type', 'general'),
+            'objects': ', '.join([obj['name'] for obj in objects])
+        }
+    
+    def _create_prompt(self, drawing_data: dict):
+        # Create child-friendly prompt
+        return STORY_PROMPT.format(**self._prompt_fields(drawing_data))
     
     def _structure_story(self, story_text: str):
         # Split into beginning, middle, end
@@ -1,6 +1,10 @@
 # backend/tests/conftest.py
 import pytest
 import os
+import torch
+from app.core.config import settings
+from app.services.story_generator import StoryGenerator
+from app.utils.lexicon import get_lexicon
 
 @pytest.fixture(autouse=True)
 def env_setup():
@@ -9,4 +13,56 @@ def env_setup():
     os.environ['MODEL_PATH'] = 'test_models'
     yield
     os.environ.pop('TESTING')
-    os.environ.pop('MODEL_PATH')
\ No newline at end of file
+    os.environ.pop('MODEL_PATH')
+
+class FakeTokenizer:
+    """Every prompt is the same three ids; `decode` turns output ids into text"""
+
+    # Every lexicon term encodes to ids with <unk>, so none gets banned
+    unk_token_id = 2
+
+    def __init__(self, decode, vocab=None):
+        self._decode = decode
+        self.vocab = vocab or {}
+
+    def get_vocab(self):
+        return dict(self.vocab)
+
+    def encode(self, text, return_tensors=None, add_special_tokens=True):
+        ids = [1, 2, 3]
+        return torch.tensor([ids]) if return_tensors else ids
+
+    def decode(self, ids, **kwargs):
+        if isinstance(ids, torch.Tensor):
+            ids = ids.tolist()
+        return self._decode(ids)
+
+class PassthroughSafetyFilter:
+    """Serves the first candidate as generated"""
+
+    def __init__(self):
+        self.lexicon = get_lexicon()
+
+    async def afilter_candidates(self, candidates, age_group="6-8"):
+        return candidates[0], 0
+
+@pytest.fixture
+def make_story_generator(monkeypatch):
+    """
+    Build a StoryGenerator through its constructor around a fake model.
+
+    `decode` maps output ids to text, `vocab` feeds the sentence-end ids.
+    The story and encoder caches are off; tests that want one set it.
+    """
+    monkeypatch.setattr(settings, 'STORY_CACHE_ENABLED', False)
+    monkeypatch.setattr(settings, 'T5_ENCODER_CACHE_SIZE', 0)
+
+    def make(model, decode=None, vocab=None, tokenizer=None, safety_filter=None, profiles=None):
+        return StoryGenerator(
+            tokenizer=tokenizer if tokenizer is not None else FakeTokenizer(decode, vocab),
+            model=model,
+            safety_filter=safety_filter if safety_filter is not None else PassthroughSafetyFilter(),
+            profiles=profiles
+        )
+
+    return make
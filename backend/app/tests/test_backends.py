@@ -0,0 +1,135 @@
+# backend/tests/test_backends.py
+import pytest
+import torch
+from PIL import Image
+from transformers import (
+    GPT2Config, GPT2LMHeadModel, ObjectDetectionPipeline,
+    ViTConfig, ViTForImageClassification, ViTImageProcessor,
+    T5Config, T5ForConditionalGeneration,
+    YolosConfig, YolosForObjectDetection, YolosImageProcessor
+)
+from app.services.backends import create_backend
+from benchmarks.compare_backends import (
+    compare_backends, detection_agreement, sample_drawings, text_similarity
+)
+
+def tiny_vit():
+    torch.manual_seed(0)
+    config = ViTConfig(
+        image_size=32, patch_size=8, hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=64, num_labels=5
+    )
+    return ViTForImageClassification(config).eval()
+
+def tiny_t5():
+    torch.manual_seed(0)
+    config = T5Config(
+        vocab_size=64, d_model=32, d_kv=8, d_ff=64, num_layers=2,
+        num_heads=2, decoder_start_token_id=0, pad_token_id=0, eos_token_id=1
+    )
+    return T5ForConditionalGeneration(config).eval()
+
+def tiny_yolos():
+    torch.manual_seed(0)
+    config = YolosConfig(
+        image_size=[64, 64], patch_size=16, hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=64, num_detection_tokens=5, num_labels=3
+    )
+    return YolosForObjectDetection(config).eval()
+
+class TestBackends:
+    @pytest.fixture
+    def pixel_values(self):
+        torch.manual_seed(1)
+        return torch.randn(2, 3, 32, 32)
+
+    @pytest.mark.parametrize("kind", ["eager", "int8", "bf16"])
+    def test_forward_matches_fp32(self, kind, pixel_values):
+        model = tiny_vit()
+        with torch.inference_mode():
+            expected = model(pixel_values=pixel_values).logits
+            backend = create_backend(kind, model)
+            logits = backend(pixel_values=pixel_values).logits
+
+        assert logits.dtype == torch.float32
+        assert torch.allclose(logits, expected, atol=0.1)
+        assert backend.config.num_labels == 5
+
+    @pytest.mark.parametrize("kind", ["int8", "bf16"])
+    def test_generate(self, kind):
+        model = tiny_t5()
+        input_ids = torch.tensor([[5, 6, 7, 1]])
+        with torch.inference_mode():
+            outputs = create_backend(kind, model).generate(input_ids, max_length=8)
+
+        assert outputs.shape[0] == 1
+
+    def test_onnx_forward_matches_fp32(self, pixel_values):
+        pytest.importorskip("onnxruntime")
+        model = tiny_vit()
+        backend = create_backend('onnx', model, image_size=32)
+        with torch.inference_mode():
+            expected = model(pixel_values=pixel_values).logits
+
+        assert torch.allclose(backend(pixel_values=pixel_values).logits, expected, atol=1e-4)
+
+    def test_onnx_backed_detection_pipeline(self):
+        pytest.importorskip("onnxruntime")
+        model = tiny_yolos()
+        detector = ObjectDetectionPipeline(
+            model=model, image_processor=YolosImageProcessor(size={'height': 64, 'width': 64})
+        )
+        image = Image.new('RGB', (80, 60), 'white')
+        expected = detector(image, threshold=0.0)
+
+        # Same wiring as the model registry for a pipeline model
+        detector.model = create_backend(
+            'onnx', model, output_names=['logits', 'pred_boxes'], image_size=64
+        )
+        detections = detector(image, threshold=0.0)
+
+        assert [d['label'] for d in detections] == [d['label'] for d in expected]
+        assert detections[0]['box'] == expected[0]['box']
+
+    def test_onnx_refuses_generating_decoder_at_load(self):
+        pytest.importorskip("onnxruntime")
+        model = GPT2LMHeadModel(GPT2Config(n_embd=32, n_layer=1, n_head=2, vocab_size=64)).eval()
+
+        with pytest.raises(ValueError, match="forward passes only"):
+            create_backend('onnx', model)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_backend('fp8', tiny_vit())
+
+class TestBackendComparison:
+    def test_detection_agreement(self):
+        box = {'x': 0, 'y': 0, 'width': 10, 'height': 10}
+        moved = {'x': 1, 'y': 1, 'width': 10, 'height': 10}
+        dog = {'name': 'dog', 'confidence': 0.9, 'box': box}
+
+        assert detection_agreement([dog], [{**dog, 'box': moved}]) == 1.0
+        assert detection_agreement([dog], [{**dog, 'name': 'cat'}]) == 0.0
+        assert detection_agreement([], []) == 1.0
+
+    def test_text_similarity(self):
+        assert text_similarity("a happy dog", "a happy dog") == 1.0
+        assert text_similarity("a happy dog", "a sad cat") < 1.0
+
+    def test_report(self):
+        bundle = {
+            'processor': ViTImageProcessor(size={'height': 32, 'width': 32}),
+            'model': tiny_vit()
+        }
+        report = compare_backends(
+            bundle, 'classification', ['int8', 'bf16'], sample_drawings(4, size=(64, 48)),
+            batch_size=2, iterations=1, warmup=0
+        )
+
+        assert set(report['backends']) == {'eager', 'int8', 'bf16'}
+        assert report['backends']['eager']['agreement'] == 1.0
+        for result in report['backends'].values():
+            assert result['throughput_per_s'] > 0
+            assert result['model_bytes'] > 0
+            assert result['rss_after_load_bytes'] >= 0
+            assert result['rss_after_forward_bytes'] >= 0
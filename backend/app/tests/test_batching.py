@@ -0,0 +1,61 @@
+# backend/tests/test_batching.py
+import pytest
+import asyncio
+from app.services.batching import BatchScheduler
+
+class TestBatchScheduler:
+    @pytest.fixture
+    def calls(self):
+        return []
+
+    @pytest.fixture
+    def scheduler(self, calls):
+        def double_batch(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+
+        return BatchScheduler(double_batch, max_batch_size=4, max_wait_ms=50)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_a_batch(self, scheduler, calls):
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(3)))
+
+        assert results == [0, 2, 4]
+        assert calls == [[0, 1, 2]]
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size(self, scheduler, calls):
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(10)))
+
+        assert results == [i * 2 for i in range(10)]
+        assert [len(batch) for batch in calls] == [4, 4, 2]
+        assert scheduler.get_stats()['largest_batch'] == 4
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_per_item_errors(self):
+        def batch_fn(items):
+            return [ValueError("bad item") if item < 0 else item for item in items]
+
+        scheduler = BatchScheduler(batch_fn, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(
+            scheduler.submit(1), scheduler.submit(-1), return_exceptions=True
+        )
+
+        assert results[0] == 1
+        assert isinstance(results[1], ValueError)
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_reaches_every_caller(self):
+        def batch_fn(items):
+            raise RuntimeError("model crashed")
+
+        scheduler = BatchScheduler(batch_fn, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(
+            scheduler.submit(1), scheduler.submit(2), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        await scheduler.close()
@@ -0,0 +1,84 @@
+# backend/tests/test_benchmark_suite.py
+import pytest
+import io
+import json
+from PIL import Image
+from app.services.ml_models import get_model_manager, set_model_manager
+from benchmarks.suite import benchmark_settings, compare_to_baseline, long_text, main
+from benchmarks.tiny_models import install_tiny_models
+
+def results(**medians):
+    return {'results': {name: {'median_ms': value} for name, value in medians.items()}}
+
+@pytest.fixture
+def tiny_models():
+    previous = get_model_manager()
+    with benchmark_settings():
+        yield install_tiny_models()
+    set_model_manager(previous)
+
+class TestBaselineComparison:
+    def test_regression_beyond_threshold(self):
+        regressions = compare_to_baseline(
+            results(fast=10.0, slow=30.0), results(fast=10.0, slow=20.0), threshold=0.25
+        )
+
+        assert [r['name'] for r in regressions] == ['slow']
+        assert regressions[0]['slowdown'] == pytest.approx(0.5)
+
+    def test_within_threshold_and_new_benchmarks_pass(self):
+        regressions = compare_to_baseline(
+            results(a=12.0, new=100.0), results(a=10.0, removed=1.0), threshold=0.25
+        )
+        assert regressions == []
+
+    def test_cli_fails_on_regression(self, tmp_path, tiny_models):
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps(results(**{'color_analyze.noise.1024x768': 1e-6})))
+        output = tmp_path / 'results.json'
+
+        code = main(['--baseline', str(baseline), '--output', str(output),
+                     '--only', 'color_analyze.noise.1024x768',
+                     '--iterations', '1', '--warmup', '0'])
+
+        assert code == 1
+        assert 'color_analyze.noise.1024x768' in json.loads(output.read_text())['results']
+
+    def test_update_baseline_merges(self, tmp_path, tiny_models):
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps(results(other=5.0)))
+
+        code = main(['--baseline', str(baseline), '--update-baseline',
+                     '--only', 'color_analyze.noise.1024x768',
+                     '--iterations', '1', '--warmup', '0'])
+        stored = json.loads(baseline.read_text())['results']
+
+        assert code == 0
+        assert set(stored) == {'other', 'color_analyze.noise.1024x768'}
+
+class TestTinyModels:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('detection_model', ['detr', 'yolo', 'cascade'])
+    async def test_process_image_offline(self, tiny_models, detection_model):
+        from app.services.ml_models import EnhancedDrawingProcessor
+        buf = io.BytesIO()
+        Image.new('RGB', (640, 480), 'white').save(buf, format='JPEG')
+
+        result = await EnhancedDrawingProcessor().process_image(buf.getvalue(), detection_model)
+
+        assert result['degraded'] == []
+        assert result['scene']['attributes']['size'] == (640, 480)
+        assert 'is_safe' in result['safe_for_children']
+
+    @pytest.mark.asyncio
+    async def test_generate_story_offline(self, tiny_models):
+        from app.services.story_generator import StoryGenerator
+
+        story = await StoryGenerator().generate_story({
+            'objects': [{'name': 'dog'}], 'scene_type': 'garden'
+        })
+
+        assert len(story['narrative']) == 3
+
+    def test_long_text(self):
+        assert len(long_text(300).split()) >= 300
@@ -0,0 +1,138 @@
+# backend/tests/test_blob_store.py
+import io
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from app.api.endpoints import blobs
+from app.services.blob_store import BlobStore
+
+def image_bytes(size=(800, 600), color='orange', image_format='PNG', mode='RGB'):
+    buf = io.BytesIO()
+    Image.new(mode, size, color).save(buf, format=image_format)
+    return buf.getvalue()
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path), thumbnail_sizes=(64, 256))
+
+class TestBlobStore:
+    def test_identical_uploads_are_stored_once(self, store, tmp_path):
+        data = image_bytes()
+
+        first = store.put(data)
+        second = store.put(data)
+        other = store.put(image_bytes(color='blue'))
+        spooled = store.put(io.BytesIO(data))
+
+        assert first.created and not second.created
+        assert first.name == second.name == spooled.name != other.name
+        assert not spooled.created
+        assert first.extension == '.png'
+        objects = [f for _, _, files in os.walk(tmp_path / 'objects') for f in files]
+        assert len(objects) == 2
+
+    def test_non_images_are_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.put(b"not an image")
+
+    def test_resolve_rejects_unknown_names(self, store):
+        ref = store.put(image_bytes())
+
+        assert store.resolve(ref.name) == store.object_path(ref.name)
+        assert store.resolve('../../etc/passwd') is None
+        assert store.resolve('0' * 64 + '.png') is None
+
+    @pytest.mark.asyncio
+    async def test_thumbnails_are_generated_once_in_background(self, store, monkeypatch):
+        calls = []
+        make_thumbnails = store.make_thumbnails
+        monkeypatch.setattr(store, 'make_thumbnails', lambda name: calls.append(name) or make_thumbnails(name))
+
+        ref = await store.ingest(image_bytes(image_format='JPEG'))
+        await store.ingest(image_bytes(image_format='JPEG'))
+        await store.drain()
+        path = await store.get_thumbnail(ref.name, 256)
+
+        assert calls == [ref.name]
+        with Image.open(path) as thumbnail:
+            assert thumbnail.format == 'JPEG'
+            assert max(thumbnail.size) == 256
+        with Image.open(store.thumbnail_path(ref.digest, 64)) as thumbnail:
+            assert thumbnail.size == (64, 48)
+
+    @pytest.mark.asyncio
+    async def test_missing_thumbnail_is_regenerated(self, store):
+        ref = store.put(image_bytes(mode='RGBA', color=(255, 0, 0, 0)))
+
+        path = await store.get_thumbnail(ref.name, 64)
+
+        with Image.open(path) as thumbnail:
+            # Transparent areas are flattened onto white
+            assert thumbnail.getpixel((0, 0)) == (255, 255, 255)
+        assert await store.get_thumbnail(ref.name, 100) is None
+
+    def test_urls(self, store):
+        ref = store.put(image_bytes())
+
+        assert store.url(ref) == f"/blobs/{ref.name}"
+        assert store.thumbnail_urls(ref) == {
+            '256': f"/blobs/{ref.name}/thumbnails/256",
+            '64': f"/blobs/{ref.name}/thumbnails/64"
+        }
+
+class TestBlobServing:
+    @pytest.fixture
+    def client(self, store, monkeypatch):
+        monkeypatch.setattr(blobs, 'get_blob_store', lambda: store)
+        app = FastAPI()
+        app.include_router(blobs.router)
+        return TestClient(app)
+
+    def test_etag_and_if_none_match(self, client, store):
+        data = image_bytes()
+        ref = store.put(data)
+
+        response = client.get(f"/blobs/{ref.name}")
+        cached = client.get(f"/blobs/{ref.name}", headers={'If-None-Match': response.headers['etag']})
+
+        assert response.status_code == 200
+        assert response.content == data
+        assert response.headers['etag'] == f'"{ref.digest}"'
+        assert response.headers['content-type'] == 'image/png'
+        assert 'immutable' in response.headers['cache-control']
+        assert cached.status_code == 304
+        assert cached.content == b''
+
+    def test_range_requests(self, client, store):
+        data = image_bytes()
+        ref = store.put(data)
+        url = f"/blobs/{ref.name}"
+
+        head = client.get(url, headers={'Range': 'bytes=0-9'})
+        tail = client.get(url, headers={'Range': 'bytes=-5'})
+        rest = client.get(url, headers={'Range': 'bytes=10-'})
+        unsatisfiable = client.get(url, headers={'Range': f'bytes={len(data)}-'})
+        stale = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"other"'})
+
+        assert head.status_code == 206
+        assert head.content == data[:10]
+        assert head.headers['content-range'] == f"bytes 0-9/{len(data)}"
+        assert tail.content == data[-5:]
+        assert rest.content == data[10:]
+        assert unsatisfiable.status_code == 416
+        assert unsatisfiable.headers['content-range'] == f"bytes */{len(data)}"
+        assert stale.status_code == 200
+        assert stale.content == data
+
+    def test_thumbnail_serving(self, client, store):
+        ref = store.put(image_bytes())
+
+        response = client.get(f"/blobs/{ref.name}/thumbnails/64")
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'image/jpeg'
+        assert response.headers['etag'] == f'"{ref.digest}-64"'
+        assert client.get(f"/blobs/{ref.name}/thumbnails/65").status_code == 404
+        assert client.get(f"/blobs/{'0' * 64}.png").status_code == 404
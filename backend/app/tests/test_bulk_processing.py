@@ -0,0 +1,142 @@
+# backend/tests/test_bulk_processing.py
+import pytest
+import asyncio
+import io
+import json
+import zipfile
+import numpy as np
+from app.services.bulk_processing import process_bulk, to_ndjson, upload_items, zip_items
+
+class FakeUpload:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.data = data
+        self.reads = 0
+
+    async def read(self, size=-1):
+        self.reads += 1
+        return self.data if size < 0 else self.data[:size]
+
+class TrackingProcessor:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def process_image(self, image_data: bytes):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if image_data == b'broken':
+                raise Exception("Error processing image: cannot identify image file")
+            return {'objects': [], 'size': len(image_data)}
+        finally:
+            self.active -= 1
+
+async def collect(stream):
+    return [line async for line in stream]
+
+def make_zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+class TestBulkProcessing:
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        processor = TrackingProcessor()
+        uploads = [FakeUpload(f"d{i}.png", b'x' * i) for i in range(20)]
+
+        lines = await collect(process_bulk(
+            processor.process_image, upload_items(uploads), max_concurrency=4
+        ))
+
+        assert len(lines) == 20
+        assert processor.peak == 4
+        assert {line['id'] for line in lines} == {f"d{i}.png" for i in range(20)}
+
+    @pytest.mark.asyncio
+    async def test_failures_are_isolated(self):
+        processor = TrackingProcessor()
+        uploads = [FakeUpload('a.png', b'ok'), FakeUpload('b.png', b'broken'),
+                   FakeUpload('c.png', b'fine')]
+
+        lines = await collect(process_bulk(
+            processor.process_image, upload_items(uploads, ids=['a', 'b', 'c'])
+        ))
+        by_id = {line['id']: line for line in lines}
+
+        assert by_id['b']['status'] == 'error'
+        assert 'cannot identify' in by_id['b']['error']
+        assert by_id['a']['status'] == by_id['c']['status'] == 'ok'
+
+    @pytest.mark.asyncio
+    async def test_results_stream_as_they_finish(self):
+        async def process(image_data):
+            await asyncio.sleep(0.2 if image_data == b'slow' else 0.01)
+            return {}
+
+        uploads = [FakeUpload('slow', b'slow'), FakeUpload('fast', b'fast')]
+        lines = await collect(process_bulk(process, upload_items(uploads)))
+
+        assert [line['id'] for line in lines] == ['fast', 'slow']
+
+    @pytest.mark.asyncio
+    async def test_uploads_read_lazily(self):
+        uploads = [FakeUpload(f"d{i}", b'x') for i in range(10)]
+        stream = process_bulk(TrackingProcessor().process_image,
+                              upload_items(uploads), max_concurrency=2)
+
+        await stream.__anext__()
+        assert sum(upload.reads for upload in uploads) <= 3
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_oversized_upload_rejected(self):
+        uploads = [FakeUpload('big', b'x' * 100), FakeUpload('small', b'x')]
+
+        lines = await collect(process_bulk(
+            TrackingProcessor().process_image, upload_items(uploads, max_bytes=10)
+        ))
+        by_id = {line['id']: line for line in lines}
+
+        assert by_id['big']['status'] == 'error'
+        assert by_id['small']['status'] == 'ok'
+
+    def test_mismatched_ids(self):
+        with pytest.raises(ValueError):
+            upload_items([FakeUpload('a', b'')], ids=['a', 'b'])
+
+    @pytest.mark.asyncio
+    async def test_zip_archive(self):
+        archive = make_zip({
+            'class/anna.png': b'anna',
+            'class/ben.png': b'broken',
+            'class/.DS_Store': b'junk',
+            '__MACOSX/class/._anna.png': b'junk',
+            'class/huge.png': b'x' * 100
+        })
+
+        lines = await collect(process_bulk(
+            TrackingProcessor().process_image, zip_items(archive, max_bytes=50)
+        ))
+        by_id = {line['id']: line for line in lines}
+
+        assert set(by_id) == {'class/anna.png', 'class/ben.png', 'class/huge.png'}
+        assert by_id['class/anna.png']['result']['size'] == 4
+        assert by_id['class/ben.png']['status'] == 'error'
+        assert by_id['class/huge.png']['status'] == 'error'
+
+    def test_invalid_zip(self):
+        with pytest.raises(zipfile.BadZipFile):
+            zip_items(io.BytesIO(b'not a zip'))
+
+    def test_ndjson_line(self):
+        line = to_ndjson({'id': 'a', 'result': {'brightness': np.float32(0.5)}})
+
+        assert line.endswith("\n") and line.count("\n") == 1
+        assert json.loads(line)['result']['brightness'] == 0.5
@@ -0,0 +1,108 @@
+# backend/tests/test_cascade_detection.py
+import pytest
+from PIL import Image
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+from app.services.ml_models import EnhancedDrawingProcessor
+from app.services.preprocessing import PreprocessedImage
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def detection(name, confidence):
+    return {'name': name, 'confidence': confidence,
+            'box': {'x': 0, 'y': 0, 'width': 10, 'height': 10}}
+
+@pytest.fixture
+def cascade(monkeypatch):
+    monkeypatch.setattr(settings, 'CASCADE_MIN_OBJECTS', 1)
+    monkeypatch.setattr(settings, 'CASCADE_MAX_OBJECTS', 3)
+    monkeypatch.setattr(settings, 'CASCADE_MIN_CONFIDENCE', 0.6)
+    monkeypatch.setattr(settings, 'CASCADE_MIN_MEAN_CONFIDENCE', 0.85)
+
+    processor = EnhancedDrawingProcessor.__new__(EnhancedDrawingProcessor)
+    processor.cascade_stats = {
+        'requests': 0,
+        'escalations': 0,
+        'latency_ms': {'fast': [], 'escalated': []}
+    }
+    processor.calls = []
+    processor.yolo_results = []
+
+    async def detect_with_yolo(image):
+        processor.calls.append('yolo')
+        return processor.yolo_results
+
+    async def detect_with_detr(image):
+        processor.calls.append('detr')
+        return [detection('dog', 0.99)]
+
+    processor._detect_with_yolo = detect_with_yolo
+    processor._detect_with_detr = detect_with_detr
+    return processor
+
+@pytest.fixture
+def image():
+    return PreprocessedImage(Image.new('RGB', (32, 32)), (32, 32))
+
+class TestCascadeDetection:
+    @pytest.mark.asyncio
+    async def test_confident_result_takes_fast_path(self, cascade, image):
+        cascade.yolo_results = [detection('cat', 0.95), detection('tree', 0.9)]
+
+        objects = await cascade._detect_objects(image, 'cascade')
+
+        assert [obj['name'] for obj in objects] == ['cat', 'tree']
+        assert cascade.calls == ['yolo']
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('yolo_results', [
+        [],                                                    # nothing found
+        [detection('cat', 0.95), detection('tree', 0.55)],     # one weak detection
+        [detection('cat', 0.8), detection('tree', 0.8)],       # low mean confidence
+        [detection('cat', 0.95)] * 4                           # too many objects
+    ])
+    async def test_uncertain_result_escalates(self, cascade, image, yolo_results):
+        cascade.yolo_results = yolo_results
+
+        objects = await cascade._detect_objects(image, 'cascade')
+
+        assert objects[0]['name'] == 'dog'
+        assert cascade.calls == ['yolo', 'detr']
+
+    @pytest.mark.asyncio
+    async def test_stats(self, cascade, image):
+        cascade.yolo_results = [detection('cat', 0.95)]
+        for _ in range(3):
+            await cascade._detect_objects(image, 'cascade')
+        cascade.yolo_results = []
+        await cascade._detect_objects(image, 'cascade')
+
+        stats = cascade.get_cascade_stats()
+
+        assert stats['requests'] == 4
+        assert stats['escalations'] == 1
+        assert stats['escalation_rate'] == 0.25
+        assert stats['latency']['fast']['count'] == 3
+        assert stats['latency']['escalated']['count'] == 1
+        assert stats['latency']['escalated']['p95_ms'] >= 0
+
+    @pytest.mark.asyncio
+    async def test_paths_exported(self, cascade, image):
+        fast = sample('detection_cascade_total', path='fast')
+        escalated = sample('detection_cascade_total', path='escalated')
+        cascade.yolo_results = [detection('cat', 0.95)]
+        await cascade._detect_objects(image, 'cascade')
+        cascade.yolo_results = []
+        await cascade._detect_objects(image, 'cascade')
+        await cascade._detect_objects(image, 'cascade')
+
+        assert sample('detection_cascade_total', path='fast') == fast + 1
+        assert sample('detection_cascade_total', path='escalated') == escalated + 2
+        assert sample('detection_cascade_duration_seconds_count', path='escalated') >= 2
+
+    def test_empty_stats(self, cascade):
+        stats = cascade.get_cascade_stats()
+
+        assert stats['escalation_rate'] == 0.0
+        assert stats['latency']['fast']['mean_ms'] is None
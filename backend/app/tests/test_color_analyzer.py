@@ -0,0 +1,79 @@
+# backend/tests/test_color_analyzer.py
+import pytest
+import colorsys
+import numpy as np
+from PIL import Image
+from app.services.ml_models import ColorAnalyzer
+
+class TestColorAnalyzer:
+    @pytest.fixture
+    def color_analyzer(self):
+        return ColorAnalyzer()
+
+    @pytest.fixture
+    def striped_drawing(self):
+        # 50% white, 30% red, 20% blue
+        pixels = np.zeros((100, 100, 3), dtype=np.uint8)
+        pixels[:, :50] = (255, 255, 255)
+        pixels[:, 50:80] = (220, 20, 60)
+        pixels[:, 80:] = (30, 144, 255)
+        return Image.fromarray(pixels)
+
+    def test_output_schema(self, color_analyzer, striped_drawing):
+        result = color_analyzer.analyze(striped_drawing)
+
+        assert set(result) == {'dominant_colors', 'color_mood', 'palette'}
+        assert set(result['color_mood']) == {'brightness', 'saturation', 'mood'}
+
+    def test_dominant_colors(self, color_analyzer, striped_drawing):
+        dominant = color_analyzer.analyze(striped_drawing)['dominant_colors']
+
+        assert [color['name'] for color in dominant] == ['white', 'red', 'blue']
+        assert [color['rgb'] for color in dominant] == [
+            (255, 255, 255), (220, 20, 60), (30, 144, 255)
+        ]
+        assert [round(color['percentage'], 2) for color in dominant] == [0.5, 0.3, 0.2]
+
+    def test_palette(self, color_analyzer, striped_drawing):
+        palette = color_analyzer.analyze(striped_drawing)['palette']
+        assert palette == ['#ffffff', '#dc143c', '#1e90ff']
+
+    def test_mood_is_frequency_weighted(self, color_analyzer):
+        # Mostly black with a few bright pixels is still a dark drawing
+        pixels = np.zeros((100, 100, 3), dtype=np.uint8)
+        pixels[0, :10] = (255, 255, 0)
+        mood = color_analyzer.analyze(Image.fromarray(pixels))['color_mood']
+
+        assert mood['brightness'] < 0.05
+        assert mood['mood'] == 'mysterious'
+
+    def test_rgb_to_hsv_matches_colorsys(self):
+        rng = np.random.default_rng(0)
+        colors = rng.integers(0, 256, size=(500, 3))
+        colors[:5] = [(0, 0, 0), (255, 255, 255), (128, 128, 128), (255, 0, 0), (0, 0, 255)]
+        h, s, v = ColorAnalyzer._rgb_to_hsv(colors)
+
+        expected = np.array([colorsys.rgb_to_hsv(*(c / 255.0)) for c in colors])
+        assert np.allclose(h, expected[:, 0] * 360)
+        assert np.allclose(s, expected[:, 1])
+        assert np.allclose(v, expected[:, 2])
+
+    def test_cost_is_bounded_for_high_color_count(self, color_analyzer, monkeypatch):
+        rng = np.random.default_rng(0)
+        noise = Image.fromarray(rng.integers(0, 256, size=(3000, 4000, 3), dtype=np.uint8))
+        histogram = color_analyzer._color_histogram
+        seen = []
+
+        def recording_histogram(pixels):
+            counts, colors = histogram(pixels)
+            seen.append((len(pixels), len(counts)))
+            return counts, colors
+
+        monkeypatch.setattr(color_analyzer, '_color_histogram', recording_histogram)
+        result = color_analyzer.analyze(noise)
+
+        assert len(result['dominant_colors']) == 5
+        # 12M pixels of noise: only a bounded sample, in a bounded number of bins
+        (pixels, bins), = seen
+        assert pixels <= color_analyzer.max_pixels
+        assert bins <= 2 ** (3 * color_analyzer.bits_per_channel)
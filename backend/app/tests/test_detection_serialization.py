@@ -0,0 +1,64 @@
+# backend/tests/test_detection_serialization.py
+import json
+import torch
+from fastapi.responses import ORJSONResponse
+from app.models.drawing import ColumnarDrawingAnalysis, DrawingAnalysis
+from app.services.ml_models import format_detections
+from benchmarks.detection_serialization import (
+    ID2LABEL, format_detections_itemwise, run, sample_results
+)
+
+class TestFormatDetections:
+    def test_matches_itemwise_conversion(self):
+        results = sample_results(100)
+
+        assert format_detections(results, ID2LABEL) == format_detections_itemwise(results, ID2LABEL)
+
+    def test_no_detections(self):
+        results = {
+            'scores': torch.zeros(0), 'labels': torch.zeros(0, dtype=torch.long),
+            'boxes': torch.zeros(0, 4)
+        }
+
+        assert format_detections(results, ID2LABEL) == []
+
+    def test_box_is_xywh(self):
+        results = {
+            'scores': torch.tensor([0.5]), 'labels': torch.tensor([3]),
+            'boxes': torch.tensor([[10.0, 20.0, 40.0, 60.0]])
+        }
+
+        assert format_detections(results, ID2LABEL) == [{
+            'name': 'label_3', 'confidence': 0.5,
+            'box': {'x': 10.0, 'y': 20.0, 'width': 30.0, 'height': 40.0}
+        }]
+
+class TestResponseModels:
+    def result(self, count=3):
+        return {'objects': format_detections(sample_results(count), ID2LABEL), 'scene_type': 'park'}
+
+    def test_typed_analysis_round_trips(self):
+        result = self.result()
+
+        body = ORJSONResponse(DrawingAnalysis(**result).model_dump(mode='json')).body
+
+        assert json.loads(body) == json.loads(json.dumps(result))
+
+    def test_columnar_layout_is_parallel_arrays(self):
+        result = self.result()
+
+        columnar = ColumnarDrawingAnalysis.from_result(result)
+
+        assert columnar.scene_type == 'park'
+        for i, obj in enumerate(result['objects']):
+            assert columnar.objects.name[i] == obj['name']
+            assert columnar.objects.confidence[i] == obj['confidence']
+            assert columnar.objects.width[i] == obj['box']['width']
+        assert ColumnarDrawingAnalysis.from_result({'objects': [], 'scene_type': 'x'}).objects.name == []
+
+    def test_benchmark_reports_every_path(self):
+        report = run(detections=100, iterations=2)
+
+        assert set(report['postprocess']) == {'item_loop', 'bulk_tolist'}
+        assert set(report['serialize']) == {'dict_stdlib', 'typed_orjson', 'columnar_orjson'}
+        assert report['bytes']['columnar'] < report['bytes']['objects']
@@ -0,0 +1,165 @@
+# backend/tests/test_generation_profiles.py
+import asyncio
+import time
+import pytest
+import torch
+from app.core.config import settings
+from app.services.generation_profiles import Deadline, build_profiles, sentence_end_ids
+from app.services.inference import get_executor
+from app.services.story_cache import StoryCache
+from app.services.story_generator import _trim_to_sentence
+
+WORDS = ["<pad>", "Once", "a", "dog", "played.", "It", "ran", "far.", "The", "end"]
+
+class SteppingT5Model:
+    """Emits WORDS one token per step, checking the stopping criteria like generate()"""
+
+    def __init__(self, step_seconds=0.0):
+        self.step_seconds = step_seconds
+        self.calls = []
+
+    def generate(self, input_ids, stopping_criteria=None, **kwargs):
+        self.calls.append(kwargs)
+        ids = torch.tensor([[0]])
+        for token in range(1, len(WORDS)):
+            time.sleep(self.step_seconds)
+            ids = torch.cat([ids, torch.tensor([[token]])], dim=1)
+            if stopping_criteria and stopping_criteria(ids, None):
+                break
+        return ids
+
+# Word -> id, so 'played.' (4) and 'far.' (7) end sentences
+VOCAB = {word: token for token, word in enumerate(WORDS)}
+
+def decode_words(ids):
+    return " ".join(WORDS[i] for i in ids if i != 0)
+
+def narrative(story):
+    return ' '.join(section['content'] for section in story['narrative'] if section['content'])
+
+class TestProfiles:
+    def test_decoding_strategies(self):
+        profiles = build_profiles(3, {'instant': 500, 'premium': 9000})
+
+        instant = profiles['instant'].settings
+        assert instant['num_beams'] == 1 and not instant.get('do_sample')
+        # Temperature only where it has an effect
+        assert 'temperature' not in instant
+        assert profiles['standard'].settings['do_sample']
+        assert profiles['standard'].settings['temperature'] == 0.7
+        assert profiles['premium'].settings['num_beams'] >= 3
+        assert 'temperature' not in profiles['premium'].settings
+        assert profiles['instant'].budget_ms == 500
+        assert profiles['standard'].budget_ms == 0
+
+    def test_only_standard_samples(self):
+        profiles = build_profiles(3, {})
+
+        assert [name for name, profile in profiles.items() if not profile.deterministic] == ['standard']
+
+    def test_sentence_end_ids(self):
+        vocab = {'▁dog': 1, '▁played.': 2, '!': 3, '▁why?"': 4, '▁Mr': 5}
+
+        assert sentence_end_ids(vocab) == {2, 3, 4}
+
+    def test_trim_to_sentence(self):
+        assert _trim_to_sentence("Once a dog played. It ran") == "Once a dog played."
+        assert _trim_to_sentence("Once a dog") == "Once a dog"
+
+class TestDeadline:
+    def test_sentence_end_only_counts_near_the_deadline(self):
+        deadline = Deadline(10_000, sentence_window=0.2)
+
+        assert not deadline.should_stop([4], {4})
+        assert not deadline.cut_short
+
+    def test_stops_at_sentence_end_in_window(self):
+        deadline = Deadline(1000, sentence_window=0.5, start=time.monotonic() - 0.6)
+
+        assert not deadline.should_stop([3], {4})
+        assert deadline.should_stop([3, 4], {4})
+        assert deadline.cut_short
+
+    def test_stops_at_budget_mid_sentence(self):
+        deadline = Deadline(1000, sentence_window=0.2, start=time.monotonic() - 1.5)
+
+        assert deadline.should_stop([3], {4})
+        assert deadline.cut_short
+
+class TestProfiledGeneration:
+    @pytest.fixture
+    def generator(self, make_story_generator):
+        return make_story_generator(
+            SteppingT5Model(), decode_words, vocab=VOCAB, profiles=build_profiles(1, {})
+        )
+
+    @pytest.mark.asyncio
+    async def test_requested_profile_runs(self, generator):
+        story = await generator.generate_story({'objects': [], 'profile': 'premium'})
+
+        assert story['generation'] == {'profile': 'premium', 'cut_short': False, 'budget_ms': 0.0}
+        assert generator.model.calls[0]['num_beams'] == generator.profiles['premium'].settings['num_beams']
+        assert 'stopping_criteria' not in generator.model.calls[0]
+        assert narrative(story).endswith('The end')
+
+    @pytest.mark.asyncio
+    async def test_default_profile(self, generator):
+        story = await generator.generate_story({'objects': []})
+
+        assert story['generation']['profile'] == 'standard'
+        assert generator.get_generation_stats()['profiles']['runs']['standard']['requests'] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_profile(self, generator):
+        with pytest.raises(ValueError):
+            await generator.generate_story({'objects': [], 'profile': 'turbo'})
+
+    @pytest.mark.asyncio
+    async def test_budget_ends_at_sentence_boundary(self, generator, monkeypatch):
+        monkeypatch.setattr(settings, 'STORY_DEADLINE_SENTENCE_WINDOW', 0.6)
+        # 200 ms budget: sentence ends count from 80 ms, 'played.' arrives at ~120 ms
+        generator.profiles = build_profiles(1, {'instant': 200})
+        generator.model = SteppingT5Model(step_seconds=0.03)
+        generator.story_cache = StoryCache(variants_per_key=1)
+
+        story = await generator.generate_story({'objects': [], 'profile': 'instant'})
+
+        assert story['generation'] == {'profile': 'instant', 'cut_short': True, 'budget_ms': 200.0}
+        assert narrative(story).strip() == 'Once a dog played.'
+        assert generator.get_generation_stats()['profiles']['runs']['instant']['cut_short'] == 1
+
+        # A cut-short story is not cached
+        await generator.generate_story({'objects': [], 'profile': 'instant'})
+        assert len(generator.model.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_deterministic_profile_caches_one_variant(self, generator):
+        generator.story_cache = StoryCache(variants_per_key=3)
+
+        first = await generator.generate_story({'objects': [], 'profile': 'premium'})
+        second = await generator.generate_story({'objects': [], 'profile': 'premium'})
+
+        assert first == second
+        assert len(generator.model.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_sampling_profile_fills_every_variant(self, generator):
+        generator.story_cache = StoryCache(variants_per_key=3)
+
+        for _ in range(4):
+            await generator.generate_story({'objects': [], 'profile': 'standard'})
+
+        assert len(generator.model.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_does_not_count_against_budget(self, generator):
+        generator.profiles = build_profiles(1, {'instant': 200})
+        # The single t5 worker is busy for longer than the whole budget
+        busy = asyncio.ensure_future(get_executor('t5').run(time.sleep, 0.4))
+        await asyncio.sleep(0)
+
+        story = await generator.generate_story({'objects': [], 'profile': 'instant'})
+        await busy
+
+        assert story['generation']['cut_short'] is False
+        assert narrative(story).endswith('The end')
@@ -0,0 +1,146 @@
+# backend/tests/test_ingestion.py
+import io
+import struct
+import zlib
+import pytest
+from PIL import Image
+from app.core.config import settings
+from app.services.ingestion import (
+    ImageDimensionsTooLarge, InvalidImage, UnsupportedImageFormat, UploadTooLarge,
+    ingest_upload, inspect_image, sniff_format, spool_upload
+)
+from app.services.preprocessing import ImagePreprocessor
+
+class ChunkedUpload:
+    """UploadFile stand-in that records every read"""
+
+    def __init__(self, data, size=None):
+        self.file = io.BytesIO(data)
+        self.size = size
+        self.reads = []
+
+    async def read(self, size=-1):
+        chunk = self.file.read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+def encode(image_format, size=(64, 48)):
+    buf = io.BytesIO()
+    Image.new('RGB', size, 'orange').save(buf, format=image_format)
+    return buf.getvalue()
+
+def png_header(width, height):
+    """A PNG that claims `width`x`height` but carries almost no data"""
+    def chunk(kind, payload):
+        return struct.pack('>I', len(payload)) + kind + payload + \
+            struct.pack('>I', zlib.crc32(kind + payload))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', zlib.compress(b'\x00')) + \
+        chunk(b'IEND', b'')
+
+class TestSniffing:
+    @pytest.mark.parametrize('image_format', ['JPEG', 'PNG', 'GIF', 'WEBP', 'BMP'])
+    def test_known_formats(self, image_format):
+        assert sniff_format(encode(image_format)[:12]) == image_format
+
+    def test_unknown_bytes(self):
+        assert sniff_format(b'%PDF-1.7 ...') is None
+        assert sniff_format(b'') is None
+
+class TestSpoolUpload:
+    @pytest.mark.asyncio
+    async def test_upload_is_copied_in_chunks(self):
+        data = encode('PNG', (300, 300))
+        upload = ChunkedUpload(data)
+
+        with await spool_upload(upload, max_bytes=len(data), chunk_size=100) as spool:
+            assert spool.read() == data
+        assert max(upload.reads) <= 100
+
+    @pytest.mark.asyncio
+    async def test_known_size_is_rejected_without_reading(self):
+        upload = ChunkedUpload(encode('PNG'), size=10_000)
+
+        with pytest.raises(UploadTooLarge) as error:
+            await spool_upload(upload, max_bytes=1000)
+
+        assert error.value.status_code == 413
+        assert upload.reads == []
+
+    @pytest.mark.asyncio
+    async def test_copy_stops_at_the_limit(self):
+        upload = ChunkedUpload(b'\x89PNG\r\n\x1a\n' + b'x' * 10_000)
+
+        with pytest.raises(UploadTooLarge):
+            await spool_upload(upload, max_bytes=1000, chunk_size=256)
+
+        assert sum(upload.reads) <= 1000 + 256
+
+    @pytest.mark.asyncio
+    async def test_unsupported_format_rejected_after_first_chunk(self):
+        upload = ChunkedUpload(b'%PDF-1.7' + b'x' * 10_000)
+
+        with pytest.raises(UnsupportedImageFormat) as error:
+            await spool_upload(upload, chunk_size=256)
+
+        assert error.value.status_code == 415
+        assert upload.reads == [256]
+
+    @pytest.mark.asyncio
+    async def test_disabled_format_is_rejected(self, monkeypatch):
+        monkeypatch.setattr(settings, 'UPLOAD_FORMATS', ['JPEG', 'PNG'])
+
+        with pytest.raises(UnsupportedImageFormat):
+            await spool_upload(ChunkedUpload(encode('GIF')))
+
+    @pytest.mark.asyncio
+    async def test_large_uploads_spill_to_disk(self, monkeypatch):
+        monkeypatch.setattr(settings, 'UPLOAD_SPOOL_BYTES', 1024)
+        data = encode('BMP', (100, 100))
+
+        with await spool_upload(ChunkedUpload(data), chunk_size=512) as spool:
+            assert spool._rolled
+
+class TestInspectImage:
+    def test_reads_dimensions_from_header(self):
+        assert inspect_image(encode('JPEG', (640, 480))) == ('JPEG', (640, 480))
+
+    def test_pixel_bomb_is_rejected_from_header(self):
+        with pytest.raises(ImageDimensionsTooLarge) as error:
+            inspect_image(png_header(8000, 8000), max_pixels=50_000_000)
+
+        assert error.value.status_code == 413
+        assert "8000x8000" in str(error.value)
+
+    def test_corrupt_image(self):
+        with pytest.raises(InvalidImage) as error:
+            inspect_image(b'\x89PNG\r\n\x1a\n' + b'garbage')
+
+        assert error.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_ingest_upload(self):
+        with await ingest_upload(ChunkedUpload(encode('PNG', (64, 48)))) as spool:
+            assert spool.tell() == 0
+            assert Image.open(spool).size == (64, 48)
+
+        with pytest.raises(ImageDimensionsTooLarge):
+            await ingest_upload(ChunkedUpload(encode('PNG', (64, 48))), max_pixels=1000)
+
+        with pytest.raises(InvalidImage):
+            await ingest_upload(ChunkedUpload(b''))
+
+class TestDecodeFromSpool:
+    @pytest.mark.asyncio
+    async def test_preprocessor_decodes_spooled_upload(self):
+        data = encode('JPEG', (1600, 1200))
+
+        with await ingest_upload(ChunkedUpload(data)) as spool:
+            image = ImagePreprocessor().decode(spool)
+
+        assert image.original_size == (1600, 1200)
+        assert ImagePreprocessor().decode(data).size == image.size
+
+    def test_preprocessor_checks_pixels_before_decoding(self):
+        with pytest.raises(ValueError):
+            ImagePreprocessor(max_pixels=1000).decode(png_header(8000, 8000))
@@ -0,0 +1,175 @@
+# backend/tests/test_job_queue.py
+import pytest
+import asyncio
+from app.services.job_queue import (
+    DONE, FAILED, QUEUED, RUNNING,
+    InMemoryJobQueue, JobService, QueueFullError, SQLiteJobQueue
+)
+
+async def fake_story(drawing_data):
+    await asyncio.sleep(drawing_data.get('seconds', 0.01))
+    if drawing_data.get('fail'):
+        raise Exception("Error generating story: model unavailable")
+    return {'title': f"Story about {drawing_data['scene_type']}"}
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def queue(request, tmp_path):
+    if request.param == 'sqlite':
+        queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+        yield queue
+        queue.close()
+    else:
+        yield InMemoryJobQueue()
+
+class TestJobQueues:
+    def test_claims_oldest_first(self, queue):
+        queue.put('a', {'n': 1}, now=1.0)
+        queue.put('b', {'n': 2}, now=2.0)
+
+        assert queue.depth() == 2
+        assert queue.claim(now=3.0) == ('a', {'n': 1})
+        assert queue.get('a')['status'] == RUNNING
+        assert queue.depth() == 1
+
+    def test_finish_and_prune(self, queue):
+        queue.put('a', {}, now=1.0)
+        queue.claim(now=2.0)
+        queue.finish('a', DONE, {'title': 'x'}, None, now=3.0)
+
+        assert queue.get('a')['result'] == {'title': 'x'}
+        queue.prune(older_than=4.0)
+        assert queue.get('a') is None
+
+    def test_empty_claim(self, queue):
+        assert queue.claim(now=1.0) is None
+
+    def test_put_refused_at_max_depth(self, queue):
+        assert queue.put('a', {}, now=1.0, max_depth=1)
+        assert not queue.put('b', {}, now=2.0, max_depth=1)
+
+        assert queue.depth() == 1
+        assert queue.get('b') is None
+
+def test_sqlite_requeues_interrupted_jobs(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    queue = SQLiteJobQueue(path)
+    queue.put('a', {'scene_type': 'park'}, now=1.0)
+    queue.claim(now=2.0)
+    queue.close()
+
+    reopened = SQLiteJobQueue(path)
+    assert reopened.get('a')['status'] == QUEUED
+    assert reopened.claim(now=3.0) == ('a', {'scene_type': 'park'})
+    reopened.close()
+
+class TestJobService:
+    @pytest.mark.asyncio
+    async def test_job_runs_to_completion(self, queue):
+        service = JobService(fake_story, queue, workers=2)
+        await service.start()
+        try:
+            job_id = await service.submit({'scene_type': 'garden'})
+            job = await service.get(job_id, wait=5)
+        finally:
+            await service.stop()
+
+        assert job['status'] == DONE
+        assert job['result'] == {'title': 'Story about garden'}
+
+    @pytest.mark.asyncio
+    async def test_failed_job_reports_error(self, queue):
+        service = JobService(fake_story, queue, workers=1)
+        await service.start()
+        try:
+            job_id = await service.submit({'scene_type': 'garden', 'fail': True})
+            job = await service.get(job_id, wait=5)
+        finally:
+            await service.stop()
+
+        assert job['status'] == FAILED
+        assert 'model unavailable' in job['error']
+
+    @pytest.mark.asyncio
+    async def test_full_backlog_rejected(self):
+        service = JobService(fake_story, InMemoryJobQueue(), workers=1, max_depth=2)
+        # Workers not started, so the backlog only grows
+        await service.submit({'scene_type': 'a'})
+        await service.submit({'scene_type': 'b'})
+
+        with pytest.raises(QueueFullError) as excinfo:
+            await service.submit({'scene_type': 'c'})
+
+        assert excinfo.value.retry_after >= 1
+        assert (await service.get_stats())['rejected'] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_submits_respect_max_depth(self, queue):
+        service = JobService(fake_story, queue, workers=1, max_depth=3)
+
+        results = await asyncio.gather(
+            *(service.submit({'scene_type': str(i)}) for i in range(10)),
+            return_exceptions=True
+        )
+
+        assert sum(not isinstance(result, QueueFullError) for result in results) == 3
+        assert queue.depth() == 3
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_pruned_while_busy(self):
+        service = JobService(fake_story, InMemoryJobQueue(), workers=1,
+                             result_ttl_seconds=0, prune_seconds=0.01)
+        await service.start()
+        try:
+            job_id = await service.submit({'scene_type': 'garden'})
+            # Keep the worker busy after it, so it never idles
+            await service.submit({'scene_type': 'park', 'seconds': 1})
+            for _ in range(100):
+                if await service.get(job_id) is None:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await service.stop()
+
+        assert await service.get(job_id) is None
+
+    @pytest.mark.asyncio
+    async def test_workers_bound_concurrency(self):
+        running = []
+        peak = []
+
+        async def counted_story(drawing_data):
+            running.append(drawing_data)
+            peak.append(len(running))
+            try:
+                return await fake_story(drawing_data)
+            finally:
+                running.remove(drawing_data)
+
+        service = JobService(counted_story, InMemoryJobQueue(), workers=2)
+        await service.start()
+        try:
+            job_ids = [await service.submit({'scene_type': str(i), 'seconds': 0.1})
+                       for i in range(4)]
+            jobs = [await service.get(job_id, wait=5) for job_id in job_ids]
+        finally:
+            await service.stop()
+
+        assert all(job['status'] == DONE for job in jobs)
+        # Two workers, four jobs: never more than two at once
+        assert max(peak) == 2
+
+        stats = await service.get_stats()
+        assert stats['completed'] == 4
+        assert stats['depth'] == 0
+        assert stats['wait_ms']['count'] == 4
+        assert stats['wait_ms']['p95'] >= 90
+
+    @pytest.mark.asyncio
+    async def test_long_poll_times_out(self):
+        service = JobService(fake_story, InMemoryJobQueue(), workers=1)
+        job_id = await service.submit({'scene_type': 'garden'})
+
+        job = await service.get(job_id, wait=0.05)
+
+        assert job['status'] == QUEUED
+        assert await service.get('missing') is None
@@ -0,0 +1,157 @@
+# backend/tests/test_lexicon.py
+import pytest
+import random
+import string
+from app.utils.content_safety import ContentSafetyFilter, StoryValidator
+from app.utils.lexicon import DEFAULT_LEXICON_PATH, Lexicon, get_lexicon
+from app.tests.test_text_analysis import build_nlp
+
+LEXICON = {
+    'categories': {
+        'weapon': {'match': 'word', 'action': 'flag', 'terms': ['gun', 'sword']},
+        'noise': {'match': 'substring', 'action': 'flag', 'terms': ['bang']},
+        'violence': {'match': 'word', 'action': 'remove', 'terms': ['kill', 'dead body']},
+        'simple': {
+            'match': 'word', 'action': 'replace',
+            'terms': {'enormous': 'big', 'enormous cat': 'huge cat', 'sad': 'unhappy'}
+        }
+    },
+    'combinations': {'unsafe_combination': [['bad', 'scary'], ['hurt', 'pain']]}
+}
+
+class CountingList(list):
+    """A list that counts item reads"""
+
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+def random_terms(count, seed=0):
+    rng = random.Random(seed)
+    return {
+        ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+        for _ in range(count)
+    }
+
+class TestLexicon:
+    @pytest.fixture
+    def lexicon(self):
+        return Lexicon.from_dict(LEXICON)
+
+    def test_word_and_substring_matching(self, lexicon):
+        scan = lexicon.scan("The Gun went BANGBANG near the gunsmith")
+
+        assert scan.terms('weapon') == ['gun']
+        assert scan.terms('noise') == ['bang', 'bang']
+        assert scan.categories == {'weapon', 'noise'}
+
+    def test_match_offsets_point_into_original_text(self, lexicon):
+        text = "İstanbul: a SWORD"
+        match = lexicon.scan(text).matches[0]
+
+        assert text[match.start:match.end] == "SWORD"
+
+    def test_combinations_need_every_word(self, lexicon):
+        assert 'unsafe_combination' in lexicon.scan("a bad and scary night").categories
+        assert 'unsafe_combination' not in lexicon.scan("a bad night").categories
+        # Members are whole words, as the token check always was
+        assert 'unsafe_combination' not in lexicon.scan("badge of scary").categories
+
+    def test_rewrite_is_leftmost_longest(self, lexicon):
+        text, scan = lexicon.rewrite("An Enormous cat was sad", ['simple'])
+
+        assert text == "An huge cat was unhappy"
+        assert 'simple' in scan.categories
+
+    def test_rewrite_only_touches_requested_categories(self, lexicon):
+        text, scan = lexicon.rewrite("They kill a dead body with a sword", ['violence'])
+
+        assert text == "They  a  with a sword"
+        assert {'violence', 'weapon'} <= scan.categories
+
+    def test_rewrite_unknown_category_raises(self, lexicon):
+        with pytest.raises(KeyError):
+            lexicon.rewrite("text", ['age_vocabulary:13-17'])
+
+    def test_invalid_spec_is_rejected(self):
+        with pytest.raises(ValueError):
+            Lexicon({'x': {'match': 'regex', 'terms': ['a']}})
+
+    def test_scan_cost_does_not_grow_with_list_size(self):
+        text = " ".join(random_terms(2000, seed=1))
+
+        def scan_steps(lexicon):
+            # Every automaton transition reads a goto or failure entry
+            lexicon._goto = CountingList(lexicon._goto)
+            lexicon._fail = CountingList(lexicon._fail)
+            lexicon.scan(text)
+            return lexicon._goto.reads + lexicon._fail.reads
+
+        small = Lexicon({'terms': {'terms': sorted(random_terms(10))}})
+        large = Lexicon({'terms': {'terms': sorted(random_terms(20000))}})
+
+        # 2000x the terms; a per-term scan would take ~2000x the steps,
+        # the automaton takes a few per character either way
+        assert large.size > 1000 * small.size
+        assert scan_steps(large) <= 4 * len(text)
+        assert scan_steps(small) <= 4 * len(text)
+
+    def test_bundled_lexicon_serves_every_check(self):
+        lexicon = Lexicon.from_file(DEFAULT_LEXICON_PATH)
+
+        for category in ('unsafe_object', 'unsafe_scene', 'unsafe_sound',
+                         'unsafe_animation', 'unsafe_phrase', 'age_vocabulary:3-5',
+                         'age_vocabulary:6-8', 'age_vocabulary:9-12'):
+            assert lexicon.terms(category)
+        assert 'unsafe_combination' in lexicon.combinations
+
+class TestLexiconSafetyChecks:
+    @pytest.fixture
+    def safety_filter(self):
+        return ContentSafetyFilter(nlp=build_nlp())
+
+    def test_unsafe_patterns_are_removed(self, safety_filter):
+        cleaned = safety_filter._clean_text("The knight killed the dragon and found gold.")
+
+        assert cleaned == "The knight the dragon and found gold."
+
+    def test_age_vocabulary_comes_from_lexicon(self, safety_filter):
+        assert safety_filter.age_vocabulary['9-12']['colossal'] == "very big"
+        assert safety_filter._apply_age_vocabulary("A colossal, enraged bear", "9-12") == \
+            "A very big , very angry bear"
+
+    def test_combination_check(self, safety_filter):
+        assert not safety_filter._is_content_safe("The bad dog was scary")
+        assert safety_filter._is_content_safe("The bad dog was friendly")
+
+    def test_validator_filters_effects(self, monkeypatch):
+        monkeypatch.setattr(
+            'app.utils.content_safety.get_model_manager',
+            lambda: type('Manager', (), {'get': lambda self, *_: {'model': build_nlp()}})()
+        )
+        validator = StoryValidator()
+
+        sounds = validator._validate_sound_effects([
+            {'description': 'Gentle breeze'}, {'description': 'Loud CRASHING waves'}
+        ])
+        animations = validator._validate_animations([
+            {'description': 'slow float'}, {'description': 'rapidly spinning'}
+        ])
+
+        assert [effect['description'] for effect in sounds] == ['Gentle breeze']
+        assert [animation['description'] for animation in animations] == ['slow float']
+
+    def test_drawing_safety_uses_lexicon(self):
+        from app.services.ml_models import EnhancedDrawingProcessor
+
+        safety = EnhancedDrawingProcessor._check_content_safety(
+            EnhancedDrawingProcessor.__new__(EnhancedDrawingProcessor),
+            [{'name': 'Knife'}, {'name': 'dog'}],
+            {'scene_type': 'garden'}
+        )
+
+        assert safety['unsafe_elements'] == ['Knife']
+        assert safety['scene_safety'] is True
+        assert get_lexicon().terms('unsafe_scene')
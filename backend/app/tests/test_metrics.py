@@ -0,0 +1,83 @@
+# backend/tests/test_metrics.py
+import pytest
+import asyncio
+import time
+import spacy
+from app.core.metrics import REGISTRY, STAGE_LATENCY, render_metrics, stage_timer, timed
+from app.services.batching import BatchScheduler
+from app.utils.content_safety import ContentSafetyFilter
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+class TestMetrics:
+    def test_stage_timer_records_latency(self):
+        before = sample('pipeline_stage_duration_seconds_count', stage='test_sleep')
+
+        with stage_timer('test_sleep'):
+            time.sleep(0.01)
+
+        assert sample('pipeline_stage_duration_seconds_count', stage='test_sleep') == before + 1
+        assert sample('pipeline_stage_duration_seconds_sum', stage='test_sleep') >= 0.01
+
+    def test_stage_timer_counts_errors(self):
+        before = sample('pipeline_stage_errors_total', stage='test_error')
+
+        with pytest.raises(ValueError):
+            with stage_timer('test_error'):
+                raise ValueError("boom")
+
+        assert sample('pipeline_stage_errors_total', stage='test_error') == before + 1
+
+    def test_timed_wraps_callable(self):
+        before = sample('pipeline_stage_duration_seconds_count', stage='test_timed')
+
+        assert timed('test_timed', lambda x, y=1: x + y)(1, y=2) == 3
+        assert sample('pipeline_stage_duration_seconds_count', stage='test_timed') == before + 1
+
+    @pytest.mark.asyncio
+    async def test_batch_sizes_exported(self):
+        scheduler = BatchScheduler(lambda items: items, max_batch_size=4,
+                                   max_wait_ms=20, name='test_batcher')
+        await asyncio.gather(*(scheduler.submit(i) for i in range(4)))
+        await scheduler.close()
+
+        assert sample('model_batch_size_count', batcher='test_batcher') == 1
+        assert sample('model_batch_size_sum', batcher='test_batcher') == 4
+
+    def test_safety_fallbacks_counted_by_reason(self):
+        safety_filter = ContentSafetyFilter(nlp=spacy.blank('en'))
+        before = sample('safety_fallbacks_total', reason='theme')
+
+        safety_filter._get_fallback_content("Content theme not appropriate")
+        safety_filter._get_fallback_content("Content theme not appropriate")
+
+        assert sample('safety_fallbacks_total', reason='theme') == before + 2
+
+    def test_exposition_format(self):
+        with stage_timer('test_exposition'):
+            pass
+
+        body, content_type = render_metrics()
+
+        assert content_type.startswith('text/plain')
+        assert b'pipeline_stage_duration_seconds_bucket{le="0.0005",stage="test_exposition"}' in body
+
+    def test_overhead_is_small(self):
+        def series():
+            return sum(len(metric.samples) for metric in REGISTRY.collect())
+
+        with stage_timer('test_overhead'):
+            pass
+        before = series()
+        count = sample('pipeline_stage_duration_seconds_count', stage='test_overhead')
+
+        calls = 1000
+        for _ in range(calls):
+            with stage_timer('test_overhead'):
+                pass
+
+        # A repeated stage reuses its label child: one observation, no new series
+        assert series() == before
+        assert STAGE_LATENCY.labels('test_overhead') is STAGE_LATENCY.labels('test_overhead')
+        assert sample('pipeline_stage_duration_seconds_count', stage='test_overhead') == count + calls
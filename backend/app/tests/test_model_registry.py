@@ -0,0 +1,72 @@
+# backend/tests/test_model_registry.py
+import pytest
+import threading
+import time
+import torch
+from app.services.ml_models import ModelManager, get_model_manager
+
+class TestModelManager:
+    @pytest.fixture
+    def loads(self):
+        return []
+
+    @pytest.fixture
+    def model_manager(self, loads):
+        def load_tiny_model(model_id):
+            loads.append(model_id)
+            time.sleep(0.05)
+            return torch.nn.Linear(4, 2)
+
+        manager = ModelManager()
+        manager.model_configs = {
+            'tiny': {
+                'linear': {'model_id': 'tiny-linear', 'loader': load_tiny_model},
+                'other': {'model_id': 'tiny-other', 'loader': load_tiny_model}
+            }
+        }
+        return manager
+
+    def test_loads_lazily_and_once(self, model_manager, loads):
+        assert not model_manager.is_loaded('tiny', 'linear')
+
+        first = model_manager.get('tiny', 'linear')
+        second = model_manager.get('tiny', 'linear')
+
+        assert first['model'] is second['model']
+        assert loads == ['tiny-linear']
+
+    def test_concurrent_first_use_loads_once(self, model_manager, loads):
+        threads = [
+            threading.Thread(target=model_manager.get, args=('tiny', 'linear'))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loads == ['tiny-linear']
+
+    def test_preload(self, model_manager, loads):
+        model_manager.preload(['tiny.linear', 'tiny.other'])
+
+        assert model_manager.is_loaded('tiny', 'other')
+        assert sorted(loads) == ['tiny-linear', 'tiny-other']
+
+    def test_load_stats(self, model_manager):
+        model_manager.get('tiny', 'linear')
+        stats = model_manager.get_stats()['models']['tiny.linear']
+
+        assert stats['load_seconds'] >= 0.05
+        # 4x2 weights plus 2 biases in fp32
+        assert stats['parameter_bytes'] == 40
+
+    def test_models_are_put_in_eval_mode(self, model_manager):
+        assert not model_manager.get('tiny', 'linear')['model'].training
+
+    def test_unknown_model(self, model_manager):
+        with pytest.raises(ValueError):
+            model_manager.get('tiny', 'missing')
+
+    def test_shared_instance(self):
+        assert get_model_manager() is get_model_manager()
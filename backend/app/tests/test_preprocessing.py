@@ -0,0 +1,117 @@
+# backend/tests/test_preprocessing.py
+import pytest
+import io
+import torch
+from PIL import Image, ImageDraw
+from transformers import DetrConfig, DetrForObjectDetection, DetrImageProcessor
+from app.services.ml_models import ColorAnalyzer, run_detr_batch
+from app.services.preprocessing import ImagePreprocessor, PreprocessedImage, pad_pixel_batch
+
+def encode(size, format='JPEG'):
+    image = Image.new('RGB', size, color='white')
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((size[0] // 4, size[1] // 4, size[0] // 2, size[1] // 2), fill='red')
+    buf = io.BytesIO()
+    image.save(buf, format=format)
+    return buf.getvalue()
+
+def tiny_detr():
+    torch.manual_seed(0)
+    config = DetrConfig(
+        use_timm_backbone=False, use_pretrained_backbone=False,
+        backbone_config={
+            'model_type': 'resnet', 'depths': [1, 1, 1, 1],
+            'hidden_sizes': [8, 8, 8, 8], 'embedding_size': 8, 'out_features': ['stage4']
+        },
+        d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=16, decoder_ffn_dim=16, num_queries=5
+    )
+    return DetrForObjectDetection(config).eval()
+
+class TestImagePreprocessor:
+    @pytest.fixture
+    def preprocessor(self):
+        return ImagePreprocessor(min_side=200)
+
+    def test_jpeg_decoded_at_reduced_size(self, preprocessor):
+        prepared = preprocessor.decode(encode((1600, 1200)))
+
+        assert prepared.original_size == (1600, 1200)
+        assert prepared.size[0] < 1600
+        assert min(prepared.size) >= 200
+        assert prepared.pixels.shape == (prepared.size[1], prepared.size[0], 3)
+
+    def test_png_reduced_after_decode(self, preprocessor):
+        prepared = preprocessor.decode(encode((1000, 800), format='PNG'))
+
+        assert prepared.original_size == (1000, 800)
+        assert prepared.size == (250, 200)
+
+    def test_small_image_untouched(self, preprocessor):
+        prepared = preprocessor.decode(encode((300, 250), format='PNG'))
+        assert prepared.size == (300, 250)
+
+    def test_grayscale_converted_to_rgb(self, preprocessor):
+        buf = io.BytesIO()
+        Image.new('L', (50, 50)).save(buf, format='PNG')
+        assert preprocessor.decode(buf.getvalue()).image.mode == 'RGB'
+
+    def test_tensors_built_once(self, preprocessor):
+        prepared = preprocessor.decode(encode((300, 250), format='PNG'))
+        calls = []
+
+        def factory(image):
+            calls.append(image.size)
+            return torch.zeros(1, 3, 4, 4)
+
+        first = prepared.tensor('vit', factory)
+        assert prepared.tensor('vit', factory) is first
+        assert len(calls) == 1
+
+    def test_sample_is_bounded(self, preprocessor):
+        prepared = preprocessor.decode(encode((300, 250), format='PNG'))
+        assert len(prepared.sample(1000)) <= 1000
+        assert len(prepared.sample(0)) == 300 * 250
+
+    def test_color_analyzer_accepts_preprocessed(self, preprocessor):
+        prepared = preprocessor.decode(encode((300, 250), format='PNG'))
+        result = ColorAnalyzer().analyze(prepared)
+        assert result['dominant_colors'][0]['name'] == 'white'
+
+class TestDetrBatch:
+    def test_pad_pixel_batch(self):
+        batch = pad_pixel_batch([torch.ones(1, 3, 4, 6), torch.ones(1, 3, 5, 3)])
+
+        assert batch['pixel_values'].shape == (2, 3, 5, 6)
+        assert batch['pixel_mask'][0].sum() == 24
+        assert batch['pixel_mask'][1, :, 3:].sum() == 0
+
+    def test_matches_processor_batching(self):
+        processor = DetrImageProcessor(size={'shortest_edge': 64, 'longest_edge': 96})
+        model = tiny_detr()
+        images = [Image.new('RGB', (80, 60), 'white'), Image.new('RGB', (50, 90), 'red')]
+
+        with torch.inference_mode():
+            expected_inputs = processor(images=images, return_tensors='pt')
+            expected = processor.post_process_object_detection(
+                model(**expected_inputs),
+                target_sizes=torch.tensor([image.size[::-1] for image in images]),
+                threshold=0.0
+            )
+            detections = run_detr_batch(processor, model, images, threshold=0.0)
+
+        assert [len(d) for d in detections] == [len(e['scores']) for e in expected]
+        assert detections[1][0]['confidence'] == pytest.approx(expected[1]['scores'][0].item(), abs=1e-4)
+
+    def test_boxes_in_original_coordinates(self):
+        processor = DetrImageProcessor(size={'shortest_edge': 64, 'longest_edge': 96})
+        model = tiny_detr()
+        image = Image.new('RGB', (100, 80), 'white')
+        prepared = PreprocessedImage(image, original_size=(400, 320))
+
+        with torch.inference_mode():
+            small = run_detr_batch(processor, model, [PreprocessedImage(image, (100, 80))], threshold=0.0)
+            large = run_detr_batch(processor, model, [prepared], threshold=0.0)
+
+        assert large[0][0]['box']['width'] == pytest.approx(small[0][0]['box']['width'] * 4, rel=1e-4)
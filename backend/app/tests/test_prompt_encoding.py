@@ -0,0 +1,90 @@
+# backend/tests/test_prompt_encoding.py
+import pytest
+import torch
+from app.services.prompt_encoding import EncoderCache, PromptTemplate
+from app.services.story_generator import PROMPT_SAMPLES, STORY_PROMPT
+from benchmarks.tiny_models import tiny_t5, tiny_tokenizer, tiny_unigram_tokenizer
+
+DRAWING = {'objects': [{'name': 'dog'}, {'name': 'tree'}], 'scene_type': 'garden'}
+
+@pytest.fixture(params=['unigram', 'word'])
+def tokenizer(request):
+    return tiny_unigram_tokenizer(STORY_PROMPT) if request.param == 'unigram' else tiny_tokenizer()
+
+class TestPromptTemplate:
+    def test_pretokenized_ids_match_full_tokenization(self, tokenizer):
+        template = PromptTemplate(tokenizer, STORY_PROMPT, PROMPT_SAMPLES)
+        values = {'scene_type': 'forest', 'objects': 'bird, sun, house'}
+
+        assert template.exact
+        assert template.encode(**values) == tokenizer.encode(STORY_PROMPT.format(**values))
+
+    def test_trailing_special_tokens_are_kept(self):
+        template = PromptTemplate(tiny_unigram_tokenizer(STORY_PROMPT), STORY_PROMPT, PROMPT_SAMPLES)
+
+        assert template.suffix_ids == [1]
+        assert template.encode(scene_type='park', objects='dog')[-1] == 1
+
+    def test_falls_back_when_split_changes_tokens(self):
+        tokenizer = tiny_unigram_tokenizer(STORY_PROMPT)
+        # A field glued to the text before it is not a separate word
+        template = PromptTemplate(tokenizer, "Scene:{scene_type} story", [{'scene_type': 'park'}])
+
+        assert not template.exact
+        assert template.encode(scene_type='park') == tokenizer.encode("Scene:park story")
+
+class TestEncoderCache:
+    def test_lru_eviction(self):
+        cache = EncoderCache(max_entries=2)
+        cache.put((1,), torch.zeros(1))
+        cache.put((2,), torch.zeros(1))
+        cache.get((1,))
+        cache.put((3,), torch.zeros(1))
+
+        assert cache.get((2,)) is None
+        assert cache.get((1,)) is not None
+        assert len(cache) == 2
+
+    def test_key_is_token_ids(self):
+        assert EncoderCache.make_key(torch.tensor([[5, 6, 7]])) == (5, 6, 7)
+
+class TestStoryGeneratorEncoding:
+    @pytest.fixture
+    def generator(self, make_story_generator):
+        t5 = tiny_t5()
+        generator = make_story_generator(t5['model'].eval(), tokenizer=t5['tokenizer'])
+        generator.encoder_cache = EncoderCache(8)
+        return generator
+
+    def test_prompt_ids_match_full_prompt(self, generator):
+        input_ids = generator._encode_prompt(DRAWING)
+
+        expected = generator.tokenizer.encode(generator._create_prompt(DRAWING), return_tensors='pt')
+        assert torch.equal(input_ids, expected)
+
+    def test_cached_encoder_output_gives_same_story(self, generator):
+        input_ids = generator._encode_prompt(DRAWING)
+        settings = {'max_length': 12, 'num_beams': 3, 'num_return_sequences': 2}
+
+        with torch.no_grad():
+            expected = generator.model.generate(input_ids, **settings)
+            first = generator._generate(input_ids, **settings)
+            second = generator._generate(input_ids, **settings)
+
+        assert torch.equal(first, expected)
+        assert torch.equal(second, expected)
+        stats = generator.get_prompt_stats()
+        assert stats['encoder']['hits'] == 1
+        assert stats['encoder']['misses'] == 1
+        assert stats['encoder']['saved_ms_per_request'] > 0
+        assert stats['tokenize']['pretokenized_template']
+        assert stats['requests'] == 1
+
+    def test_cache_disabled(self, generator):
+        generator.encoder_cache = None
+        input_ids = generator._encode_prompt(DRAWING)
+
+        with torch.no_grad():
+            generator._generate(input_ids, max_length=5)
+
+        assert generator.get_prompt_stats()['encoder']['misses'] == 0
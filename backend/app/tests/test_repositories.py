@@ -0,0 +1,157 @@
+# backend/tests/test_repositories.py
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from mongomock_motor import AsyncMongoMockClient
+from app.models.drawing import DrawingCreate
+from app.models.story import StoryCreate
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.services import database
+from app.services.database import (
+    close_mongodb_connection, connect_to_mongodb, get_drawing_repository,
+    get_story_repository, init_repositories
+)
+from app.services.repositories import decode_cursor, encode_cursor
+
+START = datetime(2024, 1, 1, 12, 0)
+
+def drawing(child_id='child-1', minutes=0, scene_type='garden'):
+    return DrawingCreate(
+        child_id=child_id,
+        image_url=f"/static/drawings/{child_id}-{minutes}.png",
+        detected_objects=[{'name': 'dog', 'confidence': 0.9}],
+        scene_type=scene_type,
+        creation_date=START + timedelta(minutes=minutes)
+    )
+
+@pytest_asyncio.fixture
+async def repositories():
+    await init_repositories(AsyncMongoMockClient(), 'test_kids_story_creator')
+    yield get_drawing_repository(), get_story_repository()
+    await close_mongodb_connection()
+
+class TestDrawingRepository:
+    @pytest.mark.asyncio
+    async def test_indexes_are_created(self, repositories):
+        drawings, stories = repositories
+
+        drawing_indexes = await drawings.collection.index_information()
+        story_indexes = await stories.collection.index_information()
+
+        assert list(drawing_indexes['child_id_creation_date']['key']) == [
+            ('child_id', 1), ('creation_date', -1), ('_id', -1)
+        ]
+        assert list(story_indexes['drawing_id']['key']) == [('drawing_id', 1)]
+
+    @pytest.mark.asyncio
+    async def test_insert_and_get(self, repositories):
+        drawings, _ = repositories
+
+        stored = await drawings.insert(drawing())
+        loaded = await drawings.get(stored.id)
+
+        assert loaded.id == stored.id
+        assert loaded.detected_objects == [{'name': 'dog', 'confidence': 0.9}]
+        assert await drawings.get('not-an-object-id') is None
+
+    @pytest.mark.asyncio
+    async def test_insert_many_keeps_order(self, repositories):
+        drawings, _ = repositories
+
+        stored = await drawings.insert_many([drawing(minutes=i) for i in range(5)])
+
+        assert [item.creation_date for item in stored] == [
+            START + timedelta(minutes=i) for i in range(5)
+        ]
+        assert len({item.id for item in stored}) == 5
+        assert await drawings.collection.count_documents({}) == 5
+        assert await drawings.insert_many([]) == []
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_every_drawing_once(self, repositories):
+        drawings, _ = repositories
+        # Equal timestamps make the _id tie-break matter
+        await drawings.insert_many([drawing(minutes=i // 2) for i in range(7)])
+        await drawings.insert(drawing(child_id='child-2'))
+
+        seen, cursor = [], None
+        while True:
+            page = await drawings.list_for_child('child-1', limit=3, cursor=cursor)
+            seen.extend(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert len(seen) == 7
+        assert len({item.id for item in seen}) == 7
+        keys = [(item.creation_date, item.id) for item in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_list_projects_summary_fields(self, repositories, monkeypatch):
+        drawings, _ = repositories
+        await drawings.insert(drawing())
+        find = drawings.collection.find
+        projections = []
+
+        def spy(query, projection=None):
+            projections.append(projection)
+            return find(query, projection)
+
+        monkeypatch.setattr(drawings.collection, 'find', spy)
+        page = await drawings.list_for_child('child-1')
+
+        assert page.next_cursor is None
+        assert page.items[0].scene_type == 'garden'
+        assert 'detected_objects' not in projections[0]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_is_rejected(self, repositories):
+        drawings, _ = repositories
+
+        with pytest.raises(ValueError):
+            await drawings.list_for_child('child-1', cursor='garbage')
+
+    def test_cursor_round_trip(self):
+        from bson import ObjectId
+        object_id = ObjectId()
+
+        assert decode_cursor(encode_cursor(START, object_id)) == (START, object_id)
+
+class TestStoryRepository:
+    @pytest.mark.asyncio
+    async def test_stories_for_drawing(self, repositories):
+        _, stories = repositories
+        await stories.insert_many([
+            StoryCreate(drawing_id='d1', narrative=[{'content': 'Once'}], style='calm',
+                        sound_effects=[{'description': 'breeze'}], animations=[]),
+            StoryCreate(drawing_id='d2', narrative=[{'content': 'Twice'}], style='calm',
+                        sound_effects=[], animations=[])
+        ])
+
+        listed = await stories.list_for_drawing('d1')
+
+        assert [story['narrative'] for story in listed] == [[{'content': 'Once'}]]
+        assert 'sound_effects' not in listed[0]
+        assert (await stories.get(listed[0]['id'])).sound_effects == [{'description': 'breeze'}]
+
+class TestConnection:
+    @pytest.mark.asyncio
+    async def test_startup_without_mongodb(self, monkeypatch):
+        # Nothing listens on port 1
+        monkeypatch.setattr(database, 'create_client', lambda: AsyncIOMotorClient(
+            'mongodb://127.0.0.1:1', serverSelectionTimeoutMS=50, connectTimeoutMS=50
+        ))
+        monkeypatch.setattr(database, 'INDEX_RETRY_SECONDS', 0.01)
+
+        await connect_to_mongodb()
+        try:
+            assert get_drawing_repository() is not None
+            await asyncio.sleep(0.2)
+            # Still retrying, not failed
+            assert not database.Database.index_task.done()
+        finally:
+            await close_mongodb_connection()
+
+        assert database.Database.index_task is None
@@ -0,0 +1,161 @@
+# backend/tests/test_result_cache.py
+import pytest
+import random
+import time
+from PIL import Image, ImageDraw
+from app.services.result_cache import DrawingResultCache, _PHashIndex, _hamming
+
+def make_drawing(shapes, size=(200, 150)):
+    image = Image.new('RGB', size, color='white')
+    draw = ImageDraw.Draw(image)
+    for box, color in shapes:
+        draw.rectangle(box, fill=color)
+    return image
+
+class TestDrawingResultCache:
+    @pytest.fixture
+    def house(self):
+        return make_drawing([((20, 60, 120, 140), 'red'), ((140, 10, 190, 60), 'yellow')])
+
+    @pytest.fixture
+    def tree(self):
+        return make_drawing([((80, 20, 120, 140), 'green'), ((0, 130, 200, 150), 'brown')])
+
+    @pytest.fixture
+    def result(self):
+        return {'objects': [{'name': 'house', 'confidence': 0.9}], 'scene_type': 'indoor'}
+
+    def test_exact_hit(self, house, result):
+        cache = DrawingResultCache()
+        keys = cache.compute_keys(house)
+        cache.put(keys, result)
+
+        assert cache.get(cache.compute_keys(house.copy())) == result
+        assert cache.get_stats()['exact_hits'] == 1
+
+    def test_perceptual_hit_for_small_edit(self, house, result):
+        cache = DrawingResultCache(hamming_tolerance=4)
+        cache.put(cache.compute_keys(house), result)
+
+        edited = house.copy()
+        ImageDraw.Draw(edited).point((5, 5), fill='black')
+
+        assert cache.get(cache.compute_keys(edited)) == result
+        assert cache.get_stats()['perceptual_hits'] == 1
+
+    def test_miss_for_different_drawing(self, house, tree, result):
+        cache = DrawingResultCache()
+        cache.put(cache.compute_keys(house), result)
+
+        assert cache.get(cache.compute_keys(tree)) is None
+        assert cache.get_stats()['misses'] == 1
+
+    def test_namespaces_are_separate(self, house, result):
+        cache = DrawingResultCache()
+        keys = cache.compute_keys(house)
+        cache.put(keys, result, namespace='detr')
+
+        assert cache.get(keys, namespace='yolo') is None
+
+    def test_ttl_expiry(self, house, result):
+        cache = DrawingResultCache(ttl_seconds=0.0001)
+        keys = cache.compute_keys(house)
+        cache.put(keys, result)
+
+        time.sleep(0.01)
+        assert cache.get(keys) is None
+
+    def test_lru_eviction(self, house, tree, result):
+        cache = DrawingResultCache(max_entries=1, hamming_tolerance=-1)
+        house_keys = cache.compute_keys(house)
+        tree_keys = cache.compute_keys(tree)
+        cache.put(house_keys, result)
+        cache.put(tree_keys, result)
+
+        assert cache.get(house_keys) is None
+        assert cache.get(tree_keys) == result
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_cached_result_is_not_shared(self, house, result):
+        cache = DrawingResultCache()
+        keys = cache.compute_keys(house)
+        cache.put(keys, result)
+
+        cache.get(keys)['objects'].clear()
+        assert cache.get(keys)['objects']
+
+    def test_disk_tier_survives_restart(self, tmp_path, house, result):
+        cache = DrawingResultCache(disk_path=str(tmp_path))
+        keys = cache.compute_keys(house)
+        cache.put(keys, result)
+
+        restarted = DrawingResultCache(disk_path=str(tmp_path))
+        assert restarted.get(keys) == result
+        assert restarted.get_stats()['disk_hits'] == 1
+
+    def test_different_original_size_misses(self, house, result):
+        cache = DrawingResultCache(hamming_tolerance=4)
+        cache.put(cache.compute_keys(house, (400, 300)), result)
+
+        # Same reduced pixels, but the cached boxes belong to a 400x300 upload
+        assert cache.get(cache.compute_keys(house, (800, 600))) is None
+        assert cache.get(cache.compute_keys(house, (400, 300))) == result
+
+    def test_lookup_reports_perceptual_hits(self, tmp_path, house, result):
+        cache = DrawingResultCache(hamming_tolerance=4, disk_path=str(tmp_path))
+        cache.put(cache.compute_keys(house), result)
+        edited = house.copy()
+        ImageDraw.Draw(edited).point((5, 5), fill='black')
+
+        assert cache.lookup(cache.compute_keys(house)) == (result, True)
+        assert cache.lookup(cache.compute_keys(edited)) == (result, False)
+
+        restarted = DrawingResultCache(hamming_tolerance=4, disk_path=str(tmp_path))
+        assert restarted.lookup(cache.compute_keys(edited)) == (result, False)
+
+    def test_exact_only_skips_perceptual_hits(self, tmp_path, house, result):
+        cache = DrawingResultCache(hamming_tolerance=4, disk_path=str(tmp_path))
+        cache.put(cache.compute_keys(house), result)
+        edited = house.copy()
+        ImageDraw.Draw(edited).point((5, 5), fill='black')
+
+        assert cache.lookup(cache.compute_keys(edited), exact_only=True) == (None, False)
+        assert cache.lookup(cache.compute_keys(house), exact_only=True) == (result, True)
+
+    def test_disk_evicts_oldest(self, tmp_path, house, tree, result):
+        cache = DrawingResultCache(disk_path=str(tmp_path), disk_max_entries=1,
+                                   hamming_tolerance=-1)
+        house_keys = cache.compute_keys(house)
+        tree_keys = cache.compute_keys(tree)
+        cache.put(house_keys, result)
+        cache.put(tree_keys, result)
+
+        restarted = DrawingResultCache(disk_path=str(tmp_path), hamming_tolerance=-1)
+        assert restarted.get(house_keys) is None
+        assert restarted.get(tree_keys) == result
+
+class TestPHashIndex:
+    @pytest.mark.parametrize('tolerance', [0, 4, 10])
+    def test_candidates_include_every_match(self, tolerance):
+        rng = random.Random(tolerance)
+        index = _PHashIndex(tolerance)
+        stored = [rng.getrandbits(64) for _ in range(500)]
+        for i, phash in enumerate(stored):
+            index.add('ns', phash, i)
+        queries = [stored[i] ^ sum(1 << bit for bit in rng.sample(range(64), rng.randint(0, tolerance)))
+                   for i in range(0, 500, 5)]
+
+        for query in queries:
+            matching = {i for i, phash in enumerate(stored) if _hamming(query, phash) <= tolerance}
+            candidates = index.candidates('ns', query)
+            assert matching <= candidates
+            # Buckets narrow the search instead of returning everything
+            assert len(candidates) < len(stored)
+
+    def test_remove(self):
+        index = _PHashIndex(4)
+        index.add('ns', 0xFF, 'a')
+        index.remove('ns', 0xFF, 'a')
+
+        assert index.candidates('ns', 0xFF) == set()
+        assert index.candidates('other', 0xFF) == set()
@@ -0,0 +1,151 @@
+# backend/tests/test_safety_cascade.py
+import pytest
+import random
+from textblob import TextBlob
+from app.core.config import settings
+from app.utils.content_safety import MAX_SUBJECTIVITY, MIN_POLARITY, ContentSafetyFilter
+from app.utils.safety_cascade import SentimentPrecheck
+from app.tests.test_text_analysis import CORPUS, build_nlp, legacy_filter
+
+AUDIT_CORPUS = CORPUS + [
+    "The family went on an adventure to learn about animals in nature.",
+    "The friendly animals were not happy about sharing.",
+    "Kindness and friendship helped the family :( in nature.",
+    "The animals had a very good adventure with their family.",
+    "A terrible storm frightened the animals in nature.",
+    "The gigantic dog and the melancholy cat found friendship.",
+    "They had a fight and he hit the wall of friendship.",
+    "Learning and discovery with the family (!) in nature.",
+    "The kids found animals near the river.",
+    "",
+]
+
+class TestSafetyCascade:
+    @pytest.fixture
+    def safety_filter(self):
+        return ContentSafetyFilter(nlp=build_nlp())
+
+    def test_lexicon_rejects_before_parsing(self, safety_filter, monkeypatch):
+        parsed = []
+        pipe = safety_filter.nlp.pipe
+
+        def recording_pipe(texts, **kwargs):
+            texts = list(texts)
+            parsed.extend(texts)
+            return pipe(texts, **kwargs)
+
+        monkeypatch.setattr(safety_filter.nlp, 'pipe', recording_pipe)
+        result = safety_filter.filter_content("The bad dog was scary but found friendship.")
+
+        assert result == safety_filter._get_fallback_content("Content failed safety check")
+        assert parsed == []
+        tiers = safety_filter.get_cascade_stats()['tiers']
+        assert tiers['lexicon']['rejected'] == 1
+        # Rejected before the profanity censor runs
+        assert tiers['clean']['evaluated'] == 0
+
+    def test_censor_keeps_combination_words(self, safety_filter):
+        # The raw-text lexicon tier is only equivalent if cleaning keeps these words
+        for group in safety_filter.lexicon.combinations['unsafe_combination']:
+            for word in group:
+                assert safety_filter._clean_text(word) == word
+
+    def test_calm_texts_skip_sentiment(self, safety_filter):
+        texts = ["The kids found animals near the river of friendship.",
+                 "The family went on an adventure to learn about animals in nature."]
+        expected = [legacy_filter(safety_filter, text, "6-8") for text in texts]
+
+        assert safety_filter.filter_many(texts, "6-8") == expected
+
+        tiers = safety_filter.get_cascade_stats()['tiers']
+        assert tiers['calm']['accepted'] == 2
+        assert tiers['sentiment']['evaluated'] == 0
+
+    def test_every_tier_records_decisions_and_latency(self, safety_filter):
+        safety_filter.filter_many(AUDIT_CORPUS, "6-8")
+        tiers = safety_filter.get_cascade_stats()['tiers']
+
+        assert tiers['lexicon']['evaluated'] == len(AUDIT_CORPUS)
+        assert list(tiers) == ['lexicon', 'clean', 'entities', 'theme', 'calm', 'sentiment']
+        for tier in ('lexicon', 'clean', 'entities', 'theme', 'calm'):
+            assert tiers[tier]['calls'] == 1
+            assert tiers[tier]['mean_ms'] >= 0
+        # Each tier only sees what the previous ones left undecided
+        assert tiers['clean']['evaluated'] == \
+            tiers['lexicon']['evaluated'] - tiers['lexicon']['rejected']
+        assert tiers['entities']['evaluated'] == tiers['clean']['evaluated']
+
+    @pytest.mark.parametrize("age_group", ["3-5", "6-8", "9-12"])
+    def test_audit_mode_confirms_cascade_verdicts(self, safety_filter, age_group, monkeypatch):
+        cascade = safety_filter.filter_many(AUDIT_CORPUS, age_group)
+
+        monkeypatch.setattr(settings, 'SAFETY_CASCADE_AUDIT', True)
+        auditor = ContentSafetyFilter(nlp=safety_filter.nlp)
+        audited = auditor.filter_many(AUDIT_CORPUS, age_group)
+        stats = auditor.get_cascade_stats()
+
+        assert audited == cascade
+        assert audited == [legacy_filter(auditor, text, age_group) for text in AUDIT_CORPUS]
+        assert stats['audit'] == {'texts': len(AUDIT_CORPUS), 'mismatches': 0}
+        # Every tier ran on every text
+        for tier in stats['tiers'].values():
+            assert tier['evaluated'] == len(AUDIT_CORPUS)
+
+    def test_audit_mode_counts_mismatches(self, safety_filter, monkeypatch):
+        monkeypatch.setattr(settings, 'SAFETY_CASCADE_AUDIT', True)
+        # A precheck that accepts everything disagrees with TextBlob
+        monkeypatch.setattr(safety_filter.sentiment_precheck, 'is_calm', lambda text: True)
+
+        texts = ["A terrible storm frightened the animals in nature."]
+        result = safety_filter.filter_many(texts, "6-8")
+
+        assert result == [legacy_filter(safety_filter, texts[0], "6-8")]
+        assert safety_filter.get_cascade_stats()['audit']['mismatches'] == 1
+
+    def test_early_exit_can_be_disabled(self, safety_filter, monkeypatch):
+        monkeypatch.setattr(settings, 'SAFETY_EARLY_EXIT', False)
+
+        results = safety_filter.filter_many(AUDIT_CORPUS, "6-8")
+        tiers = safety_filter.get_cascade_stats()['tiers']
+
+        assert results == [legacy_filter(safety_filter, text, "6-8") for text in AUDIT_CORPUS]
+        assert tiers['lexicon']['evaluated'] == 0
+        assert tiers['calm']['evaluated'] == 0
+
+    def test_filter_sentence_uses_cascade(self, safety_filter):
+        assert safety_filter.filter_sentence("The colossal bear slept.", "9-12") == \
+            "The very big bear slept ."
+        assert safety_filter.filter_sentence("The bad dog was scary.") is None
+        assert safety_filter.filter_sentence("   ") is None
+        assert 'theme' not in [
+            tier for tier, stats in safety_filter.get_cascade_stats()['tiers'].items()
+            if stats['evaluated']
+        ]
+
+class TestSentimentPrecheck:
+    @pytest.fixture(scope='class')
+    def precheck(self):
+        return SentimentPrecheck(MAX_SUBJECTIVITY)
+
+    def test_known_cases(self, precheck):
+        assert precheck.is_calm("The dog walked to the house.")
+        assert not precheck.is_calm("The dog was not friendly.")
+        assert not precheck.is_calm("The dog didn't play.")
+        assert not precheck.is_calm("The dog was terrible.")
+        assert not precheck.is_calm("The dog was happy.")
+        assert not precheck.is_calm("The dog smiled :(")
+        # TextBlob re-joins spaced emoticons and strips '_' around words
+        assert not precheck.is_calm("The dog smiled ( ! ) .")
+        assert not precheck.is_calm("The _terrible_ dog.")
+
+    def test_calm_texts_always_pass_textblob(self, precheck):
+        rng = random.Random(0)
+        words = list(precheck.scores) + [
+            'very', 'really', 'not', 'the', 'dog', '!', ':)', '(', ')', '_', 'x', 'D'
+        ]
+        for _ in range(3000):
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+            if precheck.is_calm(text):
+                sentiment = TextBlob(text).sentiment
+                assert sentiment.polarity >= MIN_POLARITY, text
+                assert abs(sentiment.subjectivity) <= MAX_SUBJECTIVITY, text
@@ -0,0 +1,157 @@
+# backend/tests/test_stage_deadlines.py
+import pytest
+import asyncio
+import io
+import time
+from PIL import Image
+from app.core.config import settings
+from app.services.ml_models import EnhancedDrawingProcessor
+from app.services.preprocessing import ImagePreprocessor
+from app.services.result_cache import DrawingResultCache
+
+STAGE_SECONDS = 0.3
+
+class SlowColorAnalyzer:
+    max_pixels = 64 * 64
+
+    def __init__(self, seconds, events):
+        self.seconds = seconds
+        self.events = events
+
+    def analyze(self, image):
+        self.events.append(('start', 'colors'))
+        time.sleep(self.seconds)
+        self.events.append(('end', 'colors'))
+        return {'dominant_colors': [], 'color_mood': 'neutral', 'palette': []}
+
+def make_processor(detect_seconds=STAGE_SECONDS, scene_seconds=STAGE_SECONDS,
+                   color_seconds=STAGE_SECONDS, result_cache=None):
+    processor = EnhancedDrawingProcessor.__new__(EnhancedDrawingProcessor)
+    processor.preprocessor = ImagePreprocessor()
+    # ('start' | 'end', stage) in the order they happened
+    processor.events = []
+    processor.color_analyzer = SlowColorAnalyzer(color_seconds, processor.events)
+    processor.result_cache = result_cache
+
+    async def detect_objects(image, model='detr'):
+        processor.events.append(('start', 'objects'))
+        await asyncio.sleep(detect_seconds)
+        processor.events.append(('end', 'objects'))
+        return [{'name': 'cat', 'confidence': 0.9,
+                 'box': {'x': 0.4, 'y': 0.4, 'width': 0.1, 'height': 0.1}}]
+
+    async def analyze_scene(image):
+        processor.events.append(('start', 'scene'))
+        await asyncio.sleep(scene_seconds)
+        processor.events.append(('end', 'scene'))
+        return {'scene_type': 'garden', 'confidence': 0.8, 'attributes': {}}
+
+    processor._detect_objects = detect_objects
+    processor._analyze_scene = analyze_scene
+    return processor
+
+def drawing_bytes():
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 64), 'yellow').save(buf, format='PNG')
+    return buf.getvalue()
+
+@pytest.fixture
+def deadlines(monkeypatch):
+    monkeypatch.setattr(settings, 'DETECTION_TIMEOUT_SECONDS', 2.0)
+    monkeypatch.setattr(settings, 'SCENE_TIMEOUT_SECONDS', 2.0)
+    monkeypatch.setattr(settings, 'COLOR_TIMEOUT_SECONDS', 2.0)
+    return monkeypatch
+
+class TestStageDeadlines:
+    @pytest.mark.asyncio
+    async def test_stages_run_concurrently(self, deadlines):
+        processor = make_processor()
+
+        result = await processor.process_image(drawing_bytes())
+
+        # Every stage starts before any of them finishes
+        assert sorted(processor.events[:3]) == [
+            ('start', 'colors'), ('start', 'objects'), ('start', 'scene')
+        ]
+        assert result['degraded'] == []
+        assert result['composition']['central_elements'] == ['cat']
+        assert result['safe_for_children']['is_safe']
+
+    @pytest.mark.asyncio
+    async def test_slow_colors_are_omitted(self, deadlines):
+        deadlines.setattr(settings, 'COLOR_TIMEOUT_SECONDS', 0.05)
+        processor = make_processor(color_seconds=0.5)
+
+        result = await processor.process_image(drawing_bytes())
+
+        assert result['colors'] is None
+        assert result['degraded'] == ['colors']
+        assert result['objects'][0]['name'] == 'cat'
+        assert result['safe_for_children']['is_safe']
+
+    @pytest.mark.asyncio
+    async def test_slow_detection_is_not_reported_safe(self, deadlines):
+        deadlines.setattr(settings, 'DETECTION_TIMEOUT_SECONDS', 0.05)
+        processor = make_processor(detect_seconds=1.0)
+
+        result = await processor.process_image(drawing_bytes())
+
+        assert result['objects'] == []
+        assert result['degraded'] == ['objects']
+        assert not result['safe_for_children']['is_safe']
+        assert result['scene']['scene_type'] == 'garden'
+
+    @pytest.mark.asyncio
+    async def test_slow_scene_falls_back(self, deadlines):
+        deadlines.setattr(settings, 'SCENE_TIMEOUT_SECONDS', 0.05)
+        processor = make_processor(scene_seconds=1.0)
+
+        result = await processor.process_image(drawing_bytes())
+
+        assert result['scene']['scene_type'] == 'unknown'
+        assert result['degraded'] == ['scene']
+        assert not result['safe_for_children']['is_safe']
+
+    @pytest.mark.asyncio
+    async def test_degraded_results_not_cached(self, deadlines):
+        deadlines.setattr(settings, 'COLOR_TIMEOUT_SECONDS', 0.05)
+        cache = DrawingResultCache()
+        processor = make_processor(color_seconds=0.5, result_cache=cache)
+
+        await processor.process_image(drawing_bytes())
+
+        assert cache.get_stats()['memory_entries'] == 0
+
+    @pytest.mark.asyncio
+    async def test_stage_error_fails_request(self, deadlines):
+        processor = make_processor()
+
+        async def broken_scene(image):
+            raise RuntimeError("scene model unavailable")
+
+        processor._analyze_scene = broken_scene
+
+        with pytest.raises(Exception, match="scene model unavailable"):
+            await processor.process_image(drawing_bytes())
+
+class TestCachedSafety:
+    @pytest.mark.asyncio
+    async def test_near_duplicate_is_analyzed_again(self, deadlines):
+        cache = DrawingResultCache(hamming_tolerance=4)
+        processor = make_processor(result_cache=cache)
+        # A near-duplicate's result, e.g. the same drawing before a knife was added
+        similar = Image.new('RGB', (64, 64), 'yellow')
+        similar.putpixel((0, 0), (0, 0, 0))
+        cache.put(cache.compute_keys(similar), {
+            'objects': [{'name': 'dog', 'confidence': 0.9,
+                         'box': {'x': 0, 'y': 0, 'width': 1, 'height': 1}}],
+            'scene': {'scene_type': 'garden'},
+            'safe_for_children': {'is_safe': True},
+            'degraded': []
+        }, namespace='enhanced:detr')
+
+        result = await processor.process_image(drawing_bytes())
+
+        assert cache.get_stats()['perceptual_hits'] == 0
+        assert [obj['name'] for obj in result['objects']] == ['cat']
+        assert ('start', 'objects') in processor.events
@@ -0,0 +1,102 @@
+# backend/tests/test_story_cache.py
+import pytest
+import torch
+from app.services.story_cache import StoryCache
+from app.services.generation_profiles import GenerationProfile
+
+GENERATION = {'max_length': 200, 'num_beams': 4}
+
+def story(text):
+    return {'narrative': [{'type': 'introduction', 'content': text}]}
+
+class CountingT5Model:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, input_ids, **kwargs):
+        self.calls += 1
+        return torch.tensor([[self.calls]])
+
+class RejectingSafetyFilter:
+    async def afilter_candidates(self, candidates, age_group="6-8"):
+        return "A gentle story about friendship.", None
+
+class TestStoryCache:
+    def test_key_is_normalized(self):
+        key_a = StoryCache.make_key(
+            {'objects': [{'name': 'Tree'}, {'name': 'dog'}, {'name': 'dog'}], 'scene_type': 'Nature'},
+            '6-8', GENERATION
+        )
+        key_b = StoryCache.make_key(
+            {'objects': [{'name': 'dog'}, {'name': ' tree '}], 'scene_type': 'nature'},
+            '6-8', GENERATION
+        )
+        assert key_a == key_b
+
+    def test_key_includes_age_group_and_settings(self):
+        drawing = {'objects': [{'name': 'dog'}], 'scene_type': 'nature'}
+        key = StoryCache.make_key(drawing, '6-8', GENERATION)
+
+        assert key != StoryCache.make_key(drawing, '3-5', GENERATION)
+        assert key != StoryCache.make_key(drawing, '6-8', {**GENERATION, 'num_beams': 1})
+
+    def test_fills_variants_then_rotates(self):
+        cache = StoryCache(variants_per_key=2)
+        key = ('dog',)
+
+        assert cache.get(key) is None
+        cache.put(key, story('one'))
+        assert cache.get(key) is None
+        cache.put(key, story('two'))
+
+        served = [cache.get(key) for _ in range(4)]
+        assert served == [story('one'), story('two'), story('one'), story('two')]
+
+    def test_duplicate_variants_are_stored_once(self):
+        cache = StoryCache(variants_per_key=3)
+        key = ('dog',)
+        for _ in range(3):
+            cache.put(key, story('same'))
+
+        assert cache.get(key) == story('same')
+        assert cache.get(key) == story('same')
+
+    def test_lru_eviction(self):
+        cache = StoryCache(max_entries=1)
+        cache.put(('dog',), story('dog'))
+        cache.put(('cat',), story('cat'))
+
+        assert cache.get(('dog',)) is None
+        assert cache.get(('cat',)) == story('cat')
+
+class TestStoryGeneratorCaching:
+    @pytest.fixture
+    def story_generator(self, make_story_generator):
+        generator = make_story_generator(
+            CountingT5Model(), lambda ids: f"The friendly dog found story number {ids[0]}.",
+            profiles={'standard': GenerationProfile('standard', GENERATION)}
+        )
+        generator.story_cache = StoryCache(variants_per_key=1)
+        return generator
+
+    @pytest.mark.asyncio
+    async def test_repeat_request_skips_generation(self, story_generator):
+        drawing_data = {'objects': [{'name': 'dog'}, {'name': 'tree'}], 'scene_type': 'nature'}
+
+        first = await story_generator.generate_story(drawing_data)
+        second = await story_generator.generate_story({
+            'objects': [{'name': 'tree'}, {'name': 'dog'}], 'scene_type': 'nature'
+        })
+
+        assert first == second
+        assert story_generator.model.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_story_is_not_cached(self, story_generator):
+        story_generator.safety_filter = RejectingSafetyFilter()
+        drawing_data = {'objects': [{'name': 'dog'}], 'scene_type': 'nature'}
+
+        await story_generator.generate_story(drawing_data)
+        await story_generator.generate_story(drawing_data)
+
+        assert story_generator.model.calls == 2
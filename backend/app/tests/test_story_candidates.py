@@ -0,0 +1,162 @@
+# backend/tests/test_story_candidates.py
+import asyncio
+import pytest
+import torch
+from app.services.generation_profiles import GenerationProfile, build_profiles
+from app.utils.content_safety import ContentSafetyFilter
+from app.tests.test_text_analysis import build_nlp
+from benchmarks.tiny_models import tiny_t5
+
+SAFE = "The animals played in the nature park with their family."
+UNSAFE = "A sword was found by the kids near the river of friendship."
+SCARY = "The bad dog was scary but found friendship."
+
+class CandidateT5Model:
+    """Returns one row per requested candidate, ids index into `texts`"""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, input_ids, **kwargs):
+        self.calls.append(kwargs)
+        return torch.arange(kwargs.get('num_return_sequences', 1)).unsqueeze(1)
+
+@pytest.fixture
+def safety_filter():
+    return ContentSafetyFilter(nlp=build_nlp())
+
+@pytest.fixture
+def make_generator(make_story_generator):
+    def make(safety_filter, texts, candidates=3):
+        # Output ids index into `texts`
+        generator = make_story_generator(
+            CandidateT5Model(), lambda ids: texts[ids[0]], safety_filter=safety_filter,
+            profiles={'standard': GenerationProfile('standard', {
+                'max_length': 200, 'num_beams': 4, 'num_return_sequences': candidates
+            })}
+        )
+        generator.bad_words_ids = [[7]]
+        return generator
+
+    return make
+
+class TestStoryCandidates:
+    @pytest.mark.asyncio
+    async def test_first_passing_candidate_is_served(self, safety_filter, make_generator):
+        generator = make_generator(safety_filter, [UNSAFE, SAFE, SCARY])
+
+        story = await generator.generate_story({'objects': [{'name': 'dog'}], 'scene_type': 'park'})
+
+        content = ' '.join(section['content'] for section in story['narrative'])
+        assert 'animals played' in content
+        # One batched generate call with the lexicon constraints
+        assert len(generator.model.calls) == 1
+        assert generator.model.calls[0]['bad_words_ids'] == [[7]]
+        assert generator.model.calls[0]['num_return_sequences'] == 3
+
+        stats = generator.get_generation_stats()
+        # Every candidate went through the cascade, not just up to the served one
+        assert stats['candidates_evaluated'] == {3: 1}
+        assert stats['fallback_rate'] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_candidates_share_one_cascade_run(self, safety_filter, make_generator):
+        generator = make_generator(safety_filter, [UNSAFE, SCARY, SAFE])
+
+        await generator.generate_story({'objects': [{'name': 'dog'}], 'scene_type': 'park'})
+
+        assert generator.get_generation_stats()['mean_candidates_evaluated'] == 3
+        lexicon = safety_filter.get_cascade_stats()['tiers']['lexicon']
+        # One tier call for all three candidates, not one run per retry
+        assert lexicon['evaluated'] == 3
+        assert lexicon['calls'] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_a_batch(self, safety_filter, make_generator):
+        generators = [make_generator(safety_filter, [UNSAFE, SAFE, SCARY]) for _ in range(2)]
+
+        await asyncio.gather(*(
+            generator.generate_story({'objects': [{'name': 'dog'}], 'scene_type': 'park'})
+            for generator in generators
+        ))
+
+        assert safety_filter.batcher.get_stats()['largest_batch'] == 2
+        assert safety_filter.get_cascade_stats()['tiers']['lexicon']['evaluated'] == 6
+
+    @pytest.mark.asyncio
+    async def test_padding_is_not_part_of_the_story(self, make_story_generator):
+        t5 = tiny_t5()
+        tokenizer = t5['tokenizer']
+        dog = tokenizer.convert_tokens_to_ids('dog')
+
+        class PaddedT5Model:
+            def generate(self, input_ids, **kwargs):
+                # The shorter candidate is padded after its </s>
+                return torch.tensor([[0, dog, 1, 0, 0], [0, dog, dog, dog, 1]])
+
+        generator = make_story_generator(
+            PaddedT5Model(), tokenizer=tokenizer,
+            profiles={'standard': GenerationProfile('standard', {'num_return_sequences': 2})}
+        )
+
+        story = await generator.generate_story({'objects': [{'name': 'dog'}], 'scene_type': 'park'})
+
+        content = ' '.join(section['content'] for section in story['narrative'])
+        assert 'dog' in content
+        assert '<pad>' not in content and '</s>' not in content
+
+    @pytest.mark.asyncio
+    async def test_fallback_only_when_every_candidate_fails(self, safety_filter, make_generator):
+        generator = make_generator(safety_filter, [UNSAFE, SCARY, UNSAFE])
+
+        story = await generator.generate_story({'objects': [{'name': 'dog'}], 'scene_type': 'park'})
+
+        fallback = safety_filter._get_fallback_content("Content failed safety check")
+        assert fallback in ' '.join(section['content'] for section in story['narrative']) + '.'
+        stats = generator.get_generation_stats()
+        assert stats['fallbacks'] == 1
+        assert stats['fallback_rate'] == 1.0
+        assert stats['candidates_evaluated'] == {3: 1}
+
+    def test_generation_settings_return_candidates(self, make_story_generator):
+        generator = make_story_generator(CandidateT5Model(), str, profiles=build_profiles(6, {}))
+
+        standard = generator.profiles['standard'].settings
+        premium = generator.profiles['premium'].settings
+        assert standard['num_return_sequences'] == 6
+        assert premium['num_return_sequences'] == 6
+        assert premium['num_beams'] >= 6
+        assert generator._get_stream_settings(generator.profiles['premium'])['num_return_sequences'] == 1
+
+class TestBannedTokens:
+    @pytest.fixture
+    def generator(self, safety_filter, make_story_generator):
+        t5 = tiny_t5()
+        return make_story_generator(t5['model'], tokenizer=t5['tokenizer'], safety_filter=safety_filter)
+
+    def test_banned_terms_come_from_lexicon(self, generator):
+        bad_words_ids = generator._get_bad_words_ids()
+        tokenizer = generator.tokenizer
+
+        # The tiny vocabulary knows 'knife' and 'horror'; unknown terms are skipped
+        assert [tokenizer.convert_tokens_to_ids('knife')] in bad_words_ids
+        assert [tokenizer.convert_tokens_to_ids('horror')] in bad_words_ids
+        assert all(tokenizer.unk_token_id not in ids for ids in bad_words_ids)
+
+    def test_banned_tokens_are_never_generated(self, generator):
+        bad_words_ids = generator._get_bad_words_ids()
+        banned = {ids[0] for ids in bad_words_ids}
+        input_ids = generator.tokenizer.encode("a dog in the garden", return_tensors='pt')
+
+        # Bias the tiny model towards a banned token so the constraint matters
+        knife = generator.tokenizer.convert_tokens_to_ids('knife')
+        with torch.no_grad():
+            generator.model.lm_head.weight[knife] += 10.0
+            unconstrained = generator.model.generate(input_ids, max_length=10, num_beams=2)
+            constrained = generator.model.generate(
+                input_ids, max_length=10, num_beams=2, num_return_sequences=2,
+                bad_words_ids=bad_words_ids
+            )
+
+        assert knife in unconstrained[0].tolist()
+        assert not banned & set(constrained.flatten().tolist())
@@ -0,0 +1,96 @@
+# backend/tests/test_story_streaming.py
+import asyncio
+import pytest
+import torch
+from app.services.generation_profiles import GenerationProfile
+from app.utils.lexicon import get_lexicon
+from app.services.inference import get_executor
+
+WORDS = ["<pad>", "Once", "a", "dog", "played.", "It", "was", "happy.", "The", "end"]
+
+def decode_words(ids):
+    return " ".join(WORDS[i] for i in ids if i != 0)
+
+class StreamingT5Model:
+    def generate(self, input_ids, streamer=None, **kwargs):
+        tokens = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+        # Decoder start token, skipped by skip_prompt
+        streamer.put(torch.tensor([0]))
+        for token in tokens:
+            streamer.put(torch.tensor([token]))
+        streamer.end()
+        return torch.tensor([[0] + tokens])
+
+class FailingT5Model:
+    def generate(self, input_ids, streamer=None, **kwargs):
+        raise RuntimeError("out of memory")
+
+class SentenceSafetyFilter:
+    lexicon = get_lexicon()
+
+    def filter_sentence(self, sentence, age_group="6-8"):
+        return None if "happy" in sentence else sentence
+
+    def filter_content(self, content, age_group="6-8"):
+        return content
+
+    async def afilter_content(self, content, age_group="6-8"):
+        return self.filter_content(content, age_group)
+
+    async def afilter_candidates(self, candidates, age_group="6-8"):
+        return self.filter_content(candidates[0], age_group), 0
+
+class TestStoryStreaming:
+    @pytest.fixture
+    def story_generator(self, make_story_generator):
+        return make_story_generator(
+            StreamingT5Model(), decode_words, safety_filter=SentenceSafetyFilter(),
+            profiles={'standard': GenerationProfile('standard', {'max_length': 200, 'num_beams': 4})}
+        )
+
+    @pytest.mark.asyncio
+    async def test_streams_sentences_then_complete(self, story_generator):
+        events = [
+            event async for event in story_generator.stream_story({
+                'objects': [{'name': 'dog'}], 'scene_type': 'nature'
+            })
+        ]
+
+        names = [name for name, _ in events]
+        assert names == ['sentence', 'sentence', 'complete']
+        assert events[0][1] == {'index': 0, 'text': 'Once a dog played.'}
+        # The unsafe middle sentence is dropped; the trailing one is flushed
+        assert events[1][1] == {'index': 1, 'text': 'The end'}
+
+        complete = events[-1][1]
+        assert 'narrative' in complete
+        assert 'sound_effects' in complete
+        assert complete['metrics']['time_to_first_sentence_ms'] is not None
+        assert story_generator.stream_stats['streams'] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_single_hypothesis(self, story_generator):
+        assert story_generator._get_stream_settings(story_generator.get_profile())['num_beams'] == 1
+
+    @pytest.mark.asyncio
+    async def test_generation_error_ends_stream(self, story_generator):
+        story_generator.model = FailingT5Model()
+
+        with pytest.raises(RuntimeError):
+            async for _ in story_generator.stream_story({'objects': [], 'scene_type': 'nature'}):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_cancelled_generation_ends_stream(self, story_generator, monkeypatch):
+        async def cancelled(fn, *args, **kwargs):
+            raise asyncio.CancelledError()
+
+        # generate() never starts, e.g. cancelled while queued for the t5 worker
+        monkeypatch.setattr(get_executor('t5'), 'run', cancelled)
+
+        async def consume():
+            async for _ in story_generator.stream_story({'objects': [], 'scene_type': 'nature'}):
+                pass
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(consume(), 5)
@@ -0,0 +1,118 @@
+# backend/tests/test_text_analysis.py
+import pytest
+import asyncio
+import spacy
+from spacy.language import Language
+from textblob import TextBlob
+from app.utils.content_safety import ContentSafetyFilter
+from app.utils.text_analysis import TextAnalyzer
+
+@Language.component("toy_parser")
+def toy_parser(doc):
+    # Every token is its own noun phrase, enough to exercise noun_chunks
+    for token in doc:
+        token.pos_ = 'NOUN'
+        token.dep_ = 'ROOT'
+        token.head = token
+    return doc
+
+def build_nlp():
+    nlp = spacy.blank('en')
+    ruler = nlp.add_pipe('entity_ruler', name='ner')
+    ruler.add_patterns([{'label': 'WEAPON', 'pattern': 'sword'}])
+    nlp.add_pipe('toy_parser', name='parser')
+    return nlp
+
+def legacy_filter(safety_filter, content, age_group):
+    """The original three-parse filter_content, kept as a reference"""
+    nlp = safety_filter.nlp
+    try:
+        cleaned = safety_filter._clean_text(content)
+
+        doc = nlp(cleaned)
+        if any(ent.label_ in ['WEAPON', 'CRIME', 'VIOLENCE'] for ent in doc.ents):
+            raise ValueError("unsafe")
+        tokens = [token.text.lower() for token in nlp(cleaned)]
+        for combo in [('bad', 'scary'), ('hurt', 'pain'), ('fight', 'hit')]:
+            if all(word in tokens for word in combo):
+                raise ValueError("unsafe")
+
+        age_vocab = safety_filter.age_vocabulary[age_group]
+        safe = " ".join(
+            age_vocab.get(token.text.lower(), token.text) for token in nlp(cleaned)
+        )
+
+        themes = {chunk.root.text.lower() for chunk in nlp(safe).noun_chunks}
+        if not any(theme in safety_filter.safe_themes for theme in themes):
+            raise ValueError("theme")
+
+        sentiment = TextBlob(safe).sentiment
+        if sentiment.polarity < -0.1 or abs(sentiment.subjectivity) > 0.8:
+            raise ValueError("emotion")
+        return safe
+    except Exception as e:
+        return safety_filter._get_fallback_content(str(e))
+
+CORPUS = [
+    "The animals played in the nature park with their family.",
+    "A sword was found by the kids near the river of friendship.",
+    "The bad dog was scary but found friendship.",
+    "The colossal bear and the dog shared kindness in nature.",
+    "Learning about animals is a great adventure for a family.",
+    "The dragon was furious and everyone was terribly sad and hurt.",
+    "They had a picnic.",
+]
+
+class TestTextAnalysis:
+    @pytest.fixture
+    def nlp(self):
+        return build_nlp()
+
+    @pytest.fixture
+    def safety_filter(self, nlp):
+        return ContentSafetyFilter(nlp=nlp)
+
+    def test_lexical_pass_skips_parser(self, nlp):
+        analysis = TextAnalyzer(nlp).analyze_lexical(["A sword in nature"])[0]
+
+        assert analysis.entity_labels == {'WEAPON'}
+        assert analysis.noun_chunk_roots is None
+
+    def test_syntax_pass_skips_ner(self, nlp):
+        analysis = TextAnalyzer(nlp).analyze_syntax(["A sword in nature"])[0]
+
+        assert 'nature' in analysis.noun_chunk_roots
+        assert analysis.entity_labels is None
+
+    def test_one_pipe_call_per_stage(self, safety_filter, monkeypatch):
+        calls = []
+        pipe = safety_filter.nlp.pipe
+
+        def counting_pipe(texts, **kwargs):
+            texts = list(texts)
+            calls.append(len(texts))
+            return pipe(texts, **kwargs)
+
+        monkeypatch.setattr(safety_filter.nlp, 'pipe', counting_pipe)
+        safety_filter.filter_many(CORPUS, "6-8")
+
+        # One lexical batch for every text the lexicon did not reject
+        # ("bad ... scary"), one syntax batch for the survivors
+        assert len(calls) == 2
+        assert calls[0] == len(CORPUS) - 1
+
+    @pytest.mark.parametrize("age_group", ["3-5", "6-8", "9-12"])
+    def test_decisions_match_sequential_filter(self, safety_filter, age_group):
+        expected = [legacy_filter(safety_filter, text, age_group) for text in CORPUS]
+
+        assert safety_filter.filter_many(CORPUS, age_group) == expected
+        assert [safety_filter.filter_content(text, age_group) for text in CORPUS] == expected
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_batched(self, safety_filter):
+        results = await asyncio.gather(
+            *(safety_filter.afilter_content(text, "6-8") for text in CORPUS)
+        )
+
+        assert results == safety_filter.filter_many(CORPUS, "6-8")
+        assert safety_filter.batcher.get_stats()['batches'] < len(CORPUS)
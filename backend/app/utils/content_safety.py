@@ -1,42 +1,258 @@
 # backend/app/utils/content_safety.py
 import re
-from typing import Dict, List, Optional
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 from better_profanity import profanity
-from textblob import TextBlob
-import spacy
+from app.core.config import settings
+from app.core.metrics import SAFETY_FALLBACKS, stage_timer, timed
+from app.services.batching import BatchScheduler
+from app.services.inference import get_executor
+from app.services.ml_models import get_model_manager
+from app.utils.lexicon import LexiconScan, get_lexicon
+from app.utils.safety_cascade import (
+    ACCEPT, EARLY_EXIT_TIERS, PASS, SAFETY_TIERS, SENTENCE_TIERS,
+    SafetyCascadeStats, SentimentPrecheck
+)
+from app.utils.text_analysis import TextAnalysis, TextAnalyzer
+
+# Fallback reasons exported as metric labels; anything else is an 'error'
+FALLBACK_REASONS = {
+    "Content failed safety check": 'unsafe_content',
+    "Content theme not appropriate": 'theme',
+    "Content emotional tone not appropriate": 'emotional_tone'
+}
+
+# Sentiment bounds for the emotional tone check
+MIN_POLARITY = -0.1
+MAX_SUBJECTIVITY = 0.8
+
+class _CascadeState:
+    """What the tiers produced so far for one batch of texts"""
+
+    def __init__(self, contents: List[str], age_group: str):
+        self.contents = contents
+        self.age_group = age_group
+        self.cleaned: Dict[int, str] = {}
+        self.rewritten: Dict[int, str] = {}
+        self.syntax: Dict[int, TextAnalysis] = {}
+
+    def ready(self, tier: str) -> List[int]:
+        """Texts that have the input `tier` reads"""
+        if tier in ('lexicon', 'clean'):
+            return list(range(len(self.contents)))
+        if tier == 'entities':
+            return list(self.cleaned)
+        return list(self.rewritten)
 
 class ContentSafetyFilter:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, nlp=None):
+        self.nlp = nlp or get_model_manager().get('nlp', 'spacy')['model']
+        self.analyzer = TextAnalyzer(self.nlp)
         self.profanity_filter = profanity
+        self.lexicon = get_lexicon()
         self.age_vocabulary = self._load_age_vocabulary()
         self.safe_themes = self._load_safe_themes()
+        self.sentiment_precheck = SentimentPrecheck(MAX_SUBJECTIVITY)
+        self.cascade_stats = SafetyCascadeStats()
+        
+        # Texts from concurrent requests share one nlp.pipe call; an item
+        # is all the texts of one request (e.g. its story candidates)
+        self.batcher = BatchScheduler(
+            timed('safety_batch', self._filter_batch),
+            max_batch_size=settings.NLP_MAX_BATCH_SIZE,
+            max_wait_ms=settings.NLP_MAX_WAIT_MS,
+            executor=get_executor('nlp'),
+            name='nlp'
+        )
         
     def filter_content(self, content: str, age_group: str = "6-8") -> str:
         """Apply all safety filters to content"""
-        try:
-            # Basic cleaning
-            cleaned_content = self._clean_text(content)
-            
-            # Safety checks
-            if not self._is_content_safe(cleaned_content):
-                raise ValueError("Content failed safety check")
-            
-            # Age-appropriate vocabulary
-            safe_content = self._apply_age_vocabulary(cleaned_content, age_group)
-            
-            # Theme check
-            if not self._check_theme_safety(safe_content):
-                raise ValueError("Content theme not appropriate")
+        return self.filter_many([content], age_group)[0]
+    
+    async def afilter_content(self, content: str, age_group: str = "6-8") -> str:
+        """Filter content off the event loop, batched with concurrent callers"""
+        (safe_text, error), = await self.batcher.submit(([content], age_group))
+        return safe_text if error is None else self._get_fallback_content(error)
+    
+    async def afilter_candidates(self, candidates: List[str],
+                                 age_group: str = "6-8") -> Tuple[str, Optional[int]]:
+        """
+        Return the filtered first candidate that passes, and its index.
+        
+        All candidates go through the batcher as one item, so their spaCy
+        work is one `nlp.pipe` batch, shared with concurrent requests,
+        rather than a run per retry. If none passes,
+        the fallback for the last rejection is returned with index None;
+        callers must not cache that text as a generated story.
+        """
+        if not candidates:
+            return self._get_fallback_content("No candidates to filter"), None
+        
+        outcomes = await self.batcher.submit((list(candidates), age_group))
+        error = None
+        for index, (safe_text, error) in enumerate(outcomes):
+            if error is None:
+                return safe_text, index
+        return self._get_fallback_content(error), None
+    
+    def filter_many(self, contents: List[str], age_group: str = "6-8") -> List[str]:
+        """
+        Apply all safety filters to several texts, cheapest tier first.
+        
+        Each text gets the same decision `filter_content` always made; the
+        spaCy work is batched through `nlp.pipe`, and a text leaves the
+        cascade at the first tier that decides it (see `SAFETY_TIERS`).
+        """
+        return [
+            text if error is None else self._get_fallback_content(error)
+            for text, error in self._run_cascade(contents, age_group, SAFETY_TIERS)
+        ]
+    
+    def _run_cascade(self, contents: List[str], age_group: str,
+                     tiers: Sequence[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Run `tiers` in order and return (safe_text, None) or (None, reason) per text.
+        
+        With SAFETY_EARLY_EXIT off the early-exit tiers are left out. With
+        SAFETY_CASCADE_AUDIT on every tier runs on every text it has input
+        for, and the verdict without early exit is the one returned.
+        """
+        audit = settings.SAFETY_CASCADE_AUDIT
+        if not (settings.SAFETY_EARLY_EXIT or audit):
+            tiers = [tier for tier in tiers if tier not in EARLY_EXIT_TIERS]
+        
+        state = _CascadeState(list(contents), age_group)
+        # First deciding tier per text: with early exit, and without (audit)
+        decided: Dict[int, str] = {}
+        full: Dict[int, str] = {}
+        
+        for tier in tiers:
+            indices = [i for i in state.ready(tier) if audit or i not in decided]
+            if not indices:
+                continue
             
-            # Emotional safety check
-            if not self._check_emotional_safety(safe_content):
-                raise ValueError("Content emotional tone not appropriate")
+            start = time.perf_counter()
+            with stage_timer(f"safety_{tier}"):
+                try:
+                    decisions = getattr(self, f"_tier_{tier}")(state, indices)
+                except Exception as e:
+                    decisions = {i: str(e) for i in indices}
+            self.cascade_stats.record(tier, decisions, start)
             
-            return safe_content
+            for i, decision in decisions.items():
+                if decision == PASS:
+                    continue
+                decided.setdefault(i, decision)
+                if tier not in EARLY_EXIT_TIERS:
+                    full.setdefault(i, decision)
+        
+        # Reasons of rejected texts; accepted texts have none
+        verdicts = {i: reason for i, reason in decided.items() if reason != ACCEPT}
+        if audit:
+            mismatches = [
+                i for i in range(len(state.contents)) if verdicts.get(i) != full.get(i)
+            ]
+            self.cascade_stats.record_audit(len(state.contents), mismatches)
+            verdicts = full
+        
+        return [
+            (None, verdicts[i]) if i in verdicts else (state.rewritten[i], None)
+            for i in range(len(state.contents))
+        ]
+    
+    def _tier_clean(self, state: _CascadeState, indices: List[int]) -> Dict[int, str]:
+        # Profanity and unsafe phrases are removed, nothing is rejected
+        decisions = {}
+        for i in indices:
+            try:
+                state.cleaned[i] = self._clean_text(state.contents[i])
+                decisions[i] = PASS
+            except Exception as e:
+                decisions[i] = str(e)
+        return decisions
+    
+    def _tier_lexicon(self, state: _CascadeState, indices: List[int]) -> Dict[int, str]:
+        # Unsafe word combinations, rejected before censoring or parsing;
+        # the censor never touches their words, so the raw text decides
+        return {
+            i: "Content failed safety check"
+            if 'unsafe_combination' in self.lexicon.scan(state.contents[i]).categories
+            else PASS
+            for i in indices
+        }
+    
+    def _tier_entities(self, state: _CascadeState, indices: List[int]) -> Dict[int, str]:
+        # Safety checks and age-appropriate vocabulary share one parse
+        # and one lexicon pass
+        decisions = {}
+        lexical = self.analyzer.analyze_lexical(state.cleaned[i] for i in indices)
+        for i, analysis in zip(indices, lexical):
+            state.rewritten[i], scan = self._rewrite_age_vocabulary(analysis, state.age_group)
+            if self._is_analysis_safe(analysis, scan):
+                decisions[i] = PASS
+            else:
+                decisions[i] = "Content failed safety check"
+        return decisions
+    
+    def _tier_theme(self, state: _CascadeState, indices: List[int]) -> Dict[int, str]:
+        # Themes are checked on the rewritten text
+        decisions = {}
+        syntax = self.analyzer.analyze_syntax(state.rewritten[i] for i in indices)
+        for i, analysis in zip(indices, syntax):
+            state.syntax[i] = analysis
+            decisions[i] = PASS if self._has_safe_theme(analysis) else "Content theme not appropriate"
+        return decisions
+    
+    def _tier_calm(self, state: _CascadeState, indices: List[int]) -> Dict[int, str]:
+        return {
+            i: ACCEPT if self.sentiment_precheck.is_calm(state.rewritten[i]) else PASS
+            for i in indices
+        }
+    
+    def _tier_sentiment(self, state: _CascadeState, indices: List[int]) -> Dict[int, str]:
+        decisions = {}
+        for i in indices:
+            analysis = state.syntax.get(i) or TextAnalysis(state.rewritten[i], [])
+            if self._is_emotionally_safe(analysis):
+                decisions[i] = PASS
+            else:
+                decisions[i] = "Content emotional tone not appropriate"
+        return decisions
+    
+    def get_cascade_stats(self) -> Dict:
+        """Return per-tier decisions and latency, and audit mismatches"""
+        return self.cascade_stats.summary()
+    
+    def _filter_batch(self, items: List[tuple]) -> List[List[tuple]]:
+        # Group by age group so each group is a single cascade run over
+        # the texts of every item in it
+        results: List[List[tuple]] = [[] for _ in items]
+        by_age_group: Dict[str, List[int]] = {}
+        for i, (_, age_group) in enumerate(items):
+            by_age_group.setdefault(age_group, []).append(i)
             
-        except Exception as e:
-            return self._get_fallback_content(str(e))
+        for age_group, indices in by_age_group.items():
+            owners = [i for i in indices for _ in items[i][0]]
+            texts = [text for i in indices for text in items[i][0]]
+            for i, outcome in zip(owners, self._run_cascade(texts, age_group, SAFETY_TIERS)):
+                results[i].append(outcome)
+                
+        return results
+    
+    def filter_sentence(self, sentence: str, age_group: str = "6-8") -> Optional[str]:
+        """
+        Apply the per-sentence safety filters to one streamed sentence.
+        
+        Returns the age-appropriate sentence, or None if it should be
+        dropped. The theme check needs the whole story, so it is left to
+        `filter_content` on the complete text.
+        """
+        try:
+            safe_sentence, _ = self._run_cascade([sentence], age_group, SENTENCE_TIERS)[0]
+            return safe_sentence or None
+        
+        except Exception:
+            return None
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
@@ -51,71 +267,71 @@ class ContentSafetyFilter:
         
         return clean_text
     
+    def _remove_unsafe_patterns(self, text: str) -> str:
+        """Drop the lexicon's 'unsafe_phrase' terms from text"""
+        return self.lexicon.rewrite(text, ['unsafe_phrase'])[0]
+    
     def _is_content_safe(self, text: str) -> bool:
         """Check if content meets safety criteria"""
-        doc = self.nlp(text)
-        
+        return self._is_analysis_safe(self.analyzer.analyze_lexical([text])[0])
+    
+    def _is_analysis_safe(self, analysis: TextAnalysis,
+                          scan: Optional[LexiconScan] = None) -> bool:
         # Check for unsafe entities
         unsafe_entities = ['WEAPON', 'CRIME', 'VIOLENCE']
-        if any(ent.label_ in unsafe_entities for ent in doc.ents):
+        if any(label in unsafe_entities for label in analysis.entity_labels):
             return False
         
         # Check for unsafe word combinations
-        unsafe_combinations = [
-            ('bad', 'scary'),
-            ('hurt', 'pain'),
-            ('fight', 'hit')
-        ]
-        tokens = [token.text.lower() for token in doc]
-        for combo in unsafe_combinations:
-            if all(word in tokens for word in combo):
-                return False
-        
-        return True
+        if scan is None:
+            scan = self.lexicon.scan(" ".join(analysis.tokens))
+        return 'unsafe_combination' not in scan.categories
     
     def _apply_age_vocabulary(self, text: str, age_group: str) -> str:
         """Replace complex words with age-appropriate alternatives"""
-        doc = self.nlp(text)
-        age_vocab = self.age_vocabulary[age_group]
-        
-        new_text = []
-        for token in doc:
-            if token.text.lower() in age_vocab:
-                new_text.append(age_vocab[token.text.lower()])
-            else:
-                new_text.append(token.text)
-                
-        return " ".join(new_text)
+        return self._replace_age_vocabulary(
+            self.analyzer.analyze_lexical([text])[0], age_group
+        )
+    
+    def _replace_age_vocabulary(self, analysis: TextAnalysis, age_group: str) -> str:
+        return self._rewrite_age_vocabulary(analysis, age_group)[0]
+    
+    def _rewrite_age_vocabulary(self, analysis: TextAnalysis, age_group: str) -> tuple:
+        # Tokens are re-joined with single spaces, as the word-by-word
+        # replacement always did; the scan also serves the other checks
+        return self.lexicon.rewrite(
+            " ".join(analysis.tokens), [f"age_vocabulary:{age_group}"]
+        )
     
     def _check_theme_safety(self, text: str) -> bool:
         """Check if theme is appropriate for children"""
-        doc = self.nlp(text)
-        
-        # Extract main themes
-        themes = set()
-        for chunk in doc.noun_chunks:
-            themes.add(chunk.root.text.lower())
-        
+        return self._has_safe_theme(self.analyzer.analyze_syntax([text])[0])
+    
+    def _has_safe_theme(self, analysis: TextAnalysis) -> bool:
         # Check if at least one safe theme is present
-        return any(theme in self.safe_themes for theme in themes)
+        return any(theme in self.safe_themes for theme in analysis.noun_chunk_roots)
     
     def _check_emotional_safety(self, text: str) -> bool:
         """Check emotional tone of content"""
-        blob = TextBlob(text)
-        sentiment = blob.sentiment
+        return self._is_emotionally_safe(TextAnalysis(text, []))
+    
+    def _is_emotionally_safe(self, analysis: TextAnalysis) -> bool:
+        sentiment = analysis.sentiment
         
         # Ensure positive or neutral sentiment
-        if sentiment.polarity < -0.1:
+        if sentiment.polarity < MIN_POLARITY:
             return False
         
         # Check for overwheming emotions
-        if abs(sentiment.subjectivity) > 0.8:
+        if abs(sentiment.subjectivity) > MAX_SUBJECTIVITY:
             return False
         
         return True
     
     def _get_fallback_content(self, error: str) -> str:
         """Provide safe fallback content if safety checks fail"""
+        SAFETY_FALLBACKS.labels(FALLBACK_REASONS.get(error, 'error')).inc()
+        
         fallback_templates = [
             "Once upon a time, there was a friendly animal who loved to play and make friends.",
             "In a beautiful garden, flowers danced in the gentle breeze while butterflies flew by.",
@@ -126,25 +342,10 @@ class ContentSafetyFilter:
     
     def _load_age_vocabulary(self) -> Dict:
         """Load age-appropriate vocabulary"""
+        prefix = "age_vocabulary:"
         return {
-            "3-5": {
-                "sad": "unhappy",
-                "angry": "upset",
-                "difficult": "hard",
-                "enormous": "big"
-            },
-            "6-8": {
-                "melancholy": "sad",
-                "furious": "angry",
-                "challenging": "hard",
-                "gigantic": "very big"
-            },
-            "9-12": {
-                "depressed": "very sad",
-                "enraged": "very angry",
-                "arduous": "very hard",
-                "colossal": "very big"
-            }
+            name[len(prefix):]: self.lexicon.terms(name)
+            for name in self.lexicon.categories if name.startswith(prefix)
         }
     
     def _load_safe_themes(self) -> Set[str]:
@@ -165,6 +366,7 @@ class ContentSafetyFilter:
 class StoryValidator:
     def __init__(self):
         self.safety_filter = ContentSafetyFilter()
+        self.lexicon = self.safety_filter.lexicon
         
     def validate_story(self, story: Dict, age_group: str) -> Dict:
         """Validate complete story including narrative and effects"""
@@ -204,43 +406,30 @@ class StoryValidator:
     def _validate_narrative(self, narrative: List[Dict], 
                           age_group: str) -> List[Dict]:
         """Validate and clean narrative content"""
-        safe_narrative = []
-        
-        for section in narrative:
-            safe_content = self.safety_filter.filter_content(
-                section['content'],
-                age_group
-            )
-            safe_narrative.append({
-                **section,
-                'content': safe_content
-            })
+        # All sections go through the NLP pipeline together
+        safe_contents = self.safety_filter.filter_many(
+            [section['content'] for section in narrative],
+            age_group
+        )
         
-        return safe_narrative
+        return [
+            {**section, 'content': safe_content}
+            for section, safe_content in zip(narrative, safe_contents)
+        ]
     
     def _validate_sound_effects(self, sound_effects: List[Dict]) -> List[Dict]:
         """Validate sound effects for safety"""
-        safe_sounds = []
-        unsafe_sounds = {'crash', 'bang', 'explosion', 'scream', 'yell'}
-        
-        for effect in sound_effects:
-            if not any(unsafe in effect['description'].lower() 
-                      for unsafe in unsafe_sounds):
-                safe_sounds.append(effect)
-        
-        return safe_sounds
+        return [
+            effect for effect in sound_effects
+            if not self.lexicon.has_category(effect['description'], 'unsafe_sound')
+        ]
     
     def _validate_animations(self, animations: List[Dict]) -> List[Dict]:
         """Validate animations for safety"""
-        safe_animations = []
-        unsafe_animations = {'violent', 'scary', 'threatening', 'rapid'}
-        
-        for animation in animations:
-            if not any(unsafe in animation['description'].lower() 
-                      for unsafe in unsafe_animations):
-                safe_animations.append(animation)
-        
-        return safe_animations
+        return [
+            animation for animation in animations
+            if not self.lexicon.has_category(animation['description'], 'unsafe_animation')
+        ]
     
     def _get_fallback_story(self) -> Dict:
         """Provide safe fallback story if validation fails"""
@@ -0,0 +1,247 @@
+# backend/app/utils/lexicon.py
+"""
+Every safety word list compiled into one Aho-Corasick automaton.
+
+The lists live in a JSON data file (`SAFETY_LEXICON_PATH`). Each category
+has a `match` mode ('word' for whole words, 'substring' for anywhere in
+the text) and an `action` ('flag', 'remove' or 'replace'). Combinations
+name a category that matches when all words of one group occur as whole
+words in the same text.
+
+A scan walks the lowercased text once, one automaton transition per
+character, so its cost depends on the length of the text and the number
+of hits, not on how many terms the lists hold.
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.core.config import settings
+
+MATCH_MODES = ('word', 'substring')
+ACTIONS = ('flag', 'remove', 'replace')
+
+class LexiconMatch:
+    """One occurrence of a term, as [start, end) offsets into the scanned text"""
+
+    __slots__ = ('start', 'end', 'term', 'category', 'replacement')
+
+    def __init__(self, start: int, end: int, term: str, category: str,
+                 replacement: Optional[str]):
+        self.start = start
+        self.end = end
+        self.term = term
+        self.category = category
+        self.replacement = replacement
+
+    def __repr__(self) -> str:
+        return f"LexiconMatch({self.start}, {self.end}, {self.term!r}, {self.category!r})"
+
+class LexiconScan:
+    """Matches of one text and the categories they (and any combinations) hit"""
+
+    __slots__ = ('text', 'matches', 'categories')
+
+    def __init__(self, text: str, matches: List[LexiconMatch], categories: Set[str]):
+        self.text = text
+        self.matches = matches
+        self.categories = categories
+
+    def terms(self, category: str) -> List[str]:
+        return [match.term for match in self.matches if match.category == category]
+
+class Lexicon:
+    def __init__(self, categories: Dict[str, Dict],
+                 combinations: Optional[Dict[str, List[List[str]]]] = None):
+        self.categories: Dict[str, Dict] = {}
+        # Entries are (term, category, whole_word, replacement)
+        self._entries: List[Tuple[str, Optional[str], bool, Optional[str]]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for name, spec in categories.items():
+            match = spec.get('match', 'word')
+            action = spec.get('action', 'flag')
+            if match not in MATCH_MODES:
+                raise ValueError(f"Unknown match mode for {name}: {match}")
+            if action not in ACTIONS:
+                raise ValueError(f"Unknown action for {name}: {action}")
+
+            terms = spec.get('terms', [])
+            if action == 'replace':
+                pairs = [(term.lower(), str(value)) for term, value in terms.items()]
+            else:
+                pairs = [(term.lower(), '' if action == 'remove' else None) for term in terms]
+
+            self.categories[name] = {
+                'match': match, 'action': action, 'terms': dict(pairs)
+            }
+            for term, replacement in pairs:
+                self._add(term, name, match == 'word', replacement)
+
+        # Combination members are whole-word entries without a category of
+        # their own; a scan resolves combinations from the members it saw
+        self.combinations: Dict[str, List[frozenset]] = {}
+        for name, groups in (combinations or {}).items():
+            self.combinations[name] = [frozenset(word.lower() for word in group) for group in groups]
+            for word in set().union(*self.combinations[name]):
+                self._add(word, None, True, None)
+
+        self._build()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Lexicon':
+        return cls(data.get('categories', {}), data.get('combinations', {}))
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Lexicon':
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except Exception as e:
+            raise Exception(f"Error loading safety lexicon {path}: {str(e)}")
+
+    @property
+    def size(self) -> int:
+        """Number of compiled entries"""
+        return len(self._entries)
+
+    def terms(self, category: str) -> Dict[str, Optional[str]]:
+        """Term -> replacement ('' for 'remove', None for 'flag') of one category"""
+        return dict(self.categories[category]['terms'])
+
+    def scan(self, text: str) -> LexiconScan:
+        """Every term occurrence in `text`, and the categories that matched"""
+        lowered = self._lower(text)
+        matches = []
+        combination_words = set()
+        goto, fail, output, entries = self._goto, self._fail, self._output, self._entries
+        length = len(lowered)
+
+        state = 0
+        for i, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for entry_id in output[state]:
+                term, category, whole_word, replacement = entries[entry_id]
+                start = i + 1 - len(term)
+                end = i + 1
+                if whole_word and not (
+                    (start == 0 or not _is_word_char(lowered[start - 1]))
+                    and (end == length or not _is_word_char(lowered[end]))
+                ):
+                    continue
+                if category is None:
+                    combination_words.add(term)
+                else:
+                    matches.append(LexiconMatch(start, end, term, category, replacement))
+
+        categories = {match.category for match in matches}
+        for name, groups in self.combinations.items():
+            if any(group <= combination_words for group in groups):
+                categories.add(name)
+
+        return LexiconScan(text, matches, categories)
+
+    def has_category(self, text: str, category: str) -> bool:
+        return category in self.scan(text).categories
+
+    def rewrite(self, text: str, categories: Iterable[str]) -> Tuple[str, LexiconScan]:
+        """
+        Apply the 'remove'/'replace' entries of `categories` to `text`.
+
+        Overlapping hits resolve leftmost-longest. The scan of the original
+        text is returned too, so callers get every category that matched
+        from the same single pass.
+        """
+        scan = self.scan(text)
+        wanted = set(categories)
+        for category in wanted:
+            if category not in self.categories:
+                raise KeyError(category)
+
+        edits = sorted(
+            (match for match in scan.matches
+             if match.category in wanted and match.replacement is not None),
+            key=lambda match: (match.start, -match.end)
+        )
+
+        pieces = []
+        position = 0
+        for match in edits:
+            if match.start < position:
+                continue
+            pieces.append(text[position:match.start])
+            pieces.append(match.replacement)
+            position = match.end
+        pieces.append(text[position:])
+
+        return ''.join(pieces), scan
+
+    def _add(self, term: str, category: Optional[str], whole_word: bool,
+             replacement: Optional[str]):
+        if not term:
+            return
+        state = 0
+        for char in term:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state] += (len(self._entries),)
+        self._entries.append((term, category, whole_word, replacement))
+
+    def _build(self):
+        # Breadth-first failure links; each state also inherits the
+        # outputs of its failure state, so a scan never follows chains
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+
+    @staticmethod
+    def _lower(text: str) -> str:
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        # A few characters lowercase to several code points; keep those
+        # as-is so match offsets stay valid in the original text
+        return ''.join(
+            char.lower() if len(char.lower()) == 1 else char for char in text
+        )
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+DEFAULT_LEXICON_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'data', 'safety_lexicon.json'
+)
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+def get_lexicon() -> Lexicon:
+    """Return the process-wide lexicon, compiled on first use"""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                _lexicon = Lexicon.from_file(settings.SAFETY_LEXICON_PATH or DEFAULT_LEXICON_PATH)
+    return _lexicon
+
+def set_lexicon(lexicon: Optional[Lexicon]):
+    """Replace the process-wide lexicon (None recompiles from the data file)"""
+    global _lexicon
+    with _lexicon_lock:
+        _lexicon = lexicon
@@ -0,0 +1,145 @@
+# backend/app/utils/safety_cascade.py
+"""
+Tier layout, early-exit checks and bookkeeping for the safety filter.
+
+`ContentSafetyFilter` runs its checks as tiers, cheapest first, and a
+text leaves the cascade at the first tier that decides it. Two tiers
+exist only to decide early, and each mirrors a later full check:
+
+- 'lexicon' rejects unsafe word combinations with one automaton scan of
+  the raw text, before the profanity censor ('clean', the costliest
+  per-word step) and before spaCy parses anything ('entities' repeats
+  the check on tokens of the cleaned text);
+- 'calm' accepts texts whose words cannot give a TextBlob score outside
+  the allowed range, so 'sentiment' is skipped for them.
+
+In audit mode every tier runs on every text, and the verdict with the
+early-exit tiers is compared to the verdict without them.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List
+from textblob._text import EMOTICONS
+from textblob.en import sentiment as pattern_sentiment
+from app.core.metrics import SAFETY_AUDIT_MISMATCHES, SAFETY_TIER_DECISIONS
+from app.utils.lexicon import Lexicon
+
+# Full pipeline order; each tier reads what an earlier one produced
+# ('lexicon' and 'clean' both read the raw text)
+SAFETY_TIERS = ('lexicon', 'clean', 'entities', 'theme', 'calm', 'sentiment')
+SENTENCE_TIERS = ('lexicon', 'clean', 'entities', 'calm', 'sentiment')
+EARLY_EXIT_TIERS = frozenset({'lexicon', 'calm'})
+
+# Tier decisions besides a rejection reason
+PASS = 'pass'
+ACCEPT = 'accept'
+
+class SentimentPrecheck:
+    """
+    Decide from TextBlob's own word list whether its score could fail.
+
+    TextBlob averages the (polarity, subjectivity) of the known words in a
+    text. A modifier ("very") multiplies the next word's scores by its
+    intensity, negations flip polarity, emoticons and "(!)" add their own
+    scores. So a text without negations or emoticons, whose known words
+    all have polarity >= 0 and subjectivity <= `max_subjectivity` even
+    after the strongest modifier present, is guaranteed to pass.
+
+    TextBlob's tokenizer strips '_' around words and re-joins emoticons
+    spelled with spaces ("( ! )"), so words are looked for with '_' as a
+    separator and emoticons with all whitespace removed.
+    """
+
+    def __init__(self, max_subjectivity: float):
+        self.max_subjectivity = max_subjectivity
+        self.scores = {
+            word: tuple(entry[None]) for word, entry in pattern_sentiment.items()
+            if None in entry
+        }
+        negations = pattern_sentiment.negations
+        self.lexicon = Lexicon({
+            'sentiment': {'match': 'word', 'terms': list(self.scores)},
+            'negation': {
+                'match': 'word', 'terms': [word for word in negations if word.isalpha()]
+            },
+            'negation_affix': {
+                'match': 'substring', 'terms': [word for word in negations if not word.isalpha()]
+            }
+        })
+        # Alphabetic emoticons ("xD") are never scored as emoticons
+        self.emoticons = Lexicon({
+            'emoticon': {
+                'match': 'substring',
+                'terms': ['(!)'] + [
+                    e for emoticons in EMOTICONS.values() for e in emoticons if not e.isalpha()
+                ]
+            }
+        })
+
+    def is_calm(self, text: str) -> bool:
+        if self.emoticons.scan(''.join(text.split())).categories:
+            return False
+        scan = self.lexicon.scan(text.replace('_', ' '))
+        if scan.categories & {'negation', 'negation_affix'}:
+            return False
+
+        scores = [self.scores[term] for term in scan.terms('sentiment')]
+        if not scores:
+            return True
+        intensity = max(1.0, max(i for _, _, i in scores))
+        return all(p >= 0 and s * intensity <= self.max_subjectivity for p, s, _ in scores)
+
+class SafetyCascadeStats:
+    """Per-tier decision counts and latency, plus audit mismatches"""
+
+    def __init__(self, tiers: Iterable[str] = SAFETY_TIERS, window: int = 1000):
+        self.window = window
+        self.tiers = {
+            tier: {'evaluated': 0, 'rejected': 0, 'accepted': 0, 'latency_ms': []}
+            for tier in tiers
+        }
+        self.audit = {'texts': 0, 'mismatches': 0}
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, decisions: Dict[int, str], start: float):
+        elapsed = (time.perf_counter() - start) * 1000
+        rejected = sum(decision not in (PASS, ACCEPT) for decision in decisions.values())
+        accepted = sum(decision == ACCEPT for decision in decisions.values())
+        SAFETY_TIER_DECISIONS.labels(tier, 'reject').inc(rejected)
+        SAFETY_TIER_DECISIONS.labels(tier, 'accept').inc(accepted)
+        SAFETY_TIER_DECISIONS.labels(tier, 'pass').inc(len(decisions) - rejected - accepted)
+
+        with self._lock:
+            stats = self.tiers.setdefault(
+                tier, {'evaluated': 0, 'rejected': 0, 'accepted': 0, 'latency_ms': []}
+            )
+            stats['evaluated'] += len(decisions)
+            stats['rejected'] += rejected
+            stats['accepted'] += accepted
+            # Keep a bounded window of recent per-call samples
+            stats['latency_ms'].append(elapsed)
+            del stats['latency_ms'][:-self.window]
+
+    def record_audit(self, texts: int, mismatches: List[int]):
+        SAFETY_AUDIT_MISMATCHES.inc(len(mismatches))
+        with self._lock:
+            self.audit['texts'] += texts
+            self.audit['mismatches'] += len(mismatches)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            tiers = {}
+            for tier, stats in self.tiers.items():
+                ordered = sorted(stats['latency_ms'])
+                evaluated = stats['evaluated']
+                tiers[tier] = {
+                    'evaluated': evaluated,
+                    'rejected': stats['rejected'],
+                    'accepted': stats['accepted'],
+                    'exit_rate': (stats['rejected'] + stats['accepted']) / evaluated if evaluated else 0.0,
+                    'calls': len(ordered),
+                    'mean_ms': sum(ordered) / len(ordered) if ordered else None,
+                    'p50_ms': ordered[len(ordered) // 2] if ordered else None,
+                    'p95_ms': ordered[int(len(ordered) * 0.95)] if ordered else None
+                }
+            return {'tiers': tiers, 'audit': dict(self.audit)}
@@ -0,0 +1,8 @@
+# backend/app/utils/serialization.py
+"""JSON fallbacks shared by the result cache and the bulk NDJSON writer"""
+
+def to_json(value):
+    """`default=` hook: numpy scalars/arrays become plain floats/lists, anything else a string"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
@@ -0,0 +1,79 @@
+# backend/app/utils/text_analysis.py
+from typing import Iterable, List, Optional, Set, Tuple
+from textblob import TextBlob
+from app.core.metrics import stage_timer
+
+# spaCy components each safety check actually reads
+LEXICAL_COMPONENTS = ('tok2vec', 'ner')
+SYNTAX_COMPONENTS = ('tok2vec', 'tagger', 'attribute_ruler', 'parser')
+
+class TextAnalysis:
+    """Annotations of one text, shared by every safety check that reads it"""
+
+    __slots__ = ('text', 'tokens', 'entity_labels', 'noun_chunk_roots', '_sentiment')
+
+    def __init__(self, text: str, tokens: List[str],
+                 entity_labels: Optional[Set[str]] = None,
+                 noun_chunk_roots: Optional[Set[str]] = None):
+        self.text = text
+        self.tokens = tokens
+        self.entity_labels = entity_labels
+        self.noun_chunk_roots = noun_chunk_roots
+        self._sentiment = None
+
+    @property
+    def lower_tokens(self) -> List[str]:
+        return [token.lower() for token in self.tokens]
+
+    @property
+    def sentiment(self):
+        """TextBlob sentiment, computed at most once per text"""
+        if self._sentiment is None:
+            with stage_timer('textblob_sentiment'):
+                self._sentiment = TextBlob(self.text).sentiment
+        return self._sentiment
+
+class TextAnalyzer:
+    """
+    Parse texts once with only the spaCy components a check needs.
+
+    `analyze_lexical` runs tokenization and NER (no tagger or parser) for
+    the entity, word-combination and vocabulary checks. `analyze_syntax`
+    runs the tagger and parser (no NER) for noun-chunk themes. Both batch
+    every text through a single `nlp.pipe` call.
+    """
+
+    def __init__(self, nlp, batch_size: int = 32):
+        self.nlp = nlp
+        self.batch_size = batch_size
+
+    def analyze_lexical(self, texts: Iterable[str]) -> List[TextAnalysis]:
+        texts = list(texts)
+        docs = self._pipe(texts, LEXICAL_COMPONENTS, 'spacy_lexical')
+        return [
+            TextAnalysis(
+                text,
+                [token.text for token in doc],
+                entity_labels={ent.label_ for ent in doc.ents}
+            )
+            for text, doc in zip(texts, docs)
+        ]
+
+    def analyze_syntax(self, texts: Iterable[str]) -> List[TextAnalysis]:
+        texts = list(texts)
+        docs = self._pipe(texts, SYNTAX_COMPONENTS, 'spacy_syntax')
+        return [
+            TextAnalysis(
+                text,
+                [token.text for token in doc],
+                noun_chunk_roots={chunk.root.text.lower() for chunk in doc.noun_chunks}
+            )
+            for text, doc in zip(texts, docs)
+        ]
+
+    def _pipe(self, texts: List[str], needed: Tuple[str, ...], stage: str):
+        if not texts:
+            return []
+        disable = [name for name in self.nlp.pipe_names if name not in needed]
+        with stage_timer(stage):
+            return list(self.nlp.pipe(texts, disable=disable, batch_size=self.batch_size))
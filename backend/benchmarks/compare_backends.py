@@ -0,0 +1,229 @@
+# backend/benchmarks/compare_backends.py
+"""
+Compare CPU inference backends against the fp32 eager baseline.
+
+Reports latency (p50/p95), throughput, model memory (serialized weights,
+and resident memory added by loading the backend and by running it) and
+output agreement (detection overlap, top-1 agreement or generated-text
+similarity) for each backend:
+
+    python -m benchmarks.compare_backends object_detection.detr --backends int8 bf16 onnx
+    python -m benchmarks.compare_backends story_generation.t5 --backends int8 bf16
+"""
+import argparse
+import copy
+import difflib
+import gc
+import io
+import json
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Sequence
+import torch
+from PIL import Image, ImageDraw
+from app.services.backends import create_backend
+from app.services.ml_models import (
+    ModelManager, get_model_manager, resident_memory, run_detr_batch
+)
+
+def _box_iou(a: Dict, b: Dict) -> float:
+    ax2, ay2 = a['x'] + a['width'], a['y'] + a['height']
+    bx2, by2 = b['x'] + b['width'], b['y'] + b['height']
+    inter_w = max(0.0, min(ax2, bx2) - max(a['x'], b['x']))
+    inter_h = max(0.0, min(ay2, by2) - max(a['y'], b['y']))
+    inter = inter_w * inter_h
+    union = a['width'] * a['height'] + b['width'] * b['height'] - inter
+    return inter / union if union > 0 else 0.0
+
+def detection_agreement(baseline: List[Dict], candidate: List[Dict],
+                        iou_threshold: float = 0.5) -> float:
+    """F1 of same-label detections matched greedily at `iou_threshold`"""
+    if not baseline and not candidate:
+        return 1.0
+    unmatched = list(candidate)
+    matches = 0
+    for expected in sorted(baseline, key=lambda d: -d['confidence']):
+        best, best_iou = None, iou_threshold
+        for found in unmatched:
+            if found['name'] != expected['name']:
+                continue
+            iou = _box_iou(expected['box'], found['box'])
+            if iou >= best_iou:
+                best, best_iou = found, iou
+        if best is not None:
+            unmatched.remove(best)
+            matches += 1
+    return 2 * matches / (len(baseline) + len(candidate))
+
+def text_similarity(baseline: str, candidate: str) -> float:
+    """Character-level similarity ratio between two generated texts"""
+    return difflib.SequenceMatcher(None, baseline, candidate).ratio()
+
+def model_bytes(backend) -> int:
+    """Serialized size of the weights a backend actually runs with"""
+    session = getattr(backend, 'session', None)
+    if session is not None:
+        return backend.onnx_bytes
+    module = backend.module()
+    if module is None:
+        return 0
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+def sample_drawings(count: int, size=(640, 480), seed: int = 0) -> List[Image.Image]:
+    """Synthetic crayon-style drawings with a few filled shapes each"""
+    rng = random.Random(seed)
+    width, height = size
+    images = []
+    for _ in range(count):
+        image = Image.new('RGB', size, color='white')
+        draw = ImageDraw.Draw(image)
+        for _ in range(rng.randint(2, 6)):
+            x1, y1 = rng.randrange(width * 3 // 4), rng.randrange(height * 3 // 4)
+            x2 = x1 + rng.randint(width // 16 + 1, width // 3 + 2)
+            y2 = y1 + rng.randint(height // 16 + 1, height // 3 + 2)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+            shape((x1, y1, x2, y2), fill=color, outline='black', width=3)
+        images.append(image)
+    return images
+
+def sample_prompts(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    objects = ['tree', 'dog', 'house', 'cat', 'sun', 'flower', 'bird', 'car']
+    scenes = ['nature', 'indoor', 'general']
+    return [
+        f"Create a short, child-friendly story about: Scene: {rng.choice(scenes)} "
+        f"Objects: {', '.join(rng.sample(objects, rng.randint(1, 4)))}"
+        for _ in range(count)
+    ]
+
+def _runner(kind: str, bundle: Dict, backend) -> Callable[[Sequence], List]:
+    """Build a function mapping a batch of inputs to comparable outputs"""
+    if kind == 'detection':
+        def run(images):
+            return run_detr_batch(bundle['processor'], backend, list(images))
+    elif kind == 'classification':
+        def run(images):
+            inputs = bundle['processor'](images=list(images), return_tensors='pt')
+            logits = backend(**inputs).logits
+            return logits.argmax(dim=-1).tolist()
+    elif kind == 'generation':
+        def run(prompts):
+            tokenizer = bundle['tokenizer']
+            encoded = tokenizer(list(prompts), return_tensors='pt', padding=True)
+            outputs = backend.generate(**encoded, max_length=64, num_beams=1)
+            return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    else:
+        raise ValueError(f"Unknown model kind: {kind}")
+
+    def run_in_inference_mode(batch):
+        with torch.inference_mode():
+            return run(batch)
+    return run_in_inference_mode
+
+def _agreement(kind: str, baseline: List, candidate: List) -> float:
+    if kind == 'detection':
+        scores = [detection_agreement(b, c) for b, c in zip(baseline, candidate)]
+    elif kind == 'classification':
+        scores = [1.0 if b == c else 0.0 for b, c in zip(baseline, candidate)]
+    else:
+        scores = [text_similarity(b, c) for b, c in zip(baseline, candidate)]
+    return statistics.mean(scores) if scores else 1.0
+
+def _measure(run: Callable, inputs: Sequence, batch_size: int,
+             iterations: int, warmup: int) -> Dict:
+    batches = [inputs[i:i + batch_size] for i in range(0, len(inputs), batch_size)]
+    for batch in batches[:warmup]:
+        run(batch)
+
+    latencies, outputs = [], []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        outputs = []
+        for batch in batches:
+            batch_start = time.perf_counter()
+            outputs.extend(run(batch))
+            latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'outputs': outputs,
+        'latency_p50_ms': latencies[len(latencies) // 2] * 1000,
+        'latency_p95_ms': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+        'throughput_per_s': len(inputs) * iterations / elapsed
+    }
+
+def compare_backends(bundle: Dict, kind: str, backends: Sequence[str], inputs: Sequence,
+                     batch_size: int = 1, iterations: int = 3, warmup: int = 1,
+                     backend_options: Dict = None) -> Dict:
+    """
+    Run `inputs` through the fp32 eager model and each requested backend.
+
+    `bundle` is a ModelManager bundle ({'processor' or 'tokenizer', 'model'}).
+    Every backend is built from a copy of the fp32 weights, so the results
+    do not depend on the configured backend of the loaded model.
+    """
+    base_module = bundle['model']
+    if hasattr(base_module, 'module'):
+        base_module = base_module.module()
+
+    report = {'kind': kind, 'batch_size': batch_size, 'backends': {}}
+    baseline_outputs = None
+    for name in ['eager'] + [b for b in backends if b != 'eager']:
+        options = (backend_options or {}) if name == 'onnx' else {}
+        # Resident memory is relative to before the backend existed; the
+        # previous backend is released first
+        gc.collect()
+        rss_start = resident_memory()
+        backend = create_backend(name, copy.deepcopy(base_module), **options)
+        rss_loaded = resident_memory()
+        result = _measure(_runner(kind, bundle, backend), inputs, batch_size, iterations, warmup)
+        rss_forward = resident_memory()
+        outputs = result.pop('outputs')
+        if baseline_outputs is None:
+            baseline_outputs = outputs
+
+        report['backends'][name] = {
+            **result,
+            'model_bytes': model_bytes(backend),
+            'rss_after_load_bytes': max(rss_loaded - rss_start, 0),
+            'rss_after_forward_bytes': max(rss_forward - rss_start, 0),
+            'agreement': _agreement(kind, baseline_outputs, outputs)
+        }
+        del backend
+    return report
+
+MODEL_KINDS = {
+    'object_detection.detr': 'detection',
+    'scene_classification.vit': 'classification',
+    'story_generation.t5': 'generation'
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('model', choices=sorted(MODEL_KINDS))
+    parser.add_argument('--backends', nargs='+', default=['int8', 'bf16'])
+    parser.add_argument('--samples', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    task, name = args.model.split('.')
+    manager: ModelManager = get_model_manager()
+    config = manager.model_configs[task][name]
+    kind = MODEL_KINDS[args.model]
+
+    inputs = sample_prompts(args.samples) if kind == 'generation' else sample_drawings(args.samples)
+    report = compare_backends(
+        manager.get(task, name), kind, args.backends, inputs,
+        batch_size=args.batch_size, iterations=args.iterations,
+        backend_options={'model_id': config['model_id'], **config.get('onnx_options', {})}
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# backend/benchmarks/detection_serialization.py
+"""
+Time detection post-processing and response serialization for drawings
+with many detections:
+
+    python -m benchmarks.detection_serialization --detections 100
+
+'postprocess' compares the old per-value `.item()` loop with the bulk
+`tolist()` conversion in `format_detections`. 'serialize' compares the
+old response path (untyped dicts through `jsonable_encoder` and the
+stdlib encoder) with the typed models rendered by orjson, in both the
+object and the columnar layout.
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict
+import torch
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from app.models.drawing import ColumnarDrawingAnalysis, DrawingAnalysis
+from app.services.ml_models import format_detections
+
+ID2LABEL = {i: f"label_{i}" for i in range(91)}
+
+def sample_results(count: int, seed: int = 0) -> Dict[str, torch.Tensor]:
+    """Post-processed DETR output with `count` detections"""
+    generator = torch.Generator().manual_seed(seed)
+    corners = torch.rand(count, 2, generator=generator) * 800
+    sizes = torch.rand(count, 2, generator=generator) * 200 + 1
+    return {
+        'scores': torch.rand(count, generator=generator),
+        'labels': torch.randint(0, 91, (count,), generator=generator),
+        'boxes': torch.cat([corners, corners + sizes], dim=1)
+    }
+
+def format_detections_itemwise(results: Dict, id2label: Dict):
+    """The previous implementation: six .item() calls per box"""
+    detected_objects = []
+    for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
+        detected_objects.append({
+            'name': id2label[label.item()],
+            'confidence': score.item(),
+            'box': {
+                'x': box[0].item(),
+                'y': box[1].item(),
+                'width': box[2].item() - box[0].item(),
+                'height': box[3].item() - box[1].item()
+            }
+        })
+    return detected_objects
+
+def _time(fn: Callable, iterations: int) -> Dict:
+    fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(samples), 'min_ms': min(samples)}
+
+def run(detections: int = 100, iterations: int = 200) -> Dict:
+    results = sample_results(detections)
+    payload = {'objects': format_detections(results, ID2LABEL), 'scene_type': 'park'}
+    adapter = TypeAdapter(DrawingAnalysis)
+
+    def typed():
+        # What FastAPI does for a response_model, then the orjson render
+        content = adapter.dump_python(adapter.validate_python(payload), mode='json')
+        return ORJSONResponse(content).body
+
+    def columnar():
+        content = ColumnarDrawingAnalysis.from_result(payload).model_dump(mode='json')
+        return ORJSONResponse(content).body
+
+    report = {
+        'detections': detections,
+        'postprocess': {
+            'item_loop': _time(lambda: format_detections_itemwise(results, ID2LABEL), iterations),
+            'bulk_tolist': _time(lambda: format_detections(results, ID2LABEL), iterations)
+        },
+        'serialize': {
+            'dict_stdlib': _time(lambda: JSONResponse(jsonable_encoder(payload)).body, iterations),
+            'typed_orjson': _time(typed, iterations),
+            'columnar_orjson': _time(columnar, iterations)
+        },
+        'bytes': {
+            'objects': len(typed()),
+            'columnar': len(columnar())
+        }
+    }
+    for stage in ('postprocess', 'serialize'):
+        timings = report[stage]
+        before = next(iter(timings.values()))['median_ms']
+        for timing in timings.values():
+            timing['speedup'] = before / timing['median_ms'] if timing['median_ms'] else None
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--detections', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.detections, args.iterations), indent=2))
+
+if __name__ == '__main__':
+    main()
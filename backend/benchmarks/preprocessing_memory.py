@@ -0,0 +1,101 @@
+# backend/benchmarks/preprocessing_memory.py
+"""
+Report per-upload peak memory of image preprocessing before and after the
+shared preprocessing stage.
+
+Each path runs in a fresh subprocess so `ru_maxrss` is its own peak:
+
+    python -m benchmarks.preprocessing_memory --width 4000 --height 3000
+
+'legacy' mirrors the old flow: full-resolution decode, a full RGB array
+for scene attributes and color analysis, and both image processors fed
+the original pixels. 'shared' decodes once through `ImagePreprocessor`
+and builds every model tensor from the reduced working image.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import resource
+import sys
+from PIL import Image, ImageDraw
+
+PATHS = ('legacy', 'shared')
+
+def make_upload(width: int, height: int, quality: int = 90) -> bytes:
+    """A JPEG drawing with a few shapes, encoded like a phone upload"""
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((width // 8, height // 8, width // 2, height // 2), fill='orange')
+    draw.rectangle((width // 2, height // 2, width * 7 // 8, height * 7 // 8), fill='blue')
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _run_legacy(upload: bytes, detr_processor, vit_processor):
+    import numpy as np
+    image = Image.open(io.BytesIO(upload))
+    detr_processor(images=image, return_tensors="pt")
+    vit_processor(images=image, return_tensors="pt")
+    rgb = image.convert('RGB')
+    np.array(rgb).reshape(-1, 3)
+    np.array(image)
+
+def _run_shared(upload: bytes, detr_processor, vit_processor):
+    from app.services.ml_models import ColorAnalyzer
+    from app.services.preprocessing import ImagePreprocessor
+    prepared = ImagePreprocessor().decode(upload)
+    prepared.tensor('detr', lambda im: detr_processor(images=im, return_tensors="pt")['pixel_values'])
+    prepared.tensor('vit', lambda im: vit_processor(images=im, return_tensors="pt")['pixel_values'])
+    prepared.sample(ColorAnalyzer().max_pixels)
+
+def _measure(path: str, upload: bytes, queue):
+    from transformers import DetrImageProcessor, ViTImageProcessor
+    import app.services.ml_models  # noqa: F401 (same imports for both paths)
+    detr_processor = DetrImageProcessor()
+    vit_processor = ViTImageProcessor()
+
+    # Imports and processor setup are not part of the per-upload cost
+    baseline = _peak_rss_bytes()
+    if path == 'legacy':
+        _run_legacy(upload, detr_processor, vit_processor)
+    else:
+        _run_shared(upload, detr_processor, vit_processor)
+    queue.put({'baseline_bytes': baseline, 'peak_bytes': _peak_rss_bytes()})
+
+def measure_peak_memory(upload: bytes, path: str) -> dict:
+    """Peak RSS growth of one upload through `path`, in a fresh process"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(path, upload, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return {
+        **result,
+        'per_upload_peak_bytes': result['peak_bytes'] - result['baseline_bytes']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    args = parser.parse_args()
+
+    upload = make_upload(args.width, args.height)
+    report = {
+        'upload': {'width': args.width, 'height': args.height, 'bytes': len(upload)},
+        'paths': {path: measure_peak_memory(upload, path) for path in PATHS}
+    }
+    before = report['paths']['legacy']['per_upload_peak_bytes']
+    after = report['paths']['shared']['per_upload_peak_bytes']
+    report['reduction'] = 1 - after / before if before else 0.0
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
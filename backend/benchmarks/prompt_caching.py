@@ -0,0 +1,98 @@
+# backend/benchmarks/prompt_caching.py
+"""
+Report tokenization and encoder time saved per story request:
+
+    python -m benchmarks.prompt_caching
+    python -m benchmarks.prompt_caching --model-id t5-small
+
+Tokenization compares the whole prompt through the slow (SentencePiece)
+tokenizer, the whole prompt through the fast one, and the fast one with
+the constant template pre-tokenized. The encoder compares a full pass
+with a cache hit. Without `--model-id` the tiny offline stand-ins are
+used (no slow tokenizer is timed then, and encoder times are small).
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict
+import torch
+from app.services.prompt_encoding import EncoderCache, PromptStats, PromptTemplate
+from app.services.story_generator import PROMPT_SAMPLES, STORY_PROMPT, StoryGenerator
+from benchmarks.tiny_models import tiny_t5, tiny_unigram_tokenizer
+
+DRAWINGS = [
+    {'scene_type': 'garden', 'objects': [{'name': 'dog'}, {'name': 'tree'}, {'name': 'sun'}]},
+    {'scene_type': 'park', 'objects': [{'name': 'cat'}, {'name': 'bird'}]},
+    {'scene_type': 'beach', 'objects': [{'name': 'person'}]},
+]
+
+def _median_ms(fn: Callable, iterations: int) -> float:
+    fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def load(model_id: str = None) -> Dict:
+    if model_id is None:
+        t5 = tiny_t5(tokenizer=tiny_unigram_tokenizer(STORY_PROMPT))
+        return {'model': t5['model'], 'fast': t5['tokenizer'], 'slow': None}
+    from transformers import T5ForConditionalGeneration, T5Tokenizer, T5TokenizerFast
+    return {
+        'model': T5ForConditionalGeneration.from_pretrained(model_id),
+        'fast': T5TokenizerFast.from_pretrained(model_id),
+        'slow': T5Tokenizer.from_pretrained(model_id)
+    }
+
+def run(model_id: str = None, iterations: int = 50) -> Dict:
+    bundle = load(model_id)
+    generator = StoryGenerator.__new__(StoryGenerator)
+    generator.tokenizer = bundle['fast']
+    generator.model = bundle['model'].eval()
+    generator.prompt_template = PromptTemplate(generator.tokenizer, STORY_PROMPT, PROMPT_SAMPLES)
+    generator.encoder_cache = EncoderCache(len(DRAWINGS))
+    generator.prompt_stats = PromptStats()
+    prompts = [generator._create_prompt(drawing) for drawing in DRAWINGS]
+
+    def tokenize_all(tokenizer):
+        return lambda: [tokenizer.encode(prompt, return_tensors='pt') for prompt in prompts]
+
+    tokenize = {}
+    if bundle['slow'] is not None:
+        tokenize['slow_full_prompt'] = _median_ms(tokenize_all(bundle['slow']), iterations) / len(DRAWINGS)
+    tokenize['fast_full_prompt'] = _median_ms(tokenize_all(bundle['fast']), iterations) / len(DRAWINGS)
+    tokenize['fast_pretokenized'] = _median_ms(
+        lambda: [generator._encode_prompt(drawing) for drawing in DRAWINGS], iterations
+    ) / len(DRAWINGS)
+
+    encoder = generator.model.get_encoder()
+    input_ids = generator._encode_prompt(DRAWINGS[0])
+    key = EncoderCache.make_key(input_ids)
+    with torch.no_grad():
+        generator.encoder_cache.put(key, encoder(input_ids=input_ids).last_hidden_state)
+        encode_ms = _median_ms(lambda: encoder(input_ids=input_ids), iterations)
+    hit_ms = _median_ms(lambda: generator.encoder_cache.get(EncoderCache.make_key(input_ids)), iterations)
+
+    baseline = tokenize.get('slow_full_prompt', tokenize['fast_full_prompt'])
+    return {
+        'model': model_id or 'tiny',
+        'prompt_tokens': input_ids.shape[1],
+        'pretokenized_template_exact': generator.prompt_template.exact,
+        'tokenize_ms_per_request': tokenize,
+        'tokenize_saved_ms_per_request': baseline - tokenize['fast_pretokenized'],
+        'encoder_ms': {'full_pass': encode_ms, 'cache_hit': hit_ms},
+        'encoder_saved_ms_per_hit': encode_ms - hit_ms
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-id', default=None)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.model_id, args.iterations), indent=2))
+
+if __name__ == '__main__':
+    main()
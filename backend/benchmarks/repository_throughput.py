@@ -0,0 +1,101 @@
+# backend/benchmarks/repository_throughput.py
+"""
+Measure insert and list throughput of the drawing repository.
+
+Runs against an in-memory mongomock stand-in by default, or a real server
+when `--url` is given (a scratch database is created and dropped):
+
+    python -m benchmarks.repository_throughput --drawings 5000
+    python -m benchmarks.repository_throughput --url mongodb://localhost:27017
+
+Inserts are timed one at a time and in bulk batches; listing pages
+through every drawing of one child with keyset cursors.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+from app.models.drawing import DrawingCreate
+from app.services.database import (
+    close_mongodb_connection, create_client, get_drawing_repository, init_repositories
+)
+
+def sample_drawings(count: int, children: int = 10) -> List[DrawingCreate]:
+    start = datetime(2024, 1, 1)
+    return [
+        DrawingCreate(
+            child_id=f"child-{i % children}",
+            image_url=f"/static/drawings/{i}.png",
+            detected_objects=[{'name': 'dog', 'confidence': 0.9, 'box': [0, 0, 10, 10]}] * 5,
+            scene_type='garden',
+            creation_date=start + timedelta(seconds=i)
+        )
+        for i in range(count)
+    ]
+
+def _rate(count: int, elapsed: float) -> Dict:
+    return {'count': count, 'seconds': elapsed, 'per_second': count / elapsed if elapsed else None}
+
+async def measure(drawings: List[DrawingCreate], batch_size: int, page_size: int) -> Dict:
+    repository = get_drawing_repository()
+    half = len(drawings) // 2
+
+    start = time.perf_counter()
+    for drawing in drawings[:half]:
+        await repository.insert(drawing)
+    single = _rate(half, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(half, len(drawings), batch_size):
+        await repository.insert_many(drawings[i:i + batch_size])
+    bulk = _rate(len(drawings) - half, time.perf_counter() - start)
+
+    pages = items = 0
+    cursor = None
+    start = time.perf_counter()
+    while True:
+        page = await repository.list_for_child('child-0', page_size, cursor)
+        pages += 1
+        items += len(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    elapsed = time.perf_counter() - start
+
+    return {
+        'insert_one': single,
+        'insert_many': {**bulk, 'batch_size': batch_size},
+        'list': {**_rate(items, elapsed), 'pages': pages, 'page_size': page_size,
+                 'pages_per_second': pages / elapsed if elapsed else None}
+    }
+
+async def run(args) -> Dict:
+    if args.url:
+        client = create_client(args.url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+
+    db_name = f"benchmark_{uuid.uuid4().hex[:8]}"
+    await init_repositories(client, db_name)
+    try:
+        report = await measure(sample_drawings(args.drawings), args.batch_size, args.page_size)
+    finally:
+        await client.drop_database(db_name)
+        await close_mongodb_connection()
+    return {'backend': 'mongodb' if args.url else 'mongomock', **report}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--drawings', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == '__main__':
+    main()
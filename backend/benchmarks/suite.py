@@ -0,0 +1,217 @@
+# backend/benchmarks/suite.py
+"""
+Offline benchmark suite over every hot path, using tiny random models.
+
+Times process_image at several resolutions, ColorAnalyzer.analyze on
+high-color-count images, generate_story and ContentSafetyFilter on long
+texts, writes the results as JSON and fails when a benchmark's median
+regresses beyond a threshold against a stored baseline:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --update-baseline
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+import torch
+from PIL import Image
+from app.core.config import settings
+from benchmarks.compare_backends import sample_drawings
+from benchmarks.tiny_models import STORY_CORPUS, install_tiny_models
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DRAWING_SIZES = ((320, 240), (1024, 768), (4000, 3000))
+
+def noise_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    """Uniform RGB noise: close to one distinct color per pixel"""
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+def jpeg_bytes(image: Image.Image, quality: int = 90) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+def long_text(words: int, seed: int = 0) -> str:
+    """Story-like text of roughly `words` words built from the tiny corpus"""
+    rng = random.Random(seed)
+    sentences = [sentence for text in STORY_CORPUS[1:] for sentence in text.split(' . ')]
+    text = []
+    while len(text) < words:
+        text.extend(rng.choice(sentences).split())
+        text[-1] += '.'
+    return ' '.join(text)
+
+def _summarize(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        'iterations': len(ordered),
+        'median_ms': statistics.median(ordered) * 1000,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p95_ms': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+        'min_ms': ordered[0] * 1000
+    }
+
+async def _measure(fn: Callable[[], Awaitable], iterations: int, warmup: int) -> Dict:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return _summarize(samples)
+
+def _sync(fn: Callable, *args) -> Callable[[], Awaitable]:
+    async def call():
+        return fn(*args)
+    return call
+
+@contextmanager
+def benchmark_settings():
+    """Disable result caches so every iteration does the full work"""
+    overrides = {'RESULT_CACHE_ENABLED': False, 'STORY_CACHE_ENABLED': False}
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+def build_benchmarks() -> Dict[str, Callable[[], Awaitable]]:
+    """Name -> zero-argument coroutine function for every benchmark"""
+    from app.services.ml_models import ColorAnalyzer, EnhancedDrawingProcessor
+    from app.services.story_generator import StoryGenerator
+    from app.utils.content_safety import ContentSafetyFilter
+
+    processor = EnhancedDrawingProcessor()
+    story_generator = StoryGenerator()
+    safety_filter = ContentSafetyFilter()
+    color_analyzer = ColorAnalyzer()
+
+    benchmarks = {}
+    for width, height in DRAWING_SIZES:
+        drawing = jpeg_bytes(sample_drawings(1, size=(width, height))[0])
+        for model in ('detr', 'cascade'):
+            benchmarks[f"process_image.{model}.{width}x{height}"] = (
+                lambda data=drawing, model=model: processor.process_image(data, model)
+            )
+
+    for width, height in ((1024, 768), (4000, 3000)):
+        image = noise_image(width, height)
+        benchmarks[f"color_analyze.noise.{width}x{height}"] = _sync(color_analyzer.analyze, image)
+
+    drawing_data = {
+        'objects': [{'name': 'dog'}, {'name': 'tree'}, {'name': 'house'}],
+        'scene_type': 'garden',
+        'age_group': '6-8'
+    }
+    benchmarks['generate_story'] = lambda: story_generator.generate_story(drawing_data)
+
+    for words in (500, 2000):
+        benchmarks[f"filter_content.{words}_words"] = _sync(
+            safety_filter.filter_content, long_text(words)
+        )
+
+    return benchmarks
+
+async def run_suite(iterations: int = 5, warmup: int = 1,
+                    only: Optional[List[str]] = None, seed: int = 0) -> Dict:
+    """Run the benchmarks (optionally only names starting with `only`)"""
+    torch.manual_seed(seed)
+    with benchmark_settings():
+        install_tiny_models(seed)
+        benchmarks = build_benchmarks()
+
+        results = {}
+        for name, fn in benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = await _measure(fn, iterations, warmup)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'torch_threads': torch.get_num_threads()
+        },
+        'results': results
+    }
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float = 0.25) -> List[Dict]:
+    """
+    Benchmarks whose median got slower than the baseline by more than
+    `threshold` (0.25 = 25%). Benchmarks missing from either side are
+    skipped.
+    """
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or previous['median_ms'] <= 0:
+            continue
+        ratio = current['median_ms'] / previous['median_ms']
+        if ratio > 1 + threshold:
+            regressions.append({
+                'name': name,
+                'baseline_median_ms': previous['median_ms'],
+                'median_ms': current['median_ms'],
+                'slowdown': ratio - 1
+            })
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed median slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store this run as the new baseline instead of comparing")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--only', nargs='+', help="Benchmark name prefixes to run")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_suite(args.iterations, args.warmup, args.only))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        # A partial run (--only) only replaces the benchmarks it ran
+        baseline = {'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline['environment'] = results['environment']
+        baseline['results'].update(results['results'])
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+
+    print(json.dumps({'results': results['results'], 'regressions': regressions}, indent=2))
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
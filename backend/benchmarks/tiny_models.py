@@ -0,0 +1,178 @@
+# backend/benchmarks/tiny_models.py
+"""
+Tiny, randomly initialised stand-ins for every model the services load.
+
+Architectures, processors and pipelines are the real Hugging Face and
+spaCy classes with shrunken configs, so the whole pipeline (decode,
+preprocessing, batching, forward passes, post-processing, safety
+filtering) runs offline in seconds. Outputs are meaningless; timings of
+everything around the forward passes are representative.
+"""
+import re
+import spacy
+import torch
+from spacy.language import Language
+from tokenizers import (
+    Regex, Tokenizer, decoders, models, normalizers, pre_tokenizers, processors, trainers
+)
+from transformers import (
+    DetrConfig, DetrForObjectDetection, DetrImageProcessor,
+    PreTrainedTokenizerFast, T5Config, T5ForConditionalGeneration,
+    ViTConfig, ViTForImageClassification, ViTImageProcessor,
+    YolosConfig, YolosForObjectDetection, YolosImageProcessor,
+    pipeline
+)
+from app.services.ml_models import ModelManager, set_model_manager
+
+OBJECT_LABELS = ['person', 'dog', 'cat', 'tree', 'house', 'car', 'flower', 'bird', 'sun', 'knife']
+SCENE_LABELS = ['garden', 'park', 'beach', 'forest', 'bedroom', 'horror']
+
+# Words the tiny T5 tokenizer knows: prompt template plus story vocabulary
+STORY_CORPUS = [
+    "Create a children's story about a in setting . The story should be "
+    "appropriate for age group 6-8 and include a happy ending .",
+    "Once upon a time there was a friendly dog who loved to play in the garden .",
+    "The little cat and the bird became best friends and shared their toys .",
+    "Every morning the sun smiled over the house , the tree and the flowers .",
+    "They learned that kindness and helping each other make everyone happy ."
+]
+
+def _labels(names):
+    return {i: name for i, name in enumerate(names)}, {name: i for i, name in enumerate(names)}
+
+def tiny_detr(seed: int = 0) -> dict:
+    torch.manual_seed(seed)
+    id2label, label2id = _labels(OBJECT_LABELS)
+    config = DetrConfig(
+        use_timm_backbone=False, use_pretrained_backbone=False,
+        backbone_config={
+            'model_type': 'resnet', 'depths': [1, 1, 1, 1],
+            'hidden_sizes': [8, 8, 8, 8], 'embedding_size': 8, 'out_features': ['stage4']
+        },
+        d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2,
+        encoder_ffn_dim=16, decoder_ffn_dim=16, num_queries=10,
+        id2label=id2label, label2id=label2id
+    )
+    return {'processor': DetrImageProcessor(), 'model': DetrForObjectDetection(config)}
+
+def tiny_yolos(seed: int = 0) -> dict:
+    torch.manual_seed(seed)
+    id2label, label2id = _labels(OBJECT_LABELS)
+    config = YolosConfig(
+        hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, num_detection_tokens=10, image_size=[512, 864],
+        id2label=id2label, label2id=label2id
+    )
+    model = YolosForObjectDetection(config).eval()
+    # Same input size as hustvl/yolos-tiny
+    processor = YolosImageProcessor(size={'shortest_edge': 512, 'longest_edge': 864})
+    detector = pipeline('object-detection', model=model, image_processor=processor)
+    return {'pipeline': detector, 'model': model}
+
+def tiny_vit(seed: int = 0) -> dict:
+    torch.manual_seed(seed)
+    id2label, label2id = _labels(SCENE_LABELS)
+    config = ViTConfig(
+        image_size=224, patch_size=16, hidden_size=32, num_hidden_layers=1,
+        num_attention_heads=2, intermediate_size=32,
+        id2label=id2label, label2id=label2id
+    )
+    return {'processor': ViTImageProcessor(), 'model': ViTForImageClassification(config)}
+
+def tiny_tokenizer() -> PreTrainedTokenizerFast:
+    """Word-level tokenizer trained on the prompt template and a few stories"""
+    tokenizer = Tokenizer(models.WordLevel(unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.decoder = decoders.WordPiece()
+    words = OBJECT_LABELS + SCENE_LABELS
+    tokenizer.train_from_iterator(
+        STORY_CORPUS + [' '.join(words)],
+        trainers.WordLevelTrainer(special_tokens=['<pad>', '</s>', '<unk>'])
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token='<pad>', eos_token='</s>', unk_token='<unk>'
+    )
+
+def tiny_unigram_tokenizer(text: str = '') -> PreTrainedTokenizerFast:
+    """
+    SentencePiece-style tokenizer (Unigram + Metaspace, trailing </s>) over
+    the words of `text` and the story corpus, shaped like the real T5 one
+    """
+    words = sorted(set(re.findall(r"\w+|[^\w\s]", ' '.join(
+        STORY_CORPUS + OBJECT_LABELS + SCENE_LABELS + [text]
+    ))))
+    characters = sorted(set(''.join(words)))
+    vocab = (
+        [('<pad>', 0.0), ('</s>', 0.0), ('<unk>', 0.0)]
+        + [('\u2581' + word, -1.0) for word in words]
+        + [(word, -2.0) for word in words]
+        + [('\u2581', -3.0)] + [(c, -5.0) for c in characters]
+    )
+    tokenizer = Tokenizer(models.Unigram(vocab, unk_id=2))
+    # SentencePiece's remove_extra_whitespaces
+    tokenizer.normalizer = normalizers.Sequence([
+        normalizers.Replace(Regex(r'\s+'), ' '), normalizers.Strip()
+    ])
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    tokenizer.decoder = decoders.Metaspace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="$A </s>", special_tokens=[('</s>', 1)]
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token='<pad>', eos_token='</s>', unk_token='<unk>'
+    )
+
+def tiny_t5(seed: int = 0, tokenizer: PreTrainedTokenizerFast = None) -> dict:
+    torch.manual_seed(seed)
+    tokenizer = tokenizer or tiny_tokenizer()
+    config = T5Config(
+        vocab_size=len(tokenizer), d_model=32, d_kv=8, d_ff=64, num_layers=1,
+        num_heads=2, decoder_start_token_id=0, pad_token_id=0, eos_token_id=1
+    )
+    return {'tokenizer': tokenizer, 'model': T5ForConditionalGeneration(config)}
+
+@Language.component("tiny_parser")
+def tiny_parser(doc):
+    # Every token is its own noun phrase, enough for noun_chunks
+    for token in doc:
+        token.pos_ = 'NOUN'
+        token.dep_ = 'ROOT'
+        token.head = token
+    return doc
+
+def tiny_nlp(model_id: str = 'tiny-spacy'):
+    """Blank English pipeline with rule-based 'ner' and a trivial 'parser'"""
+    nlp = spacy.blank('en')
+    ruler = nlp.add_pipe('entity_ruler', name='ner')
+    ruler.add_patterns([
+        {'label': 'WEAPON', 'pattern': word} for word in ('sword', 'gun', 'knife')
+    ])
+    nlp.add_pipe('tiny_parser', name='parser')
+    return nlp
+
+def tiny_model_manager(seed: int = 0) -> ModelManager:
+    """A ModelManager whose every model is a tiny local stand-in"""
+    manager = ModelManager()
+    manager.model_configs = {
+        'object_detection': {
+            'detr': {'model_id': 'tiny-detr', 'loader': lambda _: tiny_detr(seed)},
+            'yolo': {'model_id': 'tiny-yolos', 'loader': lambda _: tiny_yolos(seed)}
+        },
+        'scene_classification': {
+            'vit': {'model_id': 'tiny-vit', 'loader': lambda _: tiny_vit(seed)}
+        },
+        'story_generation': {
+            't5': {'model_id': 'tiny-t5', 'loader': lambda _: tiny_t5(seed)}
+        },
+        'nlp': {
+            'spacy': {'model_id': 'tiny-spacy', 'loader': tiny_nlp}
+        }
+    }
+    return manager
+
+def install_tiny_models(seed: int = 0) -> ModelManager:
+    """Make the tiny models the process-wide registry, so services load them"""
+    manager = tiny_model_manager(seed)
+    set_model_manager(manager)
+    return manager